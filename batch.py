@@ -0,0 +1,181 @@
+from __future__ import annotations
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+from multiprocessing.connection import wait
+from time import perf_counter
+from .data_io import JsonFile, ExcelFile, OptimizerResult
+from .instrumentatie import stil
+from .optimalisatie import ALNS, LinearProgramming
+
+EXTENSIES = {".json": JsonFile, ".xlsx": ExcelFile, ".xls": ExcelFile}
+SUFFIX = ".resultaat.json"  # OptimizerResult van instantie.json/.xlsx komt in instantie.resultaat.json
+
+
+def geef_instanties(patronen: list):
+    # bestanden van de patronen (mappen of globs), gesorteerd en zonder eerdere resultaten
+    bestanden = set()
+    for patroon in patronen:
+        if os.path.isdir(patroon):
+            patroon = os.path.join(patroon, "*")
+        for bestand in glob.glob(patroon):
+            if os.path.isfile(bestand) and os.path.splitext(bestand)[1].lower() in EXTENSIES \
+                    and not bestand.endswith(SUFFIX):
+                bestanden.add(bestand)
+    return sorted(bestanden)
+
+
+def geef_uitvoer(bestand: str):
+    return os.path.splitext(bestand)[0] + SUFFIX
+
+
+def _los_instantie_op(bestand: str, solver: str, parameters: dict, verbinding):
+    # lost 1 instantie op in een apart proces en schrijft het OptimizerResult naast de invoer
+    # stuurt tot slot een dict met status, kost, tijd en fout
+    start = perf_counter()
+    resultaat = dict(status="failed", kost=None, fout=None)
+    try:
+        with stil():  # ook de uitvoer van de CBC solver
+            planning = EXTENSIES[os.path.splitext(bestand)[1].lower()](bestand).geef_planning_object()
+            if parameters["reduce"]:
+                planning.reduce()
+            if solver == "lp":
+                methode = LinearProgramming(planning)
+                methode.solve(time_limit=parameters["time_limit"])
+                opgelost = methode.pulp.status == 1
+            else:
+                methode = ALNS(planning, iterations=parameters["iterations"], seed=parameters["seed"],
+                               collect_stats=False)
+                methode.add_destroy_operators(*parameters["destroy"])
+                methode.add_repair_operators(*parameters["repair"])
+                if parameters["criterion"] == "simulated_annealing":
+                    methode.add_simulated_annealing()
+                else:
+                    methode.add_hill_climbing()
+                methode.solve(time_limit=parameters["time_limit"], max_no_improvement=parameters["max_no_improvement"])
+                opgelost = True
+            if opgelost:
+                OptimizerResult(methode.planning).schrijf_json(geef_uitvoer(bestand))
+                resultaat.update(status="ok", kost=methode.planning.geef_totale_kost())
+            else:
+                resultaat.update(status="infeasible")
+    except Exception as fout:
+        resultaat["fout"] = "%s: %s" % (type(fout).__name__, fout)
+    resultaat["tijd"] = perf_counter() - start
+    verbinding.send(resultaat)
+    verbinding.close()
+
+
+class Batch:
+
+    def __init__(self, bestanden: list, solver: str = "alns", parameters: dict = None, processen: int = None,
+                 tijdslimiet: float = None, marge: float = 10.0):
+        # lost elke instantie (JsonFile of ExcelFile) op in een apart proces, met maximaal processen tegelijk
+        # (standaard het aantal cpu's); een fout of crash in 1 instantie stopt de batch niet
+        # parameters: iterations, seed, destroy, repair, criterion en max_no_improvement (enkel voor alns)
+        # en reduce (Planning.reduce voor het oplossen)
+        # tijdslimiet: time_limit in sec per instantie voor ALNS en de LP solver; een proces dat na
+        # tijdslimiet + marge (laden en wegschrijven) nog loopt, wordt gestopt en krijgt status 'timeout'
+        if solver not in ("alns", "lp"):
+            raise ValueError("Unknown solver %s, expected alns or lp." % solver)
+        self.bestanden = bestanden
+        self.solver = solver
+        self.parameters = dict(iterations=1000, seed=None, destroy=("random", "worst"),
+                               repair=("greedy", "reversed_greedy"), criterion="hill_climbing",
+                               max_no_improvement=None, reduce=False)
+        self.parameters.update(parameters or dict())
+        self.parameters["time_limit"] = tijdslimiet
+        self.processen = processen or os.cpu_count() or 1
+        self.tijdslimiet = tijdslimiet
+        self.marge = marge
+        self.resultaten = None
+        self._context = multiprocessing.get_context("spawn")
+
+    def __start(self, bestand: str):
+        ouder, kind = self._context.Pipe(duplex=False)
+        proces = self._context.Process(target=_los_instantie_op, args=(bestand, self.solver, self.parameters, kind),
+                                       daemon=True)
+        proces.start()
+        kind.close()
+        return ouder, (bestand, proces, perf_counter())
+
+    def run(self):
+        # retourneert per bestand (in de volgorde van bestanden) een dict met status, kost, tijd en fout
+        # status: ok, infeasible (LP zonder oplossing), failed of timeout
+        wachtend = list(reversed(self.bestanden))
+        lopend = dict()  # verbinding: (bestand, proces, start)
+        self.resultaten = dict()
+        while wachtend or lopend:
+            while wachtend and len(lopend) < self.processen:
+                verbinding, taak = self.__start(wachtend.pop())
+                lopend[verbinding] = taak
+            for verbinding in wait(list(lopend), timeout=1.0):
+                bestand, proces, start = lopend.pop(verbinding)
+                try:
+                    resultaat = verbinding.recv()
+                except EOFError:  # het proces is gestopt zonder resultaat (vb. crash of geheugentekort)
+                    proces.join()
+                    resultaat = dict(status="failed", kost=None, tijd=perf_counter() - start,
+                                     fout="Solver process exited with code %s." % proces.exitcode)
+                verbinding.close()
+                proces.join()
+                self.resultaten[bestand] = resultaat
+            if self.tijdslimiet is not None:
+                for verbinding, (bestand, proces, start) in list(lopend.items()):
+                    if perf_counter() - start > self.tijdslimiet + self.marge:
+                        proces.terminate()
+                        proces.join()
+                        verbinding.close()
+                        del lopend[verbinding]
+                        self.resultaten[bestand] = dict(status="timeout", kost=None, tijd=perf_counter() - start,
+                                                        fout="Time limit exceeded.")
+        self.resultaten = {bestand: self.resultaten[bestand] for bestand in self.bestanden}
+        return self.resultaten
+
+    def rapport(self):
+        # samenvatting van de laatste run als tekst tabel
+        breedte = max([len("instance")] + [len(bestand) for bestand in self.resultaten])
+        lijnen = ["%-*s  %-10s  %14s  %9s" % (breedte, "instance", "status", "cost", "time (s)")]
+        for bestand, resultaat in self.resultaten.items():
+            kost = "" if resultaat["kost"] is None else "%.2f" % resultaat["kost"]
+            lijn = "%-*s  %-10s  %14s  %9.2f" % (breedte, bestand, resultaat["status"], kost, resultaat["tijd"])
+            lijnen.append(lijn + ("  " + resultaat["fout"] if resultaat.get("fout") else ""))
+        aantal_ok = sum(resultaat["status"] == "ok" for resultaat in self.resultaten.values())
+        lijnen.append("%d/%d instances solved" % (aantal_ok, len(self.resultaten)))
+        return "\n".join(lijnen)
+
+
+def main(argumenten: list = None):
+    parser = argparse.ArgumentParser(description="Los een batch instanties (json of Excel) parallel op.")
+    parser.add_argument("instanties", nargs="+", help="mappen en/of globs met JsonFile (.json) of ExcelFile (.xlsx)")
+    parser.add_argument("--solver", default="alns", help="alns of lp")
+    parser.add_argument("--processen", type=int, help="aantal instanties tegelijk (standaard het aantal cpu's)")
+    parser.add_argument("--tijdslimiet", type=float, help="time limit in sec per instantie")
+    parser.add_argument("--iteraties", type=int, default=1000, help="ALNS iteraties")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--destroy", nargs="+", default=["random", "worst"])
+    parser.add_argument("--repair", nargs="+", default=["greedy", "reversed_greedy"])
+    parser.add_argument("--criterium", default="hill_climbing", help="hill_climbing of simulated_annealing")
+    parser.add_argument("--max-zonder-verbetering", type=int, help="ALNS max_no_improvement")
+    parser.add_argument("--reduceer", action="store_true", help="verwijder onbruikbare en gedomineerde legs")
+    args = parser.parse_args(argumenten)
+    if args.solver not in ("alns", "lp"):
+        parser.error("unknown solver: %s" % args.solver)
+    if args.criterium not in ("hill_climbing", "simulated_annealing"):
+        parser.error("unknown criterium: %s" % args.criterium)
+    bestanden = geef_instanties(args.instanties)
+    if not bestanden:
+        parser.error("no instances found")
+    parameters = dict(iterations=args.iteraties, seed=args.seed, destroy=args.destroy, repair=args.repair,
+                      criterion=args.criterium, max_no_improvement=args.max_zonder_verbetering,
+                      reduce=args.reduceer)
+    batch = Batch(bestanden, args.solver, parameters, args.processen, args.tijdslimiet)
+    batch.run()
+    print(batch.rapport())
+    return 0 if all(resultaat["status"] == "ok" for resultaat in batch.resultaten.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+from __future__ import annotations
+import argparse
+import copy
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter
+from numpy.random import RandomState
+from .data_io import JsonFile, JsonObject, DataFrameDict
+from .generator import InstantieGenerator
+from .instrumentatie import stil
+from .optimalisatie import ALNS, LinearProgramming, PlanningState, greedy_repair
+
+# grootteniveaus: parameters van de InstantieGenerator, aantal ALNS iteraties en of het LP mee getest wordt
+# (het LP heeft een variabele per container en paar aansluitende legs en is enkel haalbaar voor kleine instanties)
+NIVEAUS = {
+    "klein": dict(generator=dict(aantal_terminals=3, aantal_verladers=0, legs_per_dag=3, aantal_orders=6,
+                                 containers_per_order=2), iteraties=500, lp=True),
+    "middel": dict(generator=dict(aantal_terminals=4, aantal_verladers=10, legs_per_dag=10, aantal_orders=100,
+                                  containers_per_order=4), iteraties=200, lp=False),
+    "groot": dict(generator=dict(aantal_terminals=8, aantal_verladers=40, legs_per_dag=30, aantal_orders=1000,
+                                 containers_per_order=5), iteraties=20, lp=False),
+}
+
+ZWARE_MODULES = ("pulp", "alns", "matplotlib", "pandas")  # mogen niet geladen worden bij het importeren
+
+
+class Benchmark:
+
+    def __init__(self, niveaus: list = None, seed: int = 0, geheugen: bool = True,
+                 destroy_operators: tuple = ('random', 'worst'), repair_operators: tuple = ('greedy', 'reversed_greedy')):
+        # meet laden, greedy constructie, ALNS (vast aantal iteraties), LP opbouw en LP solve per grootteniveau
+        # niveaus: namen uit NIVEAUS (standaard alle)
+        # geheugen: meet ook het piekgeheugen (Python heap via tracemalloc) in een aparte run van elke fase,
+        # zodat de tijden niet vertraagd worden door tracemalloc
+        self.niveaus = list(NIVEAUS) if niveaus is None else niveaus
+        self.seed = seed
+        self.geheugen = geheugen
+        self.destroy_operators = destroy_operators
+        self.repair_operators = repair_operators
+        self.resultaat = None
+
+    @staticmethod
+    def meet_importtijd():
+        # importeert optimalisatie en data_io in een nieuw proces
+        # retourneert de importtijd en de zware modules die daarbij (onterecht) geladen werden
+        pakket = __package__ or "package"
+        code = ("import sys, time; start = time.perf_counter(); import {0}.optimalisatie, {0}.data_io; "
+                "print(time.perf_counter() - start); print(' '.join(m for m in {1!r} if m in sys.modules))"
+                ).format(pakket, ZWARE_MODULES)
+        map_ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        uitvoer = subprocess.run([sys.executable, "-c", code], cwd=map_, capture_output=True, text=True, check=True)
+        tijd, *zwaar = uitvoer.stdout.splitlines()
+        zware_modules = zwaar[0].split() if zwaar else []
+        return dict(tijd=float(tijd), zware_modules=zware_modules, ok=not zware_modules)
+
+    def __meet(self, maak, voer_uit):
+        # maak() maakt de invoer (niet gemeten), voer_uit(invoer) is de gemeten fase en retourneert een dict
+        invoer = maak()
+        with stil():
+            start = perf_counter()
+            resultaat = voer_uit(invoer) or dict()
+            resultaat["tijd"] = perf_counter() - start
+        if self.geheugen:
+            invoer = maak()
+            tracemalloc.start()
+            try:
+                with stil():
+                    voer_uit(invoer)
+                resultaat["piek_geheugen_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            finally:
+                tracemalloc.stop()
+        return resultaat
+
+    def run_niveau(self, naam: str):
+        instelling = NIVEAUS[naam]
+        generator = InstantieGenerator(seed=self.seed, **instelling["generator"])
+        data = generator.geef_json()
+        dataframes = generator.geef_dataframes()
+        planning = JsonObject(copy.deepcopy(data)).geef_planning_object()
+        aantal_containers = len(planning.containers)
+        fasen = dict()
+        with tempfile.TemporaryDirectory() as map_:
+            bestand = os.path.join(map_, naam + ".json")
+            with open(bestand, 'w') as f:
+                json.dump(data, f)
+            fasen["laden_json"] = self.__meet(lambda: bestand, lambda b: JsonFile(b).geef_planning_object() and None)
+        fasen["laden_dataframe"] = self.__meet(lambda: dataframes,
+                                               lambda d: DataFrameDict(d).geef_planning_object() and None)
+
+        def maak_planning():
+            return JsonObject(copy.deepcopy(data)).geef_planning_object()
+
+        def greedy(planning):
+            state = greedy_repair(PlanningState(planning), RandomState(self.seed))
+            return dict(kost=state.objective() * 1000)
+
+        fasen["greedy"] = self.__meet(maak_planning, greedy)
+        fasen["greedy"]["containers_per_sec"] = aantal_containers / fasen["greedy"]["tijd"]
+
+        def maak_alns():
+            alns = ALNS(maak_planning(), iterations=instelling["iteraties"], seed=self.seed, collect_stats=False)
+            alns.add_destroy_operators(*self.destroy_operators)
+            alns.add_repair_operators(*self.repair_operators)
+            alns.add_hill_climbing()
+            alns.add_instrumentation()
+            return alns
+
+        def alns_solve(alns):
+            alns.solve()
+            return dict(iteraties=alns.aantal_iteraties, kost=alns.result.best_state.objective() * 1000,
+                        initiele_oplossing=alns.instrumentation_report(as_json=False)["ALNS.initial_solution"]["tijd"])
+
+        fasen["alns"] = alns_fase = self.__meet(maak_alns, alns_solve)
+        alns_fase["iteraties_per_sec"] = alns_fase["iteraties"] / (alns_fase["tijd"] - alns_fase["initiele_oplossing"])
+        alns_fase["containers_per_sec"] = aantal_containers * alns_fase["iteraties"] / alns_fase["tijd"]
+        if instelling["lp"]:
+            def maak_lp():
+                lp = LinearProgramming(maak_planning())
+                lp.add_instrumentation()
+                return lp
+
+            def lp_solve(lp):
+                lp.solve()
+                rapport = lp.instrumentation_report(as_json=False)
+                solve = sum(meting["tijd"] for fase, meting in rapport.items()
+                            if fase in ("LinearProgramming.solver", "LinearProgramming._get_solution"))
+                return dict(bouw=sum(meting["tijd"] for meting in rapport.values()) - solve, solve=solve,
+                            status=lp.pulp.status, kost=lp.planning.geef_totale_kost(),
+                            variabelen=len(lp.pulp.variables()), constraints=len(lp.pulp.constraints))
+
+            lp_fase = self.__meet(maak_lp, lp_solve)
+            fasen["lp_bouw"] = dict(tijd=lp_fase["bouw"], variabelen=lp_fase["variabelen"],
+                                    constraints=lp_fase["constraints"])
+            fasen["lp_solve"] = dict(tijd=lp_fase["solve"], status=lp_fase["status"], kost=lp_fase["kost"])
+            if "piek_geheugen_mb" in lp_fase:
+                fasen["lp_bouw"]["piek_geheugen_mb"] = lp_fase["piek_geheugen_mb"]  # LP opbouw en solve samen
+        return dict(containers=aantal_containers, orders=len(planning.orders), legs=len(planning.legs), fasen=fasen)
+
+    def run(self):
+        self.resultaat = dict(python=sys.version.split()[0], seed=self.seed, importeren=self.meet_importtijd(),
+                              niveaus={naam: self.run_niveau(naam) for naam in self.niveaus})
+        return self.resultaat
+
+    def rapport(self, as_json=False):
+        # retourneert de resultaten van de laatste run als json object (as_json=True) of als tekst tabel
+        if as_json:
+            return json.dumps(self.resultaat)
+        importeren = self.resultaat["importeren"]
+        lijnen = ["import: %.3f sec%s" % (importeren["tijd"], "" if importeren["ok"] else
+                                          " (zware modules geladen: %s)" % ", ".join(importeren["zware_modules"]))]
+        for naam, niveau in self.resultaat["niveaus"].items():
+            lijnen.append("%s: %d containers, %d orders, %d legs" % (naam, niveau["containers"], niveau["orders"],
+                                                                     niveau["legs"]))
+            for fase, meting in niveau["fasen"].items():
+                extra = ["%s=%.1f" % (sleutel, meting[sleutel]) for sleutel in
+                         ("iteraties_per_sec", "containers_per_sec", "piek_geheugen_mb", "kost", "status")
+                         if sleutel in meting]
+                lijnen.append(("  %-16s %9.3f sec  %s" % (fase, meting["tijd"], "  ".join(extra))).rstrip())
+        return "\n".join(lijnen)
+
+
+def main(argumenten: list = None):
+    parser = argparse.ArgumentParser(description="Benchmark van laden, ALNS en LP op synthetische instanties.")
+    parser.add_argument("niveaus", nargs="*", help="een of meer van %s (standaard alle)" % ", ".join(NIVEAUS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--geen-geheugen", action="store_true", help="meet geen piekgeheugen (sneller)")
+    parser.add_argument("--uitvoer", help="schrijf de resultaten als json naar dit bestand")
+    args = parser.parse_args(argumenten)
+    onbekend = [naam for naam in args.niveaus if naam not in NIVEAUS]
+    if onbekend:
+        parser.error("unknown niveau: %s" % ", ".join(onbekend))
+    benchmark = Benchmark(args.niveaus or None, args.seed, not args.geen_geheugen)
+    benchmark.run()
+    print(benchmark.rapport())
+    if args.uitvoer:
+        with open(args.uitvoer, 'w') as f:
+            f.write(benchmark.rapport(as_json=True))
+    return 0 if benchmark.resultaat["importeren"]["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
 import json
-import pandas as pd
+from itertools import islice
 import os
 from datetime import datetime, time, timedelta
 from .synchrotool import Planning, Order, AdhocLegs
@@ -81,7 +81,7 @@ class JsonObject(DataObject):
         tarief = self.data['adHocLegProperties']['tarief']
         emissie = self.data['adHocLegProperties']['co2']
         voor_na_transport = self.data['adHocLegProperties']['voorEnNaTransport']
-        afstanden = pd.DataFrame(self.data['adHocLegAfstanden'])
+        afstanden = self.data['adHocLegAfstanden']  # dict van dicts, geïndexeerd zoals een DataFrame: [van][naar]
         self.planning.adhoc_legs = AdhocLegs(afstanden, starttarief, tarief, snelheid, emissie, voor_na_transport)
         return self.planning
 
@@ -212,7 +212,7 @@ class DataFrameDict(DataObject):
         return self.planning
 
     def _voeg_locaties_toe(self):
-        locaties = set(self.legs.van).union(set(self.legs.naar))
+        locaties = set(self.legs.van).union(set(self.legs.naar), set(self.orders.van), set(self.orders.naar))
         for locatie in locaties:
             naam, functie = locatie.split(" ")
             functie = functie.upper()
@@ -279,6 +279,7 @@ class JsonFile(DataFile, JsonObject):
 class ExcelFile(DataFile, DataFrameDict):
 
     def __init__(self, file: str):
+        import pandas as pd  # enkel nodig om Excel in te lezen
         DataFile.__init__(self, file)
         data = dict()
         data['legs'] = pd.read_excel(self.file, sheet_name="legs")
@@ -295,75 +296,118 @@ class OptimizerResult:
     def __init__(self, planning: Planning):
         self.planning = planning
 
+    @staticmethod
+    def __geef_leg_id(leg):
+        return leg.db_id if leg.db_id != '' else leg.id
+
+    def __geef_leg_gebruik(self):
+        # genereert OptimiserLegUse dicts, 1 per legcapaciteit
+        for leg in self.planning.legs:
+            checkin, vertrek, aankomst = str(leg.checkin), str(leg.vertrek), str(leg.aankomst)
+            for containertype, capaciteit in leg.capaciteiten.items():
+                used = len(capaciteit.containers)
+                yield {"legId": leg.db_id, "containerType": str(containertype), "used": used,
+                       "available": capaciteit.aantal - used, "checkin": checkin, "vertrek": vertrek,
+                       "aankomst": aankomst}
+
+    def __geef_adhoc_caps(self):
+        # genereert AdhocLegs dicts, 1 per adhoc capaciteit
+        for c in self.planning.adhoc_capaciteiten:
+            leg = c.leg
+            yield {"id": str(leg.id), "van": str(leg.van), "naar": str(leg.naar), "vertrek": str(leg.vertrek),
+                   "aankomst": str(leg.aankomst), "aantal": c.aantal, "containertype": str(c.containertype),
+                   "prijs": c.prijs, "emissie": c.emissie}
+
+    def __groepeer_trajecten(self):
+        # groepeert alle trajecten in 1 doorloop over de containers
+        # retourneert {traject: {order: aantal}} en {order: {traject: [aantal, prijs, emissie, boete]}}
+        # gebruikt de kostenopbouw die de planning per container bijhoudt
+        planning = self.planning
+        trajecten = dict()
+        order_trajecten = {order: dict() for order in planning.orders}
+        for container_id, traject in enumerate(planning.trajecten):
+            if not traject:  # container niet ingepland: geen route
+                continue
+            order = planning.containers[container_id].order
+            orders = trajecten.get(traject)
+            if orders is None:
+                orders = trajecten[traject] = dict()
+            orders[order] = orders.get(order, 0) + 1
+            kostenopbouw = planning.kostenopbouw[container_id]
+            if kostenopbouw is None:
+                kostenopbouw = planning.geef_kostenopbouw_van_container_traject(container_id)
+            attr = order_trajecten[order].get(traject)
+            if attr is None:
+                attr = order_trajecten[order][traject] = [0, 0, 0, 0]
+            attr[0] += 1
+            attr[1] += kostenopbouw["prijs"]
+            attr[2] += kostenopbouw["emissie"]
+            attr[3] += kostenopbouw["boete"]
+        return trajecten, order_trajecten
+
+    def __geef_routes(self, trajecten: dict):
+        for traject, orders in trajecten.items():
+            yield {"legIds": [self.__geef_leg_id(capaciteit.leg) for capaciteit in traject],
+                   "containerType": str(traject[0].containertype),
+                   "orders": [{"orderId": order.db_id, "amount": int(aantal)} for order, aantal in orders.items()]}
+
+    def __geef_routes_per_order(self, order_trajecten: dict):
+        for order, trajecten in order_trajecten.items():
+            for traject, (aantal, prijs, emissie, boete) in trajecten.items():
+                eerste_leg = traject[0].leg
+                yield {"orderId": order.db_id, "checkin": str(eerste_leg.checkin), "vertrek": str(eerste_leg.vertrek),
+                       "aankomst": str(traject[-1].leg.aankomst), "amount": int(aantal),
+                       "containerType": str(traject[0].containertype), "prijs": prijs, "co2": emissie,
+                       "penalty": boete, "legIds": [self.__geef_leg_id(capaciteit.leg) for capaciteit in traject]}
+
     def geef_legs(self, as_json=True):
         # retourneert OptimiserLegUse
         # als json object (as_json=True)
         # of als dict (as_json=False)
-        leg_use = []
-        for leg in self.planning.legs:
-            for containertype, capaciteit in leg.capaciteiten.items():
-                d = dict()
-                d["legId"] = leg.db_id  # moet leg.db_id worden
-                d["containerType"] = str(containertype)
-                d["used"] = len(capaciteit.containers)
-                d["available"] = capaciteit.beschikbaar
-                d["checkin"] = str(leg.checkin)
-                d["vertrek"] = str(leg.vertrek)
-                d["aankomst"] = str(leg.aankomst)
-                leg_use.append(d)
+        leg_use = list(self.__geef_leg_gebruik())
         return json.dumps(leg_use) if as_json else leg_use
 
     def geef_adhoc_legs(self, as_json=True):
         # retourneert AdhocLegs
         # als json object (as_json=True)
         # of als dict (as_json=False)
-        caps = []
-        for c in self.planning.adhoc_capaciteiten:
-            leg_attr = ["id", "van", "naar", "vertrek", "aankomst"]
-            cap_attr = ["aantal", "containertype", "prijs", "emissie"]
-            d = dict()
-            for attr in leg_attr:
-                d[attr] = str(getattr(c.leg, attr))
-            for attr in cap_attr:
-                a = getattr(c, attr)
-                d[attr] = str(a) if attr == "containertype" else a
-            caps.append(d)
+        caps = list(self.__geef_adhoc_caps())
         return json.dumps(caps) if as_json else caps
 
     def geef_routes(self, as_json=True):
         # unieke routes (= trajecten)
-        trajecten = self.planning.geef_unieke_trajecten(groepeer_orders=True)
-        routes = []
-        for traject, orders in trajecten.items():
-            d = dict()
-            d["legIds"] = [capaciteit.leg.db_id if capaciteit.leg.db_id != '' else capaciteit.leg.id for capaciteit in
-                           traject]  # moet leg.db_id worden
-            d["containerType"] = str(traject[0].containertype)
-            d["orders"] = []
-            for order, aantal in orders.items():
-                o = dict()
-                o["orderId"] = order.db_id  # moet order.db_id worden
-                o["amount"] = int(aantal)
-                d["orders"].append(o)
-            routes.append(d)
+        trajecten, _ = self.__groepeer_trajecten()
+        routes = list(self.__geef_routes(trajecten))
         return json.dumps(routes) if as_json else routes
 
     def geef_routes_per_order(self, as_json=True):
         # unieke routes (= trajecten) gegroepeerd per order
-        routes = []
-        for order, trajecten in self.planning.geef_unieke_trajecten_per_order().items():
-            for traject, attr in trajecten.items():
-                d = dict()
-                d["orderId"] = order.db_id  # order.id  # moet order.db_id worden
-                d["checkin"] = str(traject[0].leg.checkin)
-                d["vertrek"] = str(traject[0].leg.vertrek)
-                d["aankomst"] = str(traject[-1].leg.aankomst)
-                d["amount"] = int(attr["aantal"])
-                d["containerType"] = str(traject[0].containertype)
-                d["prijs"] = attr["prijs"]
-                d["co2"] = attr["emissie"]
-                d["penalty"] = attr["boete"]
-                d["legIds"] = [capaciteit.leg.db_id if capaciteit.leg.db_id != '' else capaciteit.leg.id for capaciteit
-                               in traject]  # moet leg.db_id worden
-                routes.append(d)
+        _, order_trajecten = self.__groepeer_trajecten()
+        routes = list(self.__geef_routes_per_order(order_trajecten))
         return json.dumps(routes) if as_json else routes
+
+    def schrijf_json(self, bestand):
+        # schrijft legs, adhocLegs, routes en routesPerOrder als 1 json object naar bestand
+        # bestand is een pad (str) of een tekststream met write()
+        # trajecten worden in 1 doorloop gegroepeerd, de json wordt element per element weggeschreven
+        if isinstance(bestand, str):
+            with open(bestand, 'w') as f:
+                self.schrijf_json(f)
+            return
+        trajecten, order_trajecten = self.__groepeer_trajecten()
+        onderdelen = [("legs", self.__geef_leg_gebruik()),
+                      ("adhocLegs", self.__geef_adhoc_caps()),
+                      ("routes", self.__geef_routes(trajecten)),
+                      ("routesPerOrder", self.__geef_routes_per_order(order_trajecten))]
+        bestand.write("{")
+        for i, (naam, elementen) in enumerate(onderdelen):
+            bestand.write((", " if i else "") + json.dumps(naam) + ": [")
+            eerste = True
+            while True:
+                blok = list(islice(elementen, 1024))  # per blok encoderen beperkt het geheugen en de overhead
+                if not blok:
+                    break
+                bestand.write(("" if eerste else ", ") + json.dumps(blok)[1:-1])
+                eerste = False
+            bestand.write("]")
+        bestand.write("}")
@@ -0,0 +1,146 @@
+from __future__ import annotations
+import math
+import random
+from datetime import datetime, timedelta
+from .synchrotool import Planning
+from .data_io import JsonObject, DataFrameDict
+
+DAGEN = ['maandag', 'dinsdag', 'woensdag', 'donderdag', 'vrijdag']
+MODI = ["Truck", "Trein", "Schip"]  # index = modaliteit in de json data
+
+
+class InstantieGenerator:
+
+    def __init__(self, aantal_terminals: int = 4, aantal_verladers: int = 8, legs_per_dag: int = 6,
+                 aantal_orders: int = 20, containers_per_order: int = 3, seed: int = 0, gebied: float = 200.0,
+                 containertype: int = 40, start: datetime = datetime(2021, 3, 1)):
+        # genereert een synthetische planning (zelfde seed = zelfde instantie)
+        # legs rijden op weekdagen tussen terminals, orders gaan van een verlader naar een terminal of verlader
+        # en worden opgehaald enkele uren voor de checkin van een leg
+        # locaties liggen random in een vierkant gebied van gebied x gebied km, de afstandsmatrix is euclidisch
+        # containers_per_order is het maximaal aantal containers per order (minimum 1)
+        # zonder verladers gaan alle orders van terminal naar terminal (dan is de instantie ook zonder adhoc legs,
+        # vb. met LinearProgramming, op te lossen)
+        # start is de maandag van de week waarin de legs rijden
+        if aantal_terminals < 2:
+            raise ValueError("At least 2 terminals are needed to generate legs.")
+        if aantal_verladers < 0 or aantal_orders < 1 or containers_per_order < 1:
+            raise ValueError("Expected at least 1 order and 1 container per order.")
+        self.aantal_terminals = aantal_terminals
+        self.aantal_verladers = aantal_verladers
+        self.legs_per_dag = legs_per_dag
+        self.aantal_orders = aantal_orders
+        self.containers_per_order = containers_per_order
+        self.seed = seed
+        self.gebied = gebied
+        self.containertype = containertype
+        self.start = start
+
+    @property
+    def aantal_containers(self):
+        # verwacht aantal containers
+        return self.aantal_orders * (self.containers_per_order + 1) / 2
+
+    def geef_json(self):
+        # retourneert de data als dict in het formaat van JsonObject
+        r = random.Random(self.seed)
+        terminals = ["T%d" % i for i in range(self.aantal_terminals)]
+        verladers = ["V%d" % i for i in range(self.aantal_verladers)]
+        afstanden = self.__geef_afstanden(r, terminals + verladers)
+        formaat = '%m-%d-%Y %H:%M:%S'
+        containertype = "%dft" % self.containertype
+        legs = []
+        for d, dag in enumerate(DAGEN):
+            for _ in range(self.legs_per_dag):
+                van, naar = r.sample(terminals, 2)
+                modaliteit = r.randint(1, 2)
+                afstand = afstanden[van][naar]
+                checkin = self.start + timedelta(days=d, hours=r.randint(4, 18))
+                duur = min(timedelta(hours=afstand / (50.0 if modaliteit == 1 else 15.0) + 1),
+                           timedelta(hours=23, minutes=59))  # een leg duurt maximaal 1 dag
+                legs.append(dict(id="L%d" % len(legs), van=van + " Terminal", naar=naar + " Terminal", dag=dag,
+                                 modaliteit=modaliteit, checkin=checkin.strftime(formaat),
+                                 vertrek=(checkin + timedelta(hours=1)).strftime(formaat),
+                                 duur_uren=int(duur.total_seconds() // 3600),
+                                 duur_minuten=int(duur.total_seconds() % 3600 // 60),
+                                 containertype=containertype, aantal=r.randint(2, 2 * self.containers_per_order + 2),
+                                 prijs=round(20 + 0.5 * afstand, 2), co2=round(0.03 * afstand, 2)))
+        orders = []
+        vrij = [leg['aantal'] for leg in legs]  # nog niet door een order geclaimde capaciteit per leg
+        for i in range(self.aantal_orders):
+            # elke order hoort bij een leg met genoeg vrije capaciteit (zodat de legs ook gebruikt worden)
+            # zonder verladers rijdt de order dezelfde terminals als die leg, anders van/naar random locaties
+            aantal = r.randint(1, self.containers_per_order)
+            kandidaten = [idx for idx, capaciteit in enumerate(vrij) if capaciteit >= aantal]
+            idx = r.choice(kandidaten) if kandidaten else r.randrange(len(legs))
+            vrij[idx] -= aantal
+            leg = legs[idx]
+            if verladers:
+                van = r.choice(verladers) + " Verlader"
+                naar = r.choice([locatie + (" Terminal" if locatie in terminals else " Verlader")
+                                 for locatie in terminals + verladers if locatie + " Verlader" != van])
+            else:
+                van, naar = leg['van'], leg['naar']
+            checkin = datetime.strptime(leg['checkin'], formaat)
+            ophaaltijd = max(self.start, checkin - timedelta(hours=r.randint(2, 8)))
+            levertijd = ophaaltijd + timedelta(hours=r.randint(12, 24))
+            orders.append(dict(id="O%d" % i, van=van, naar=naar, containertype=containertype, aantal=aantal,
+                               minOphaalTijd=ophaaltijd.strftime(formaat),
+                               maxOphaalTijd=(ophaaltijd + timedelta(hours=12)).strftime(formaat),
+                               minLeverTijd=levertijd.strftime(formaat),
+                               maxLeverTijd=(levertijd + timedelta(days=1)).strftime(formaat),
+                               uitersteLeverTijd=(levertijd + timedelta(days=2)).strftime(formaat),
+                               emissieFactor=0.1, boeteTeVroeg=5, boeteTeLaat=10))
+        return dict(legs=legs, orders=orders, adHocLegAfstanden=afstanden,
+                    adHocLegProperties=dict(snelheid=60, starttarief=100, tarief=2, co2=0.1, voorEnNaTransport=10,
+                                            containergewicht=20))
+
+    def geef_dataframes(self):
+        # retourneert dezelfde data als dict van DataFrames in het formaat van DataFrameDict (zoals ExcelFile)
+        import pandas as pd
+        data = self.geef_json()
+        formaat = '%m-%d-%Y %H:%M:%S'
+
+        def locatie(naam: str):
+            naam, functie = naam.split(" ")
+            return naam + " " + functie[0]
+
+        legs, legcapaciteiten = [], []
+        for leg in data['legs']:
+            checkin = datetime.strptime(leg['checkin'], formaat)
+            vertrek = datetime.strptime(leg['vertrek'], formaat)
+            legs.append(dict(id=leg['id'], van=locatie(leg['van']), naar=locatie(leg['naar']), dag=leg['dag'],
+                             checkin=checkin.time(), vertrek=vertrek.time(),
+                             duur=datetime.min.replace(hour=leg['duur_uren'], minute=leg['duur_minuten']).time(),
+                             modus=MODI[leg['modaliteit']]))
+            legcapaciteiten.append(dict(leg=leg['id'], containertype=self.containertype, aantal=leg['aantal'],
+                                        prijs=leg['prijs'], emissie=leg['co2']))
+        orders, ordercapaciteiten = [], []
+        for order in data['orders']:
+            orders.append(dict(id=order['id'], van=locatie(order['van']), naar=locatie(order['naar']),
+                               min_ophaaltijd=pd.Timestamp(datetime.strptime(order['minOphaalTijd'], formaat)),
+                               max_ophaaltijd=pd.Timestamp(datetime.strptime(order['maxOphaalTijd'], formaat)),
+                               min_levertijd=pd.Timestamp(datetime.strptime(order['minLeverTijd'], formaat)),
+                               max_levertijd=pd.Timestamp(datetime.strptime(order['maxLeverTijd'], formaat)),
+                               uiterste_levertijd=pd.Timestamp(datetime.strptime(order['uitersteLeverTijd'], formaat)),
+                               emissiefactor=order['emissieFactor'], boete_te_vroeg=order['boeteTeVroeg'],
+                               boete_te_laat=order['boeteTeLaat']))
+            ordercapaciteiten.append(dict(order=order['id'], containertype=self.containertype,
+                                          aantal=order['aantal']))
+        eigenschappen = data['adHocLegProperties']
+        adhoc_legs = pd.DataFrame([eigenschappen[sleutel] for sleutel in ('snelheid', 'starttarief', 'tarief', 'co2',
+                                                                           'voorEnNaTransport', 'containergewicht')])
+        return dict(legs=pd.DataFrame(legs), legcapaciteiten=pd.DataFrame(legcapaciteiten),
+                    orders=pd.DataFrame(orders), ordercapaciteiten=pd.DataFrame(ordercapaciteiten),
+                    afstanden=pd.DataFrame(data['adHocLegAfstanden']), adhoc_legs=adhoc_legs)
+
+    def geef_planning(self, naam: str = "") -> Planning:
+        return JsonObject(self.geef_json(), naam).geef_planning_object()
+
+    def geef_planning_uit_dataframes(self, naam: str = "") -> Planning:
+        return DataFrameDict(self.geef_dataframes(), naam).geef_planning_object()
+
+    def __geef_afstanden(self, r: random.Random, namen: list):
+        # euclidische afstanden (km) tussen random punten in het gebied
+        punten = {naam: (r.uniform(0, self.gebied), r.uniform(0, self.gebied)) for naam in namen}
+        return {van: {naar: round(math.dist(punten[van], punten[naar]), 1) for naar in namen} for van in namen}
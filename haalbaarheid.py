@@ -0,0 +1,117 @@
+from __future__ import annotations
+import numpy as np
+from .synchrotool import Planning, geef_tijdstip
+
+
+class Haalbaarheid:
+
+    def __init__(self, planning: Planning, adhoc: bool = True):
+        # snelle analyse (voor het oplossen) van orders die met geen enkel traject tijdig geleverd kunnen worden
+        # adhoc: adhoc legs zijn toegelaten (ALNS), anders enkel legs uit de dienstregeling (LinearProgramming)
+        # de analyse negeert capaciteit en verboden tussenstops: een haalbare order kan dus toch onplanbaar zijn,
+        # een onhaalbare order is zeker niet te plannen
+        self.planning = planning
+        self.adhoc = adhoc and planning.adhoc_legs is not None
+        self.rapport = None
+
+    def __geef_duren(self):
+        # rijtijd van de adhoc legs in minuten tussen alle locaties: array[van.id, naar.id]
+        adhoc_legs = self.planning.adhoc_legs
+        locaties = self.planning.locaties
+        return np.array([[adhoc_legs.geef_duur(adhoc_legs.geef_afstand(van, naar)) if van != naar else 0
+                          for naar in locaties] for van in locaties], dtype=float)
+
+    def analyseer(self):
+        # vroegste aankomst in order.naar per ordercapaciteit, voor alle ordercapaciteiten tegelijk (numpy):
+        # de legs worden 1 keer in volgorde van checkin overlopen (connection scan), een leg kan genomen worden
+        # als de container ten laatste bij de checkin in leg.van is (in order.van: binnen het ophaalvenster)
+        # met adhoc legs kan elke locatie vanaf order.van bereikt worden en order.naar vanaf elke locatie
+        # retourneert het rapport: {order id: dict(haalbaar, beperking, vroegste_aankomst, tekort_uren)}
+        # beperking: None, 'tijdsvenster' (ophaalvenster of uiterste levertijd vóór de min ophaaltijd),
+        # 'containertype' (geen legs met het containertype en geen adhoc legs), 'geen_verbinding' of
+        # 'uiterste_levertijd' (de vroegste aankomst is tekort_uren te laat)
+        planning = self.planning
+        capaciteiten = [oc for oc in planning.ordercapaciteiten
+                        if not all(container_id in planning.geannuleerd for container_id in oc.containers)]
+        self.rapport = dict()
+        if not capaciteiten:
+            return self.rapport
+        rijen = np.arange(len(capaciteiten))
+        van = np.array([oc.order.van.id for oc in capaciteiten])
+        naar = np.array([oc.order.naar.id for oc in capaciteiten])
+        types = np.array([oc.containertype.id for oc in capaciteiten])
+        min_ophaaltijd = np.array([oc.order.min_ophaaltijd_minuut for oc in capaciteiten], dtype=float)
+        max_ophaaltijd = np.array([oc.order.max_ophaaltijd_minuut for oc in capaciteiten], dtype=float)
+        uiterste_levertijd = np.array([oc.order.uiterste_levertijd_minuut for oc in capaciteiten], dtype=float)
+        duren = self.__geef_duren() if self.adhoc else None
+        # aankomst[i, locatie]: vroegste tijd waarop ordercapaciteit i in locatie kan zijn
+        if duren is not None:
+            aankomst = min_ophaaltijd[:, None] + duren[van]
+        else:
+            aankomst = np.full((len(capaciteiten), len(planning.locaties)), np.inf)
+        aankomst[rijen, van] = min_ophaaltijd
+        legs = sorted(planning.legs, key=lambda leg: leg.checkin_minuut)
+        met_type = np.zeros((len(planning.containertypes), len(legs)), dtype=bool)
+        for j, leg in enumerate(legs):
+            for containertype, capaciteit in leg.capaciteiten.items():
+                met_type[containertype.id, j] = capaciteit.aantal > 0
+        for j, leg in enumerate(legs):
+            checkin = leg.checkin_minuut
+            kan = met_type[types, j] & (aankomst[:, leg.van.id] <= checkin) & \
+                ((van != leg.van.id) | (checkin <= max_ophaaltijd))
+            kan &= leg.aankomst_minuut < aankomst[:, leg.naar.id]
+            aankomst[kan, leg.naar.id] = leg.aankomst_minuut
+        if duren is not None:
+            vroegste = (aankomst + duren[:, naar].T).min(axis=1)
+        else:
+            vroegste = aankomst[rijen, naar]
+        venster = (max_ophaaltijd < min_ophaaltijd) | (uiterste_levertijd < min_ophaaltijd)
+        zonder_type = ~met_type[types].any(axis=1) if duren is None else np.zeros(len(capaciteiten), dtype=bool)
+        for i, ordercapaciteit in enumerate(capaciteiten):
+            if venster[i]:
+                beperking = "tijdsvenster"
+            elif zonder_type[i]:
+                beperking = "containertype"
+            elif np.isinf(vroegste[i]):
+                beperking = "geen_verbinding"
+            elif vroegste[i] > uiterste_levertijd[i]:
+                beperking = "uiterste_levertijd"
+            else:
+                beperking = None
+            order = ordercapaciteit.order
+            vorige = self.rapport.get(order.id)
+            if vorige is not None and (not vorige["haalbaar"] or beperking is None):
+                continue  # per order de eerste onhaalbare ordercapaciteit
+            self.rapport[order.id] = dict(
+                haalbaar=beperking is None, beperking=beperking,
+                vroegste_aankomst=None if np.isinf(vroegste[i]) else geef_tijdstip(float(vroegste[i])),
+                tekort_uren=max(0.0, float(vroegste[i] - uiterste_levertijd[i]) / 60.0)
+                if not np.isinf(vroegste[i]) else None)
+        return self.rapport
+
+    def geef_onhaalbare_orders(self):
+        if self.rapport is None:
+            self.analyseer()
+        return [self.planning.orders[order_id] for order_id, analyse in self.rapport.items() if not analyse["haalbaar"]]
+
+    def pas_toe(self, versoepel: bool = False):
+        # sluit de onhaalbare orders uit (Planning.annuleer_order), zodat solvers er geen tijd aan verliezen
+        # versoepel: verleg de uiterste levertijd van orders die enkel te laat zijn naar een haalbare aankomst
+        # (met adhoc legs de aankomst van een rechtstreekse adhoc leg, anders de vroegste aankomst), de
+        # boete te laat blijft dan van toepassing; orders met een andere beperking worden uitgesloten
+        # retourneert dict(uitgesloten=[order ids], versoepeld=[order ids])
+        resultaat = dict(uitgesloten=[], versoepeld=[])
+        duren = self.__geef_duren() if self.adhoc and versoepel else None
+        for order in self.geef_onhaalbare_orders():
+            analyse = self.rapport[order.id]
+            if versoepel and analyse["beperking"] == "uiterste_levertijd":
+                if duren is not None:
+                    uiterste_levertijd = order.min_ophaaltijd_minuut + float(duren[order.van.id, order.naar.id])
+                else:
+                    uiterste_levertijd = analyse["vroegste_aankomst"]
+                self.planning.wijzig_uiterste_levertijd(order, uiterste_levertijd)
+                resultaat["versoepeld"].append(order.id)
+            else:
+                self.planning.annuleer_order(order)
+                resultaat["uitgesloten"].append(order.id)
+        return resultaat
@@ -0,0 +1,97 @@
+from __future__ import annotations
+import cProfile
+import functools
+import json
+import os
+import sys
+from contextlib import contextmanager
+from time import perf_counter
+
+
+class Instrumentatie:
+
+    def __init__(self):
+        # metingen: naam -> [aantal oproepen, totale tijd in sec]
+        # tijden zijn inclusief geneste metingen (vb. een repair operator bevat zijn kandidaat scans)
+        self.actief = False
+        self.metingen = dict()
+        self.cprofile = None  # pad voor een cProfile dump, of None
+        self._profiler = None
+
+    def start(self, cprofile: str = None):
+        # start een nieuwe meting, optioneel met cProfile (dump naar het pad cprofile bij stop)
+        self.metingen = dict()
+        self.cprofile = cprofile
+        if cprofile is not None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self.actief = True
+
+    def stop(self):
+        # stopt de meting en retourneert het rapport
+        self.actief = False
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.cprofile)
+            self._profiler = None
+        return self.rapport()
+
+    def registreer(self, naam: str, duur: float):
+        meting = self.metingen.get(naam)
+        if meting is None:
+            meting = self.metingen[naam] = [0, 0.0]
+        meting[0] += 1
+        meting[1] += duur
+
+    @contextmanager
+    def meet(self, naam: str):
+        # meet de tijd van een blok code: with instrumentatie.meet("naam"): ...
+        if not self.actief:
+            yield
+            return
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.registreer(naam, perf_counter() - start)
+
+    def rapport(self, as_json=False):
+        # retourneert {naam: {aantal, tijd, gemiddelde}}, gesorteerd van traagste naar snelste
+        # als json object (as_json=True) of als dict (as_json=False)
+        rapport = {naam: dict(aantal=aantal, tijd=tijd, gemiddelde=tijd / aantal)
+                   for naam, (aantal, tijd) in sorted(self.metingen.items(), key=lambda item: -item[1][1])}
+        return json.dumps(rapport) if as_json else rapport
+
+
+instrumentatie = Instrumentatie()  # gedeeld door alle solvers, enkel actief tijdens een geïnstrumenteerde solve
+
+
+def gemeten(naam: str):
+    # decorator die de oproepen van een functie meet als de instrumentatie actief is
+    def decorator(functie):
+        @functools.wraps(functie)
+        def wrapper(*args, **kwargs):
+            if not instrumentatie.actief:
+                return functie(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return functie(*args, **kwargs)
+            finally:
+                instrumentatie.registreer(naam, perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def stil():
+    # onderdrukt alle uitvoer naar stdout, ook die van subprocessen (vb. de CBC solver)
+    sys.stdout.flush()
+    origineel = os.dup(1)
+    with open(os.devnull, 'w') as devnull:
+        os.dup2(devnull.fileno(), 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(origineel, 1)
+        os.close(origineel)
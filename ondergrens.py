@@ -0,0 +1,131 @@
+from __future__ import annotations
+import copy
+import heapq
+import numpy as np
+from .synchrotool import Planning
+
+
+class Ondergrens:
+
+    def __init__(self, planning: Planning, adhoc: bool = True):
+        # ondergrens voor de totale kost van een planning waarin alle (haalbare) containers ingepland zijn
+        # adhoc: adhoc legs zijn toegelaten (ALNS), anders enkel legs uit de dienstregeling (LinearProgramming)
+        self.planning = planning
+        self.adhoc = adhoc and planning.adhoc_legs is not None
+
+    def __geef_adhoc_matrices(self):
+        # rijtijd (minuten), prijs en emissie per ton van een adhoc leg tussen alle locaties: arrays[van.id, naar.id]
+        adhoc_legs = self.planning.adhoc_legs
+        locaties = self.planning.locaties
+        afstanden = np.array([[adhoc_legs.geef_afstand(van, naar) if van != naar else 0.0 for naar in locaties]
+                              for van in locaties], dtype=float)
+        duren = np.array([[adhoc_legs.geef_duur(afstand) for afstand in rij]
+                          for rij in afstanden], dtype=float)
+        prijzen = np.where(afstanden > 0, adhoc_legs.starttarief + afstanden * adhoc_legs.tarief, 0.0)
+        return duren, prijzen, adhoc_legs.emissie * afstanden
+
+    def per_ordercapaciteit(self):
+        # goedkoopste traject per container van elke ordercapaciteit, zonder rekening te houden met capaciteit
+        # (kortste pad in tijd-afhankelijk netwerk, voor alle ordercapaciteiten tegelijk): de legs worden in
+        # volgorde van checkin overlopen, een leg kan genomen worden vanaf order.van (binnen het ophaalvenster),
+        # na een adhoc leg vanaf order.van of na een eerder aangekomen leg; het traject eindigt in order.naar of
+        # met een adhoc leg naar order.naar (die wacht tot de min levertijd, zoals maak_leg_na_leg)
+        # retourneert {ordercapaciteit: kost per container}, None als geen enkel traject mogelijk is
+        planning = self.planning
+        capaciteiten = [oc for oc in planning.ordercapaciteiten
+                        if not all(container_id in planning.geannuleerd for container_id in oc.containers)]
+        if not capaciteiten:
+            return dict()
+        rijen = np.arange(len(capaciteiten))
+        orders = [oc.order for oc in capaciteiten]
+        van = np.array([order.van.id for order in orders])
+        naar = np.array([order.naar.id for order in orders])
+        types = np.array([oc.containertype.id for oc in capaciteiten])
+        gewicht = np.array([oc.containertype.gewicht for oc in capaciteiten], dtype=float)
+        factor = np.array([order.emissiefactor for order in orders], dtype=float)
+        min_ophaaltijd, max_ophaaltijd, min_levertijd, max_levertijd, uiterste_levertijd = (
+            np.array([getattr(order, naam + "_minuut") for order in orders], dtype=float)
+            for naam in ("min_ophaaltijd", "max_ophaaltijd", "min_levertijd", "max_levertijd", "uiterste_levertijd"))
+        boete_te_vroeg = np.array([order.boete_te_vroeg for order in orders], dtype=float) / 60.0
+        boete_te_laat = np.array([order.boete_te_laat for order in orders], dtype=float) / 60.0
+
+        def boete(aankomst, te_vroeg=True):
+            kost = np.maximum(aankomst - max_levertijd, 0.0) * boete_te_laat
+            if te_vroeg:
+                kost += np.maximum(min_levertijd - aankomst, 0.0) * boete_te_vroeg
+            return np.where(aankomst <= uiterste_levertijd, kost, np.inf)
+
+        totaal = np.full(len(capaciteiten), np.inf)
+        if self.adhoc:
+            duren, prijzen, emissies = self.__geef_adhoc_matrices()
+
+            def adhoc_kost(van_ids, naar_ids):
+                return prijzen[van_ids, naar_ids] + factor * emissies[van_ids, naar_ids] * gewicht
+
+            # rechtstreekse adhoc leg: vertrek binnen het ophaalvenster met zo weinig mogelijk boete
+            duur = duren[van, naar]
+            vroegst, laatst = min_ophaaltijd + duur, max_ophaaltijd + duur
+            straf = np.where(laatst < min_levertijd, (min_levertijd - laatst) * boete_te_vroeg,
+                             np.maximum(vroegst - max_levertijd, 0.0) * boete_te_laat)
+            totaal = np.where(vroegst <= uiterste_levertijd, adhoc_kost(van, naar) + straf, np.inf)
+        beste = np.full((len(capaciteiten), len(planning.locaties)), np.inf)  # goedkoopst aangekomen per locatie
+        aankomsten = []  # heap met (aankomst, volgnummer, naar id, kost)
+        for j, leg in enumerate(sorted(planning.legs, key=lambda leg: leg.checkin_minuut)):
+            checkin = leg.checkin_minuut
+            while aankomsten and aankomsten[0][0] <= checkin:
+                _, _, locatie, kost = heapq.heappop(aankomsten)
+                np.minimum(beste[:, locatie], kost, out=beste[:, locatie])
+            prijs = np.full(len(planning.containertypes), np.inf)
+            emissie = np.zeros(len(planning.containertypes))
+            for containertype, capaciteit in leg.capaciteiten.items():
+                if capaciteit.aantal > 0:
+                    prijs[containertype.id], emissie[containertype.id] = capaciteit.prijs, capaciteit.emissie
+            start = np.where((van == leg.van.id) & (min_ophaaltijd <= checkin) & (checkin <= max_ophaaltijd),
+                             0.0, beste[:, leg.van.id])
+            if self.adhoc:
+                voor = (van != leg.van.id) & (min_ophaaltijd + duren[van, leg.van.id] <= checkin)
+                start = np.minimum(start, np.where(voor, adhoc_kost(van, leg.van.id), np.inf))
+            kost = start + prijs[types] + factor * emissie[types]
+            if np.isinf(kost).all():
+                continue
+            aankomst = leg.aankomst_minuut
+            einde = np.where(naar == leg.naar.id, kost + boete(np.full(len(capaciteiten), float(aankomst))), np.inf)
+            if self.adhoc:
+                na = np.where(naar != leg.naar.id, kost + adhoc_kost(leg.naar.id, naar) +
+                              boete(aankomst + duren[leg.naar.id, naar], te_vroeg=False), np.inf)
+                einde = np.minimum(einde, na)
+            np.minimum(totaal, einde, out=totaal)
+            heapq.heappush(aankomsten, (aankomst, j, leg.naar.id, kost))
+        return {oc: None if np.isinf(totaal[i]) else float(totaal[i]) for i, oc in zip(rijen, capaciteiten)}
+
+    def geef_lp_relaxatie(self):
+        # objective van de LP relaxatie van het LinearProgramming model op het gereduceerde netwerk (Planning.reduce)
+        # enkel een ondergrens als er geen adhoc legs gebruikt worden (het LP model kent geen adhoc legs)
+        # retourneert None als de relaxatie onhaalbaar is
+        from .optimalisatie import LinearProgramming  # optimalisatie gebruikt deze module
+        if self.adhoc:
+            raise ValueError("The LP relaxation is only a lower bound without adhoc legs.")
+        kopie = copy.deepcopy(self.planning)
+        kopie.verwijder_alle_trajecten()
+        kopie.reduce()
+        return LinearProgramming(kopie).solve_relaxation()
+
+    def bereken(self, lp: bool = False):
+        # retourneert dict(kortste_pad, lp_relaxatie, ondergrens, onhaalbaar): onhaalbare containers (zonder
+        # traject) tellen niet mee in kortste_pad, lp_relaxatie enkel met lp=True (zie geef_lp_relaxatie)
+        kortste_pad = 0.0
+        onhaalbaar = 0
+        for ordercapaciteit, kost in self.per_ordercapaciteit().items():
+            aantal = sum(container_id not in self.planning.geannuleerd for container_id in ordercapaciteit.containers)
+            if kost is None:
+                onhaalbaar += aantal
+            else:
+                kortste_pad += aantal * kost
+        lp_relaxatie = self.geef_lp_relaxatie() if lp else None
+        ondergrens = kortste_pad if lp_relaxatie is None else max(kortste_pad, lp_relaxatie)
+        return dict(kortste_pad=kortste_pad, lp_relaxatie=lp_relaxatie, ondergrens=ondergrens, onhaalbaar=onhaalbaar)
+
+    @staticmethod
+    def geef_gap(kost: float, ondergrens: float):
+        # relatieve optimaliteitsgap (kost - ondergrens) / kost, 0 als de kost niet boven de ondergrens ligt
+        return max(0.0, (kost - ondergrens) / kost) if kost > 0 else 0.0
@@ -0,0 +1,116 @@
+from __future__ import annotations
+import math
+import zlib
+import numpy as np
+from .synchrotool import Planning, EPOCH, MICROSECONDE
+
+RECHTSTREEKS, VOOR, NA = 0, 1, 2  # soort adhoc leg: order.van -> order.naar, order.van -> anker, anker -> order.naar
+
+
+def geef_vingerafdruk(planning: Planning):
+    # crc32 van de legcapaciteiten (leg id, containertype id) en de containertypes van de containers
+    legcapaciteiten = np.array([(lc.leg.id, lc.containertype.id) for lc in planning.legcapaciteiten], dtype=np.int32)
+    containers = np.array([ordercapaciteit.containertype.id for ordercapaciteit in planning.containers], dtype=np.int32)
+    return zlib.crc32(containers.tobytes(), zlib.crc32(legcapaciteiten.tobytes()))
+
+
+class Oplossing:
+
+    def __init__(self, lengtes: np.ndarray, capaciteiten: np.ndarray, adhoc: np.ndarray, vingerafdruk: int):
+        # compacte oplossing van een planning, enkel te gebruiken met dezelfde basisplanning (zelfde legcapaciteiten
+        # en containers, zie geef_vingerafdruk), vb. om een oplossing tussen processen door te geven of te bewaren
+        # lengtes: int32 per container het aantal legcapaciteiten van het traject, -1 = niet ingepland
+        # capaciteiten: int32 de trajecten na elkaar, index in planning.legcapaciteiten of -1 - rij in adhoc
+        # adhoc: int64 per adhoc leg (soort, anker locatie id, checkin, vertrek, aankomst) met tijden in
+        # microseconden sinds EPOCH (exact, adhoc legs vallen niet op hele minuten); van en naar volgen uit de
+        # order en het anker, prijs en emissie uit de AdhocLegs
+        self.lengtes = lengtes
+        self.capaciteiten = capaciteiten
+        self.adhoc = adhoc
+        self.vingerafdruk = vingerafdruk
+
+    @classmethod
+    def van_planning(cls, planning: Planning):
+        indexen = {legcapaciteit: i for i, legcapaciteit in enumerate(planning.legcapaciteiten)}
+        lengtes = np.full(len(planning.containers), -1, dtype=np.int32)
+        capaciteiten = []
+        adhoc = []
+        for container_id, traject in enumerate(planning.trajecten):
+            if container_id not in planning.gepland:
+                continue
+            lengtes[container_id] = len(traject)
+            for legcapaciteit in traject:
+                if legcapaciteit.is_adhoc:
+                    adhoc.append(cls.__codeer_adhoc(planning, planning.containers[container_id], legcapaciteit))
+                    capaciteiten.append(-len(adhoc))
+                else:
+                    capaciteiten.append(indexen[legcapaciteit])
+        return cls(lengtes, np.array(capaciteiten, dtype=np.int32), np.array(adhoc, dtype=np.int64).reshape(-1, 5),
+                   geef_vingerafdruk(planning))
+
+    @staticmethod
+    def __codeer_adhoc(planning: Planning, ordercapaciteit, legcapaciteit):
+        order = ordercapaciteit.order
+        leg = legcapaciteit.leg
+        if leg.van == order.van and leg.naar == order.naar:
+            soort, anker = RECHTSTREEKS, -1
+        elif leg.van == order.van:
+            soort, anker = VOOR, leg.naar.id
+        elif leg.naar == order.naar:
+            soort, anker = NA, leg.van.id
+        else:
+            raise ValueError("Adhoc leg %s of order %s does not start or end at the order." % (leg, order.id))
+        prijs, emissie = planning.adhoc_legs.geef_prijs_emissie(leg.van, leg.naar, legcapaciteit.containertype)
+        if not (math.isclose(prijs, legcapaciteit.prijs) and math.isclose(emissie, legcapaciteit.emissie)):
+            raise ValueError("Adhoc leg %s does not match the tariffs of the adhoc legs." % leg)
+        return (soort, anker) + tuple((tijdstip - EPOCH) // MICROSECONDE
+                                      for tijdstip in (leg.checkin, leg.vertrek, leg.aankomst))
+
+    def herstel(self, planning: Planning, container_ids: list = None, legcapaciteit_indexen: list = None):
+        # kent de trajecten toe aan de containers van planning (huidige trajecten worden verwijderd)
+        # container_ids en legcapaciteit_indexen: de oplossing is die van een deelplanning en wordt samengevoegd
+        # in planning (zie Planning.maak_deelplanning en voeg_toewijzing_samen)
+        if container_ids is None:
+            if len(self.lengtes) != len(planning.containers) or self.vingerafdruk != geef_vingerafdruk(planning):
+                raise ValueError("The solution does not belong to this planning.")
+            container_ids = range(len(planning.containers))
+        elif len(self.lengtes) != len(container_ids):
+            raise ValueError("Expected %d container ids, got %d." % (len(self.lengtes), len(container_ids)))
+        capaciteiten = self.capaciteiten.tolist()
+        adhoc = self.adhoc.tolist()
+        begin = 0
+        for container_id, lengte in zip(container_ids, self.lengtes.tolist()):
+            if container_id in planning.gepland:
+                planning.verwijder_container_traject(container_id)
+            if lengte < 0:
+                continue
+            ordercapaciteit = planning.containers[container_id]
+            traject = []
+            for element in capaciteiten[begin:begin + lengte]:
+                if element >= 0:
+                    index = element if legcapaciteit_indexen is None else legcapaciteit_indexen[element]
+                    traject.append(planning.legcapaciteiten[index])
+                else:
+                    soort, anker, checkin, vertrek, aankomst = adhoc[-1 - element]
+                    order = ordercapaciteit.order
+                    van = planning.locaties[anker] if soort == NA else order.van
+                    naar = planning.locaties[anker] if soort == VOOR else order.naar
+                    checkin, vertrek, aankomst = (EPOCH + tijd * MICROSECONDE for tijd in (checkin, vertrek, aankomst))
+                    traject.append(planning.adhoc_legs.maak_leg_tussen(van, naar, ordercapaciteit.containertype,
+                                                                       checkin, vertrek, aankomst))
+            begin += lengte
+            planning.voeg_container_traject_toe(container_id, *traject)
+
+    def naar_bytes(self):
+        kop = np.array([len(self.lengtes), len(self.capaciteiten), len(self.adhoc), self.vingerafdruk], dtype=np.int64)
+        return kop.tobytes() + self.lengtes.tobytes() + self.capaciteiten.tobytes() + self.adhoc.tobytes()
+
+    @classmethod
+    def van_bytes(cls, data: bytes):
+        containers, capaciteiten, adhoc, vingerafdruk = np.frombuffer(data, dtype=np.int64, count=4).tolist()
+        einde = 32 + 4 * (containers + capaciteiten)  # na de kop en de int32 waarden volgen de int64 adhoc legs
+        if len(data) != einde + 40 * adhoc:
+            raise ValueError("Invalid solution data.")
+        waarden = np.frombuffer(data, dtype=np.int32, offset=32, count=containers + capaciteiten)
+        return cls(waarden[:containers], waarden[containers:], np.frombuffer(data, dtype=np.int64, offset=einde)
+                   .reshape(-1, 5), vingerafdruk)
@@ -1,56 +1,128 @@
+from __future__ import annotations
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+import bisect
 import copy
+import heapq
+import json
+import os
 import random
+from itertools import count
 from time import time
-from datetime import datetime
+from datetime import timedelta
+import numpy as np
 from numpy.random import RandomState
-import pulp
-import alns
-import matplotlib.pyplot as plt
-from .synchrotool import Planning, Container
+from .synchrotool import Planning, Container, MINUUT, geef_tijdstip
+from .haalbaarheid import Haalbaarheid
+from .ondergrens import Ondergrens
+from .oplossing import Oplossing
+from .instrumentatie import instrumentatie, gemeten
+from .statistieken import Statistieken
 
 
 class Methode(ABC):
+    adhoc = True  # gebruikt de methode adhoc legs?
 
     def __init__(self, planning: Planning):
         self.planning = planning
+        self.instrumentation = False
+        self.cprofile = None
+        self.report = None  # rapport van de laatste geïnstrumenteerde solve
+        self.feasibility = None  # None, 'exclude' of 'relax'
+        self.feasibility_report = None  # rapport van Haalbaarheid.analyseer bij de laatste solve
 
     @abstractmethod
     def solve(self):
         pass
 
+    def add_instrumentation(self, cprofile: str = None):
+        # meet tijd en aantal oproepen per operator, fase en constraint familie tijdens solve
+        # cprofile: optioneel pad voor een cProfile dump van de volledige solve
+        self.instrumentation = True
+        self.cprofile = cprofile
+
+    @contextmanager
+    def _instrumentation(self):
+        # meet de solve in het with blok als add_instrumentation opgeroepen is, de meting (en cProfile) stopt
+        # ook als de solve een exception geeft: de instrumentatie is gedeeld door alle solvers
+        if not self.instrumentation:
+            yield
+            return
+        instrumentatie.start(self.cprofile)
+        try:
+            yield
+        finally:
+            self.report = instrumentatie.stop()
+
+    def add_feasibility_check(self, relax: bool = False):
+        # analyseert voor solve welke orders onhaalbaar zijn (zie Haalbaarheid) en sluit ze uit
+        # relax: verleg de uiterste levertijd van orders die enkel te laat zijn in plaats van ze uit te sluiten
+        self.feasibility = "relax" if relax else "exclude"
+
+    def _check_feasibility(self):
+        if self.feasibility is None:
+            return
+        with instrumentatie.meet("Methode.feasibility"):
+            haalbaarheid = Haalbaarheid(self.planning, self.adhoc)
+            self.feasibility_report = haalbaarheid.analyseer()
+            resultaat = haalbaarheid.pas_toe(versoepel=self.feasibility == "relax")
+        if resultaat["uitgesloten"] or resultaat["versoepeld"]:
+            print("Infeasible orders excluded:", len(resultaat["uitgesloten"]), "relaxed:", len(resultaat["versoepeld"]))
+
+    def instrumentation_report(self, as_json=True):
+        # retourneert het rapport van de laatste geïnstrumenteerde solve: {naam: {aantal, tijd, gemiddelde}}
+        # als json object (as_json=True) of als dict (as_json=False)
+        return json.dumps(self.report) if as_json else self.report
+
 
 class LinearProgramming(Methode):
+    adhoc = False
 
     def __init__(self, planning: Planning):
+        import pulp  # de LP backend wordt pas geladen als een LinearProgramming gemaakt wordt
         Methode.__init__(self, planning)
         self.pulp = pulp.LpProblem(planning.naam, pulp.LpMinimize)
         self._x = {}  # binary variable x to state leg i is chosen by container k or not
         self._y = {}  # binary variable y to state two adjacent legs are both used by container k or not
+        self._componenten = {}  # (container, prijs, emissie, uren te vroeg, uren te laat) per variable x
 
     def _decision_variables(self):
-        for k in range(len(self.planning.containers)):
+        import pulp
+        for k in (c.id for c in self.planning.geef_containers()):
             for l1 in self.planning.legs:
                 self._x[k, l1.id] = pulp.LpVariable("x_(%s_%s)" % (k, l1.id), cat=pulp.LpBinary)
                 for l2 in self.planning.legs:
                     if l1.naar == l2.van:
                         self._y[k, l1.id, l2.id] = pulp.LpVariable("y_(%s_%s_%s)" % (k, l1.id, l2.id), cat=pulp.LpBinary)
 
-    def __aantal_uren(self, t1: datetime, t2: datetime):
-        # aantal uren tussen t1 en t2
-        return (t2 - t1).total_seconds() / 3600.0
+    @staticmethod
+    def __aantal_uren(t1: int, t2: int):
+        # aantal uren tussen t1 en t2 (in minuten sinds EPOCH)
+        return (t2 - t1) / 60.0
 
     def _objective_function(self):
-        self.pulp += pulp.lpSum([self._x[c.id, l.id] * (l.prijs(c.containertype)
-                                                        + l.emissie(c.containertype) * c.emissiefactor)  # f_c + f_e
-                                 for l in self.planning.legs for c in self.planning.geef_containers()]) + \
-                     pulp.lpSum([self._x[c.id, l.id] * (c.boete_te_vroeg *
-                                                        max(self.__aantal_uren(l.aankomst, c.min_levertijd), 0) +  # f_early
-                                                        c.boete_te_laat *
-                                                        max(self.__aantal_uren(c.max_levertijd, l.aankomst), 0))   # f_late
-                                 for l in self.planning.legs for c in self.planning.geef_containers() if c.naar == l.naar])
+        # de coëfficiënten volgen uit componenten die niet afhangen van de emissiefactor en boetes van de orders
+        for c in self.planning.geef_containers():
+            for l in self.planning.legs:
+                uren_te_vroeg = uren_te_laat = 0
+                if c.naar == l.naar:
+                    uren_te_vroeg = max(self.__aantal_uren(l.aankomst_minuut, c.order.min_levertijd_minuut), 0)
+                    uren_te_laat = max(self.__aantal_uren(c.order.max_levertijd_minuut, l.aankomst_minuut), 0)
+                self._componenten[c.id, l.id] = (c, l.prijs(c.containertype), l.emissie(c.containertype),
+                                                 uren_te_vroeg, uren_te_laat)
+        self.update_objective()
+
+    def update_objective(self):
+        # vervangt de objective na een wijziging van emissiefactor of boetes (Planning.wijzig_kostparameters),
+        # variabelen en constraints van het model blijven behouden
+        import pulp
+        self.pulp.setObjective(pulp.LpAffineExpression(
+            (self._x[sleutel], prijs + emissie * c.emissiefactor  # f_c + f_e
+             + c.boete_te_vroeg * uren_te_vroeg + c.boete_te_laat * uren_te_laat)  # f_early + f_late
+            for sleutel, (c, prijs, emissie, uren_te_vroeg, uren_te_laat) in self._componenten.items()))
 
     def _leg_constraints(self):
+        import pulp
         for c in self.planning.geef_containers():
             for v in self.planning.locaties:
                 rhs = -1 if v == c.van else 1 if v == c.naar else 0
@@ -58,6 +130,7 @@ class LinearProgramming(Methode):
                              pulp.lpSum([self._x[c.id, l.id] for l in self.planning.legs if l.van  == v]) == rhs
 
     def _capacity_constraints(self):
+        import pulp
         for s in self.planning.containertypes:
             for l in self.planning.legs:
                 self.pulp += l.aantal(s) - \
@@ -65,35 +138,72 @@ class LinearProgramming(Methode):
                                          if c.containertype == s]) >= 0
 
     def _time_constraints(self):
+        # tijden in minuten sinds EPOCH
         for c in self.planning.geef_containers():
+            o = c.order
             for l1 in self.planning.legs:
                 # departure
                 if c.van == l1.van:
-                    self.pulp += self._x[c.id, l1.id] * (c.min_ophaaltijd - l1.checkin).total_seconds() <= 0
-                    self.pulp += self._x[c.id, l1.id] * (l1.checkin - c.max_ophaaltijd).total_seconds() <= 0
+                    self.pulp += self._x[c.id, l1.id] * (o.min_ophaaltijd_minuut - l1.checkin_minuut) <= 0
+                    self.pulp += self._x[c.id, l1.id] * (l1.checkin_minuut - o.max_ophaaltijd_minuut) <= 0
                 # arrival
                 if c.naar == l1.naar:
-                    self.pulp += self._x[c.id, l1.id] * (l1.aankomst - c.uiterste_levertijd).total_seconds() <= 0
+                    self.pulp += self._x[c.id, l1.id] * (l1.aankomst_minuut - o.uiterste_levertijd_minuut) <= 0
                 # time windows
                 for l2 in self.planning.legs:
                     if l1.naar == l2.van:
-                        self.pulp += self._y[c.id, l1.id, l2.id] * (l1.aankomst - l2.checkin).total_seconds() <= 0
+                        self.pulp += self._y[c.id, l1.id, l2.id] * (l1.aankomst_minuut - l2.checkin_minuut) <= 0
                         self.pulp += (self._x[c.id, l1.id] + self._x[c.id, l2.id] - self._y[c.id, l1.id, l2.id] - 1.5) <= 0
                         self.pulp += (2 * self._y[c.id, l1.id, l2.id] - self._x[c.id, l1.id] - self._x[c.id, l2.id] - 0.5) <= 0
 
-    def solve(self):
+    def solve(self, time_limit: float = None, warm_start: bool = False):
+        # time_limit in sec voor de solver (CBC), None = geen limiet
+        # een volgende solve hergebruikt het model (vb. na update_objective), de trajecten worden vervangen
+        # warm_start: start CBC vanaf de vorige oplossing van het model
+        import pulp
         start = time()
-        self._decision_variables()
-        self._objective_function()
-        self._leg_constraints()
-        self._capacity_constraints()
-        self._time_constraints()
-        self.pulp.solve()
-        print("Elapsed time:", round(time() - start, 2), 'sec')
-        print("Solution status:", pulp.LpStatus[self.pulp.status])
-        if self.pulp.status == 1:  # feasible
-            self._get_solution()
-            print("Minimal cost:", pulp.value(self.pulp.objective))
+        with self._instrumentation():
+            if self._x:
+                self.planning.verwijder_alle_trajecten()
+            else:
+                self._check_feasibility()
+                self._build_model()
+            with instrumentatie.meet("LinearProgramming.solver"):
+                self.pulp.solve(None if time_limit is None and not warm_start
+                                else pulp.PULP_CBC_CMD(timeLimit=time_limit, warmStart=warm_start))
+            print("Elapsed time:", round(time() - start, 2), 'sec')
+            print("Solution status:", pulp.LpStatus[self.pulp.status])
+            if self.pulp.status == 1:  # feasible
+                with instrumentatie.meet("LinearProgramming._get_solution"):
+                    self._get_solution()
+                print("Minimal cost:", pulp.value(self.pulp.objective))
+
+    def _build_model(self):
+        with instrumentatie.meet("LinearProgramming._decision_variables"):
+            self._decision_variables()
+        with instrumentatie.meet("LinearProgramming._objective_function"):
+            self._objective_function()
+        with instrumentatie.meet("LinearProgramming._leg_constraints"):
+            self._leg_constraints()
+        with instrumentatie.meet("LinearProgramming._capacity_constraints"):
+            self._capacity_constraints()
+        with instrumentatie.meet("LinearProgramming._time_constraints"):
+            self._time_constraints()
+
+    def solve_relaxation(self):
+        # lost de LP relaxatie op (x en y continu tussen 0 en 1), de planning wordt niet gewijzigd
+        # retourneert de objective, een ondergrens voor de kost van elke planning zonder adhoc legs,
+        # of None als de relaxatie onhaalbaar is
+        import pulp
+        if not self._x:
+            self._build_model()
+        variabelen = self.pulp.variables()
+        for variabele in variabelen:
+            variabele.cat = pulp.LpContinuous
+        self.pulp.solve(pulp.PULP_CBC_CMD(msg=False))
+        for variabele in variabelen:
+            variabele.cat = pulp.LpBinary
+        return pulp.value(self.pulp.objective) if self.pulp.status == 1 else None
 
     def _get_solution(self):
         for c in self.planning.geef_containers():
@@ -107,9 +217,11 @@ class LinearProgramming(Methode):
 
 class MaakContainerTraject:
 
-    def __init__(self, planning: Planning, container: Container = None):
+    def __init__(self, planning: Planning, container: Container = None, random_state: RandomState = None):
+        # random_state wordt gebruikt voor random trajecten (anders de random module)
         self.planning = planning
         self.container = container
+        self.random_state = random_state
 
     def maak_greedy_traject(self, van_naar=True):
         # van_naar = True: traject wordt geconstrueerd van container.van naar container.naar
@@ -125,12 +237,44 @@ class MaakContainerTraject:
         # van_naar = True: traject wordt geconstrueerd van container.van naar container.naar
         # van_naar = False: traject wordt omgekeerd geconstrueerd van container.naar naar container.van
         def selecteer(capaciteiten):
-            return random.choice([capaciteit for capaciteit in capaciteiten])
+            capaciteiten = [capaciteit for capaciteit in capaciteiten]
+            if self.random_state is not None:
+                return capaciteiten[self.random_state.randint(len(capaciteiten))]
+            return random.choice(capaciteiten)
         if van_naar:
             return self.__maak_traject_van_naar(selecteer)
         else:
             return self.__maak_traject_naar_van(selecteer)
 
+    def maak_kandidaat_trajecten(self, k: int = 3):
+        # maakt tot k + 1 verschillende trajecten voor self.container
+        # het i-de traject start met de i-de goedkoopste startcapaciteit en wordt verder greedy geconstrueerd,
+        # aangevuld met het omgekeerd geconstrueerde greedy traject
+        # lege trajecten (geen traject mogelijk) worden niet geretourneerd
+        def selecteer_start(i):
+            gekozen = []
+
+            def selecteer(capaciteiten):
+                if gekozen:
+                    capaciteit = min(capaciteiten, key=capaciteiten.get)
+                else:
+                    gesorteerd = sorted(capaciteiten, key=capaciteiten.get)
+                    capaciteit = gesorteerd[min(i, len(gesorteerd) - 1)]
+                gekozen.append(capaciteit)
+                return capaciteit
+            return selecteer
+
+        trajecten = [self.__maak_traject_van_naar(selecteer_start(i)) for i in range(k)]
+        trajecten.append(self.maak_greedy_traject(van_naar=False))
+        uniek = dict()
+        for traject in trajecten:
+            # adhoc capaciteiten zijn telkens nieuwe objecten: vergelijk ze op hun route en tijden
+            sleutel = tuple((lc.leg.van, lc.leg.naar, lc.leg.vertrek_minuut) if lc.is_adhoc else lc for lc in traject)
+            if traject and sleutel not in uniek:
+                uniek[sleutel] = traject
+        return list(uniek.values())
+
+    @gemeten("MaakContainerTraject.schat_totale_kost")
     def __schat_totale_kost(self, capaciteiten, van_naar=True):
         capaciteiten = {capaciteit: self.planning.adhoc_legs.schat_totale_kost(capaciteit, self.container, van_naar)
                         for capaciteit in capaciteiten}
@@ -154,9 +298,10 @@ class MaakContainerTraject:
             locaties.add(self.container.van)  # voeg startlocatie toe aan locaties die verboden zijn
         if self.container.naar in locaties:
             locaties.remove(self.container.naar)  # verwijder eindlocatie uit locaties die verboden zijn
-        capaciteiten = [lc for lc in self.planning.legcapaciteiten
-                        if lc.is_mogelijk_begin(self.container) and lc.leg.naar not in locaties
-                        and self.__check_levertijd(lc)]  # alle mogelijke startcapaciteiten
+        with instrumentatie.meet("MaakContainerTraject.scan"):
+            capaciteiten = [lc for lc in self.planning.legcapaciteiten
+                            if lc.is_mogelijk_begin(self.container) and lc.leg.naar not in locaties
+                            and self.__check_levertijd(lc)]  # alle mogelijke startcapaciteiten
         capaciteiten = self.__schat_totale_kost(capaciteiten)
         if not capaciteiten:  # geen startcapaciteiten: maak een adhoc capaciteit voor het ganse traject
             capaciteit = self.planning.adhoc_legs.maak_leg(self.container)
@@ -170,9 +315,10 @@ class MaakContainerTraject:
                 return traject
             else:
                 locaties.add(capaciteit.leg.naar)  ###
-                capaciteiten = [lc for lc in self.planning.legcapaciteiten
-                                if lc.komt_na(capaciteit) and lc.leg.naar not in locaties
-                                and self.__check_levertijd(lc)]  # alle mogelijke volgende capaciteiten ###
+                with instrumentatie.meet("MaakContainerTraject.scan"):
+                    capaciteiten = [lc for lc in self.planning.legcapaciteiten
+                                    if lc.komt_na(capaciteit) and lc.leg.naar not in locaties
+                                    and self.__check_levertijd(lc)]  # alle mogelijke volgende capaciteiten ###
                 capaciteiten = self.__schat_totale_kost(capaciteiten)
                 if not capaciteiten:  # geen capaciteit gevonden: creëer adhoc capaciteit tot eindbestemming
                     capaciteit = None
@@ -204,9 +350,10 @@ class MaakContainerTraject:
             locaties.remove(self.container.van)  # verwijder startlocatie uit locaties die verboden zijn
         if self.container.naar not in locaties:
             locaties.add(self.container.naar)  # voeg eindlocatie toe aan locaties die verboden zijn
-        capaciteiten = [lc for lc in self.planning.legcapaciteiten
-                        if lc.is_mogelijk_einde(self.container) and lc.leg.van not in locaties
-                        and self.__check_ophaaltijd(lc)]  # alle mogelijke eindcapaciteiten
+        with instrumentatie.meet("MaakContainerTraject.scan"):
+            capaciteiten = [lc for lc in self.planning.legcapaciteiten
+                            if lc.is_mogelijk_einde(self.container) and lc.leg.van not in locaties
+                            and self.__check_ophaaltijd(lc)]  # alle mogelijke eindcapaciteiten
         capaciteiten = self.__schat_totale_kost(capaciteiten)
         if not capaciteiten:  # geen eindcapaciteiten: maak een adhoc capaciteit voor het ganse traject
             capaciteit = self.planning.adhoc_legs.maak_leg(self.container)
@@ -221,9 +368,10 @@ class MaakContainerTraject:
                 return traject
             else:
                 locaties.add(capaciteit.leg.van)  ###
-                capaciteiten = [lc for lc in self.planning.legcapaciteiten
-                                if lc.komt_voor(capaciteit) and lc.leg.van not in locaties
-                                and self.__check_ophaaltijd(lc)]  # alle mogelijke voorgaande capaciteiten ###
+                with instrumentatie.meet("MaakContainerTraject.scan"):
+                    capaciteiten = [lc for lc in self.planning.legcapaciteiten
+                                    if lc.komt_voor(capaciteit) and lc.leg.van not in locaties
+                                    and self.__check_ophaaltijd(lc)]  # alle mogelijke voorgaande capaciteiten ###
                 capaciteiten = self.__schat_totale_kost(capaciteiten)
                 if not capaciteiten:  # geen capaciteit gevonden: creëer adhoc capaciteit tot startbestemming
                     capaciteit = None
@@ -240,12 +388,13 @@ class MaakContainerTraject:
                     return traject
 
 
-class PlanningState(alns.State):
+class PlanningState:
 
     def __init__(self, planning: Planning, degree_of_destruction=0.25):
         self.planning = planning
         self.degree_of_destruction = degree_of_destruction
 
+    @gemeten("PlanningState.objective")
     def objective(self):
         return self.planning.geef_totale_kost() / 1000.0
 
@@ -254,34 +403,209 @@ class PlanningState(alns.State):
 
 
 def worst_removal(state: PlanningState, random_state):
-    worst = sorted(list(range(len(state.planning.containers))),
-                   key=lambda container_id: state.planning.kosten[container_id], reverse=True)
+    # ordercapaciteiten (= equivalentieklassen van containers) worden gerangschikt volgens hun duurste container
+    # binnen een ordercapaciteit worden de duurste trajecten eerst verwijderd
+    # de duurste containers komen uit de kosten_heap van de planning, containers zonder kost worden genegeerd
+    planning = state.planning
+    aantal = state.aantal_te_verwijderen_trajecten()
+    verwijderen = []
+    klassen = set()
+    for container_id in planning.geef_duurste_containers(aantal):
+        ordercapaciteit = planning.containers[container_id]
+        if ordercapaciteit in klassen:
+            continue
+        klassen.add(ordercapaciteit)
+        container_ids = sorted([i for i in ordercapaciteit.containers if planning.kosten[i] is not None],
+                               key=lambda i: planning.kosten[i], reverse=True)
+        verwijderen += container_ids[:aantal - len(verwijderen)]
+        if len(verwijderen) >= aantal:
+            break
     destroyed = copy.deepcopy(state)
-    for i in range(state.aantal_te_verwijderen_trajecten()):
-        destroyed.planning.verwijder_container_traject(worst[i])
+    for i in verwijderen:
+        destroyed.planning.verwijder_container_traject(i)
     return destroyed
 
 
-def random_removal(state: PlanningState, random_state):
+def __verwantschap(planning: Planning, container1: int, container2: int):
+    # Shaw verwantschap tussen 2 containers (lager is meer verwant), uitgedrukt in uren:
+    # verschil in ophaal- en levertijd, 24 uur per verschillende van of naar,
+    # -24 uur per gedeelde legcapaciteit met een bezettingsgraad (0..1) als gewicht
+    order1 = planning.containers[container1].order
+    order2 = planning.containers[container2].order
+    verwantschap = (abs(order1.min_ophaaltijd_minuut - order2.min_ophaaltijd_minuut) +
+                    abs(order1.max_levertijd_minuut - order2.max_levertijd_minuut)) / 60.0
+    if order1.van != order2.van:
+        verwantschap += 24.0
+    if order1.naar != order2.naar:
+        verwantschap += 24.0
+    traject2 = planning.trajecten[container2]
+    for legcapaciteit in planning.trajecten[container1]:
+        if not legcapaciteit.is_adhoc and legcapaciteit in traject2:
+            verwantschap -= 24.0 * len(legcapaciteit.containers) / legcapaciteit.aantal
+    return verwantschap
+
+
+def related_removal(state: PlanningState, random_state, determinisme: float = 6.0):
+    # Shaw removal: start met een willekeurige container en verwijdert telkens een container die verwant is
+    # aan een reeds verwijderde container (gedeelde, drukke legs, tijdvensters, van en naar)
+    # kandidaten komen uit Planning.geef_verwante_containers (sublineair in het aantal containers)
+    # determinisme >= 1: hoe groter, hoe vaker de meest verwante kandidaat gekozen wordt
+    planning = state.planning
+    aantal = state.aantal_te_verwijderen_trajecten()
+    verwijderen = []
+    verwijderd = set()
+    while len(verwijderen) < min(aantal, len(planning.gepland)):
+        kandidaten = []
+        if verwijderen:
+            referentie = verwijderen[random_state.randint(len(verwijderen))]
+            kandidaten = [i for i in planning.geef_verwante_containers(referentie)
+                          if i not in verwijderd and i in planning.gepland]
+        if kandidaten:
+            kandidaten.sort(key=lambda i: (__verwantschap(planning, referentie, i), i))
+            container_id = kandidaten[int(random_state.random_sample() ** determinisme * len(kandidaten))]
+        else:  # geen (nieuwe) verwante containers: start opnieuw met een willekeurige ingeplande container
+            container_id = int(random_state.randint(len(planning.containers)))
+            if container_id in verwijderd or container_id not in planning.gepland:
+                continue
+        verwijderen.append(container_id)
+        verwijderd.add(container_id)
     destroyed = copy.deepcopy(state)
-    for i in random_state.choice(len(state.planning.trajecten),
-                                 state.aantal_te_verwijderen_trajecten(), replace=False):
+    for i in verwijderen:
         destroyed.planning.verwijder_container_traject(i)
     return destroyed
 
 
+def leg_removal(state: PlanningState, random_state):
+    # maakt volledige legcapaciteiten leeg, gekozen met een kans evenredig met hun bezettingsgraad,
+    # tot het aantal te verwijderen trajecten bereikt is
+    # de selectie loopt over de legcapaciteiten, niet over de containers
+    planning = state.planning
+    aantal = state.aantal_te_verwijderen_trajecten()
+    legcapaciteiten = [lc for lc in planning.legcapaciteiten if lc.containers]
+    verwijderd = set()
+    if legcapaciteiten:
+        bezetting = [len(lc.containers) / lc.aantal for lc in legcapaciteiten]
+        totaal = sum(bezetting)
+        kansen = [b / totaal for b in bezetting]
+        for k in random_state.choice(len(legcapaciteiten), len(legcapaciteiten), replace=False, p=kansen):
+            verwijderd.update(legcapaciteiten[k].containers)
+            if len(verwijderd) >= aantal:
+                break
+    destroyed = copy.deepcopy(state)
+    for i in sorted(verwijderd):
+        destroyed.planning.verwijder_container_traject(i)
+    return destroyed
+
+
+def random_removal(state: PlanningState, random_state):
+    # willekeurige ordercapaciteiten (= equivalentieklassen van containers) worden leeggemaakt
+    # tot het aantal te verwijderen trajecten bereikt is
+    destroyed = copy.deepcopy(state)
+    planning = destroyed.planning
+    aantal = state.aantal_te_verwijderen_trajecten()
+    for k in random_state.permutation(len(planning.ordercapaciteiten)):
+        if aantal <= 0:
+            break
+        container_ids = [i for i in planning.ordercapaciteiten[k].containers if i in planning.gepland]
+        if len(container_ids) > aantal:
+            container_ids = random_state.choice(container_ids, aantal, replace=False)
+        for i in container_ids:
+            planning.verwijder_container_traject(int(i))
+        aantal -= len(container_ids)
+    return destroyed
+
+
 def __repair(state: PlanningState, random_state, method: str, van_naar=True):
-    maak_traject = MaakContainerTraject(state.planning)
-    te_plannen = list(state.planning.te_plannen)
-    random_state.shuffle(te_plannen)
-    for i in te_plannen:
-        maak_traject.container = state.planning.geef_container_object(i)
-        func = getattr(maak_traject, method)
-        traject = func(van_naar)
-        state.planning.voeg_container_traject_toe(i, *traject)
+    # containers van dezelfde ordercapaciteit zijn uitwisselbaar: per ordercapaciteit wordt 1 traject gezocht
+    # en toegekend aan zoveel containers als de capaciteit van het traject toelaat
+    # voor de overige containers wordt opnieuw gezocht (met de aangepaste capaciteiten)
+    planning = state.planning
+    maak_traject = MaakContainerTraject(planning, random_state=random_state)
+    klassen = planning.geef_te_plannen_per_ordercapaciteit()
+    for k in random_state.permutation(len(klassen)):
+        container_ids = klassen[k]
+        while container_ids:
+            maak_traject.container = planning.geef_container_object(container_ids[0])
+            func = getattr(maak_traject, method)
+            traject = func(van_naar)
+            aantal = planning.geef_aantal_beschikbaar(traject)
+            if aantal is None:  # enkel adhoc capaciteiten (of geen traject): geldt voor alle containers
+                aantal = len(container_ids)
+            for nr, i in enumerate(container_ids[:aantal]):
+                if nr > 0:  # elke container krijgt zijn eigen adhoc capaciteiten
+                    traject = [planning.adhoc_legs.kopieer_leg(lc) if lc.is_adhoc else lc for lc in traject]
+                planning.voeg_container_traject_toe(i, *traject)
+            container_ids = container_ids[aantal:]
     return state
 
 
+def __regret_repair(state: PlanningState, random_state, k: int):
+    # regret-k heuristiek: per ordercapaciteit (= equivalentieklasse van containers) worden kandidaat trajecten
+    # gezocht en met delta_voeg_toe geëvalueerd; de klasse met het grootste verschil tussen het beste en het k-de
+    # beste traject (regret) wordt eerst ingepland
+    # na een toekenning worden enkel de klassen herberekend waarvan een kandidaat traject een gewijzigde
+    # legcapaciteit bevat
+    planning = state.planning
+    maak_traject = MaakContainerTraject(planning)
+    klassen = planning.geef_te_plannen_per_ordercapaciteit()
+    kandidaten = [[] for _ in klassen]  # kandidaten[nr] -> [(kost, traject)] gesorteerd volgens kost
+    per_legcapaciteit = dict()  # legcapaciteit -> set met klassen die deze legcapaciteit in een kandidaat gebruiken
+    versies = [0 for _ in klassen]
+    heap = []
+
+    def bereken(nr):
+        container_id = klassen[nr][0]
+        maak_traject.container = planning.geef_container_object(container_id)
+        opties = []
+        for traject in maak_traject.maak_kandidaat_trajecten(k):
+            delta = planning.delta_voeg_toe(container_id, *traject)
+            if delta["mogelijk"]:
+                opties.append((delta["kost"], traject))
+        opties.sort(key=lambda optie: optie[0])
+        kandidaten[nr] = opties
+        for _, traject in opties:
+            for legcapaciteit in traject:
+                if not legcapaciteit.is_adhoc:
+                    per_legcapaciteit.setdefault(legcapaciteit, set()).add(nr)
+        versies[nr] += 1
+        if not opties:
+            regret, beste = float('inf'), float('-inf')  # geen traject mogelijk: meteen afhandelen
+        elif len(opties) == 1:
+            regret, beste = float('inf'), opties[0][0]
+        else:
+            regret, beste = opties[min(k, len(opties)) - 1][0] - opties[0][0], opties[0][0]
+        heapq.heappush(heap, (-regret, beste, nr, versies[nr]))
+
+    for nr in range(len(klassen)):
+        bereken(nr)
+    while heap:
+        _, _, nr, versie = heapq.heappop(heap)
+        if versie != versies[nr] or not klassen[nr]:
+            continue
+        container_ids = klassen[nr]
+        traject = kandidaten[nr][0][1] if kandidaten[nr] else []
+        aantal = planning.geef_aantal_beschikbaar(traject)
+        if aantal is None:  # enkel adhoc capaciteiten (of geen traject): geldt voor alle containers
+            aantal = len(container_ids)
+        for i, container_id in enumerate(container_ids[:aantal]):
+            if i > 0:  # elke container krijgt zijn eigen adhoc capaciteiten
+                traject = [planning.adhoc_legs.kopieer_leg(lc) if lc.is_adhoc else lc for lc in traject]
+            planning.voeg_container_traject_toe(container_id, *traject)
+        klassen[nr] = container_ids[aantal:]
+        getroffen = {nr}
+        for legcapaciteit in traject:
+            if not legcapaciteit.is_adhoc:
+                getroffen.update(per_legcapaciteit.pop(legcapaciteit, set()))
+        for g in getroffen:
+            if klassen[g]:
+                bereken(g)
+    return state
+
+
+def regret_repair(state: PlanningState, random_state):
+    return __regret_repair(state, random_state, 3)
+
+
 def greedy_repair(state: PlanningState, random_state):
     return __repair(state, random_state, 'maak_greedy_traject')
 
@@ -298,10 +622,70 @@ def reversed_random_repair(state: PlanningState, random_state):
     return __repair(state, random_state, 'maak_random_traject', False)
 
 
+# uitkomst van een ALNS iteratie (index in de weights)
+_IS_BEST = 0
+_IS_BETTER = 1
+_IS_ACCEPTED = 2
+_IS_REJECTED = 3
+
+
+def select_operator(operators, weights, random_state):
+    # kiest de index van een operator met kansen evenredig met de weights (zoals alns.select_operator)
+    return random_state.choice(np.arange(0, len(operators)), p=weights / np.sum(weights))
+
+
+class HillClimbing:
+    # accepteert een kandidaat enkel als die niet slechter is dan de huidige oplossing (zoals alns.criteria)
+    # accept krijgt de reeds berekende kosten in plaats van de toestanden (geen extra objective())
+
+    def accept(self, random_state, best_cost, current_cost, candidate_cost):
+        return candidate_cost <= current_cost
+
+
+class SimulatedAnnealing:
+    # accepteert een slechtere kandidaat met kans exp((huidige - kandidaat) / temperatuur) (zoals alns.criteria)
+    # na elke iteratie daalt de temperatuur lineair of exponentieel tot end_temperature
+
+    def __init__(self, start_temperature: float, end_temperature: float, step: float, method: str = "exponential"):
+        if start_temperature <= 0 or end_temperature <= 0 or step < 0:
+            raise ValueError("Temperatures must be strictly positive.")
+        if start_temperature < end_temperature:
+            raise ValueError("Start temperature must be bigger than end temperature.")
+        if method == "exponential" and step > 1:
+            raise ValueError("For exponential updating, the step parameter must not be explosive.")
+        if method not in ("linear", "exponential"):
+            raise ValueError("Method must be one of ['linear', 'exponential'].")
+        self.start_temperature = start_temperature
+        self.end_temperature = end_temperature
+        self.step = step
+        self.method = method
+        self._temperature = start_temperature
+
+    def accept(self, random_state, best_cost, current_cost, candidate_cost):
+        # een betere kandidaat heeft kans >= 1 en wordt altijd geaccepteerd (exponent begrensd tegen overflow)
+        probability = np.exp(min((current_cost - candidate_cost) / self._temperature, 0.0))
+        if self.method == "linear":
+            self._temperature = max(self.end_temperature, self._temperature - self.step)
+        else:
+            self._temperature = max(self.end_temperature, self._temperature * self.step)
+        return probability >= random_state.random()
+
+
+class Result:
+
+    def __init__(self, best_state: PlanningState, statistics: Statistieken = None):
+        # resultaat van een ALNS solve: de beste toestand en (als collect_stats) de statistieken
+        self.best_state = best_state
+        self.statistics = statistics
+
+
 class ALNS(Methode):
 
     def __init__(self, planning: Planning, degree_of_destruction: float = 0.25, weights: list = None,
-                 operator_decay: float = 0.8, iterations: int = 10000, seed: int = None, collect_stats=True):
+                 operator_decay: float = 0.8, iterations: int = 10000, seed: int = None, collect_stats=True,
+                 stats_points: int = 10000, stats_sink: str = None):
+        # stats_points: maximaal aantal bewaarde objectives (de trace wordt uitgedund, zie Statistieken)
+        # stats_sink: optioneel .csv of .npz bestand voor de statistieken
         Methode.__init__(self, planning)
         self.degree_of_destruction = degree_of_destruction
         if weights is not None:
@@ -311,40 +695,56 @@ class ALNS(Methode):
         self.operator_decay = operator_decay
         self.iterations = iterations
         self.collect_stats = collect_stats
+        self.stats_points = stats_points
+        self.stats_sink = stats_sink
         self.seed = seed
         if seed is not None:
             self.random_state = RandomState(seed)
         else:
             self.random_state = RandomState()
-        self.alns = alns.ALNS(self.random_state)
         self.state = PlanningState(planning, degree_of_destruction)
         self.criterion = None
         self.destroy_operators = []
         self.repair_operators = []
+        self._destroy_operators = []  # (naam, operator) in volgorde van toevoegen
+        self._repair_operators = []
         self.result = None
+        self.aantal_iteraties = 0
+        self.checkpoint = None  # pad van het checkpoint bestand
+        self.checkpoint_interval = None  # sec tussen 2 checkpoints
+        self.lower_bound_lp = None  # None = geen ondergrens, anders of de LP relaxatie meegerekend wordt
+        self.target_gap = None
+        self.lower_bound = None  # ondergrens van de laatste solve (zie Ondergrens)
+        self.gap = None  # gap van de beste planning
 
     def add_destroy_operators(self, *operators):
-        # *operators is 'random' and/or 'worst'
+        # *operators is 'random', 'worst', 'related' and/or 'leg'
         self.destroy_operators = [operator.lower() for operator in operators]
         if 'random' in self.destroy_operators:
-            self.alns.add_destroy_operator(random_removal)
+            self._destroy_operators.append(('random_removal', random_removal))
         if 'worst' in operators:
-            self.alns.add_destroy_operator(worst_removal)
+            self._destroy_operators.append(('worst_removal', worst_removal))
+        if 'related' in self.destroy_operators:
+            self._destroy_operators.append(('related_removal', related_removal))
+        if 'leg' in self.destroy_operators:
+            self._destroy_operators.append(('leg_removal', leg_removal))
 
     def add_repair_operators(self, *operators):
-        # *operators is 'random', 'greedy', 'reversed_random', and/or 'reversed_greedy'
+        # *operators is 'random', 'greedy', 'reversed_random', 'reversed_greedy' and/or 'regret'
         self.repair_operators = [operator.lower() for operator in operators]
         if 'random' in self.repair_operators:
-            self.alns.add_repair_operator(random_repair)
+            self._repair_operators.append(('random_repair', random_repair))
         if 'greedy' in operators:
-            self.alns.add_repair_operator(greedy_repair)
+            self._repair_operators.append(('greedy_repair', greedy_repair))
         if 'reversed_random' in operators:
-            self.alns.add_repair_operator(reversed_random_repair)
+            self._repair_operators.append(('reversed_random_repair', reversed_random_repair))
         if 'reversed_greedy' in operators:
-            self.alns.add_repair_operator(reversed_greedy_repair)
+            self._repair_operators.append(('reversed_greedy_repair', reversed_greedy_repair))
+        if 'regret' in self.repair_operators:
+            self._repair_operators.append(('regret_repair', regret_repair))
 
     def add_hill_climbing(self):
-        self.criterion = alns.criteria.HillClimbing()
+        self.criterion = HillClimbing()
 
     def add_simulated_annealing(self, start_temperature: float = 10000, end_temperature: float = 1, step: float = 0.9,
                                 method: str = "exponential"):
@@ -352,27 +752,371 @@ class ALNS(Methode):
         # temperature = max(end_temperature, temperature - step) (if method is linear)
         # temperature = max(end_temperature, step * temperature) (if method is exponential)
         # where the initial temperature is set to start_temperature
-        self.criterion = alns.criteria.SimulatedAnnealing(start_temperature, end_temperature, step, method)
+        self.criterion = SimulatedAnnealing(start_temperature, end_temperature, step, method)
 
-    def solve(self):
+    def add_lower_bound(self, lp: bool = False, target_gap: float = None):
+        # berekent bij solve een ondergrens (zie Ondergrens) en houdt de gap (kost - ondergrens) / kost van de beste
+        # planning bij in self.gap (ook leesbaar in on_improvement)
+        # lp: de LP relaxatie is enkel een ondergrens zonder adhoc legs en ALNS gebruikt altijd adhoc legs, dus
+        # lp=True wordt hier al geweigerd (niet pas bij solve); zie Ondergrens(planning, adhoc=False) voor het LP
+        # target_gap: stopt zodra de gap kleiner of gelijk is (vb. 0.01 = 1%)
+        if lp:
+            raise ValueError("The LP relaxation is not a lower bound with adhoc legs, which ALNS always uses.")
+        self.lower_bound_lp = lp
+        self.target_gap = target_gap
+
+    def _bereken_ondergrens(self, planning: Planning):
+        # de ondergrens negeert de trajecten van de planning (enkel geannuleerde containers tellen niet mee)
+        if self.lower_bound_lp is None:
+            self.lower_bound = None
+            return
+        with instrumentatie.meet("ALNS.lower_bound"):
+            self.lower_bound = Ondergrens(planning, self.adhoc).bereken(self.lower_bound_lp)["ondergrens"]
+
+    def add_checkpoint(self, path: str, interval: float = 60.0):
+        # schrijft tijdens solve elke interval sec (en na de laatste iteratie) een checkpoint naar path
+        # het checkpoint is een json bestand met de beste en huidige toewijzing van trajecten,
+        # de gewichten van de operatoren, de temperatuur van het criterium en de toestand van de RandomState
+        self.checkpoint = path
+        self.checkpoint_interval = interval
+
+    def __schrijf_checkpoint(self, toestand: dict):
+        temperatuur = getattr(self.criterion, "_temperature", None)  # enkel bij simulated annealing
+        bit_generator, key, pos, has_gauss, cached_gaussian = self.random_state.get_state()
+        checkpoint = dict(iteraties=toestand["iteraties"], zonder_verbetering=toestand["zonder_verbetering"],
+                          destroy_operators=[naam for naam, _ in self._destroy_operators],
+                          repair_operators=[naam for naam, _ in self._repair_operators],
+                          d_weights=[float(w) for w in toestand["d_weights"]],
+                          r_weights=[float(w) for w in toestand["r_weights"]],
+                          temperatuur=None if temperatuur is None else float(temperatuur),
+                          random_state=dict(bit_generator=bit_generator, key=[int(k) for k in key], pos=int(pos),
+                                            has_gauss=int(has_gauss), cached_gaussian=float(cached_gaussian)),
+                          beste=toestand["best"].planning.geef_toewijzing(),
+                          huidige=toestand["current"].planning.geef_toewijzing())
+        tijdelijk = self.checkpoint + ".tmp"
+        with instrumentatie.meet("ALNS.checkpoint"), open(tijdelijk, 'w') as f:
+            json.dump(checkpoint, f, separators=(",", ":"))
+        os.replace(tijdelijk, self.checkpoint)  # een onderbroken schrijfactie laat het vorige checkpoint intact
+
+    def resume(self, path: str, planning: Planning, time_limit: float = None, max_no_improvement: int = None,
+               on_improvement=None):
+        # hervat een onderbroken solve vanaf het checkpoint in path
+        # planning is de (opnieuw ingelezen) planning zonder trajecten; operatoren, criterium en parameters van
+        # deze ALNS moeten dezelfde zijn als bij de onderbroken solve
+        # de resterende iteraties (tot self.iterations) verlopen identiek aan een niet-onderbroken solve
         start = time()
-        self.state = greedy_repair(self.state, self.random_state)
-        initial_cost = self.state.objective() * 1000
-        self.result = self.alns.iterate(self.state, self.weights, self.operator_decay, self.criterion, self.iterations,
-                                        self.collect_stats)
-        self.planning = self.result.best_state.planning
-        self.planning.maak_unieke_adhoc_capaciteiten()
+        with self._instrumentation():
+            with open(path) as f:
+                checkpoint = json.load(f)
+            self._bereken_ondergrens(planning)
+            if checkpoint["destroy_operators"] != [naam for naam, _ in self._destroy_operators] or \
+                    checkpoint["repair_operators"] != [naam for naam, _ in self._repair_operators]:
+                raise ValueError("The operators of this ALNS do not match the checkpoint.")
+            if checkpoint["temperatuur"] is not None:
+                self.criterion._temperature = checkpoint["temperatuur"]
+            random_state = checkpoint["random_state"]
+            self.random_state.set_state((random_state["bit_generator"],
+                                         np.array(random_state["key"], dtype=np.uint32), random_state["pos"],
+                                         random_state["has_gauss"], random_state["cached_gaussian"]))
+            best_planning = copy.deepcopy(planning)
+            best_planning.herstel_toewijzing(checkpoint["beste"])
+            planning.herstel_toewijzing(checkpoint["huidige"])
+            self.state = PlanningState(planning, self.degree_of_destruction)
+            toestand = dict(current=self.state, best=PlanningState(best_planning, self.degree_of_destruction),
+                            d_weights=checkpoint["d_weights"], r_weights=checkpoint["r_weights"],
+                            iteraties=checkpoint["iteraties"], zonder_verbetering=checkpoint["zonder_verbetering"])
+            self.result = self._iterate(start, time_limit, max_no_improvement, on_improvement, toestand)
+            self.planning = self.result.best_state.planning
+            self.planning.maak_unieke_adhoc_capaciteiten()
         print("Elapsed time:", round(time() - start, 2), 'sec')
+        print("Iterations:", self.aantal_iteraties)
+        print("Minimized cost:", self.result.best_state.objective() * 1000)
+        if self.lower_bound is not None:
+            print("Lower bound:", self.lower_bound)
+            print("Gap:", round(self.gap * 100, 2), '%')
+
+    def solve(self, time_limit: float = None, max_no_improvement: int = None, on_improvement=None):
+        # time_limit in sec (incl. de initiële greedy oplossing): stopt na de iteratie die de limiet overschrijdt
+        # max_no_improvement: stopt na zoveel opeenvolgende iteraties zonder nieuwe beste planning
+        # on_improvement(planning, kost): wordt opgeroepen met elke nieuwe beste planning (ook de initiële)
+        # de planning mag in de callback niet gewijzigd worden
+        # met iterations=None wordt er geïtereerd tot time_limit of max_no_improvement bereikt is
+        if self.iterations is None and time_limit is None and max_no_improvement is None:
+            raise ValueError("iterations=None requires a time_limit or max_no_improvement.")
+        start = time()
+        with self._instrumentation():
+            self._check_feasibility()
+            self._bereken_ondergrens(self.planning)
+            with instrumentatie.meet("ALNS.initial_solution"):
+                self.state = greedy_repair(self.state, self.random_state)
+            initial_cost = self.state.objective() * 1000
+            if on_improvement is not None:
+                on_improvement(self.state.planning, initial_cost)
+            self.result = self._iterate(start, time_limit, max_no_improvement, on_improvement)
+            self.planning = self.result.best_state.planning
+            self.planning.maak_unieke_adhoc_capaciteiten()
+        print("Elapsed time:", round(time() - start, 2), 'sec')
+        print("Iterations:", self.aantal_iteraties)
         print("Initial cost:", initial_cost)
         print("Minimized cost:", self.result.best_state.objective() * 1000)
+        if self.lower_bound is not None:
+            print("Lower bound:", self.lower_bound)
+            print("Gap:", round(self.gap * 100, 2), '%')
+
+    def reoptimize(self, iterations: int = 50, time_limit: float = 0.5, max_no_improvement: int = None,
+                   on_improvement=None):
+        # herplant na wijzigingen aan self.planning (Planning.voeg_order_toe, annuleer_order, wijzig_leg,
+        # wijzig_legcapaciteit), vertrekkend van de huidige oplossing in plaats van opnieuw te beginnen:
+        # enkel de containers zonder traject worden greedy ingepland, gevolgd door een korte ALNS
+        # (maximaal iterations iteraties en time_limit sec, None = geen limiet)
+        # na solve is self.planning de beste planning: wijzigingen moeten op die planning gebeuren
+        start = time()
+        with self._instrumentation():
+            self.planning.splits_adhoc_capaciteiten()
+            self._bereken_ondergrens(self.planning)
+            self.state = PlanningState(self.planning, self.degree_of_destruction)
+            with instrumentatie.meet("ALNS.reoptimize_repair"):
+                self.state = greedy_repair(self.state, self.random_state)
+            initial_cost = self.state.objective() * 1000
+            if on_improvement is not None:
+                on_improvement(self.state.planning, initial_cost)
+            iterations, self.iterations = self.iterations, iterations
+            try:
+                self.result = self._iterate(start, time_limit, max_no_improvement, on_improvement)
+            finally:
+                self.iterations = iterations
+            self.planning = self.result.best_state.planning
+            self.planning.maak_unieke_adhoc_capaciteiten()
+        print("Elapsed time:", round(time() - start, 2), 'sec')
+        print("Iterations:", self.aantal_iteraties)
+        print("Repaired cost:", initial_cost)
+        print("Minimized cost:", self.result.best_state.objective() * 1000)
+        if self.lower_bound is not None:
+            print("Lower bound:", self.lower_bound)
+            print("Gap:", round(self.gap * 100, 2), '%')
+
+    def _iterate(self, start: float, time_limit: float = None, max_no_improvement: int = None, on_improvement=None,
+                 toestand: dict = None):
+        # ALNS iteraties (zoals alns.ALNS.iterate), met stopcriteria op tijd en op iteraties zonder verbetering
+        # toestand is de toestand van een hervatte solve (zie resume), anders wordt gestart vanaf self.state
+        weights = np.asarray(self.weights, dtype=np.float16)
+        if not self._destroy_operators or not self._repair_operators:
+            raise ValueError("Missing at least one destroy or repair operator.")
+        if len(weights) < 4 or any(weight < 0 for weight in weights):
+            raise ValueError("Expected 4 non-negative weights.")
+        if not 0 <= self.operator_decay <= 1:
+            raise ValueError("Operator decay parameter outside unit interval is not understood.")
+        destroy_operators = self._destroy_operators
+        repair_operators = self._repair_operators
+        statistics = None
+        if self.collect_stats:
+            statistics = Statistieken(self.stats_points, self.stats_sink, hervat=toestand is not None)
+        try:
+            if toestand is None:
+                d_weights = np.ones(len(destroy_operators), dtype=np.float16)
+                r_weights = np.ones(len(repair_operators), dtype=np.float16)
+                current = best = self.state
+                self.aantal_iteraties = 0
+                zonder_verbetering = 0
+            else:
+                d_weights = np.asarray(toestand["d_weights"], dtype=np.float16)
+                r_weights = np.asarray(toestand["r_weights"], dtype=np.float16)
+                current, best = toestand["current"], toestand["best"]
+                self.aantal_iteraties = toestand["iteraties"]
+                zonder_verbetering = toestand["zonder_verbetering"]
+            current_cost = current.objective()
+            best_cost = best.objective()
+            self.gap = None if self.lower_bound is None else Ondergrens.geef_gap(best_cost * 1000, self.lower_bound)
+            if self.collect_stats:
+                if toestand is not None:  # de trace loopt verder vanaf de iteratie van het checkpoint
+                    statistics.aantal = self.aantal_iteraties
+                    statistics.beste = best_cost
+                statistics.collect_objective(current_cost)
+            laatste_checkpoint = time()
+            iteraties = range(self.iterations - self.aantal_iteraties) if self.iterations is not None else count()
+            for _ in iteraties:
+                d_idx = select_operator(destroy_operators, d_weights, self.random_state)
+                r_idx = select_operator(repair_operators, r_weights, self.random_state)
+                d_name, d_operator = destroy_operators[d_idx]
+                r_name, r_operator = repair_operators[r_idx]
+                with instrumentatie.meet("destroy." + d_name):
+                    destroyed = d_operator(current, self.random_state)
+                with instrumentatie.meet("repair." + r_name):
+                    candidate = r_operator(destroyed, self.random_state)
+                candidate_cost = candidate.objective()
+                if self.criterion.accept(self.random_state, best_cost, current_cost, candidate_cost):
+                    weight_idx = _IS_BETTER if candidate_cost < current_cost else _IS_ACCEPTED
+                    current, current_cost = candidate, candidate_cost
+                else:
+                    weight_idx = _IS_REJECTED
+                if candidate_cost < best_cost:
+                    best = current = candidate
+                    best_cost = current_cost = candidate_cost
+                    weight_idx = _IS_BEST
+                    zonder_verbetering = 0
+                    if self.lower_bound is not None:
+                        self.gap = Ondergrens.geef_gap(best_cost * 1000, self.lower_bound)
+                    if on_improvement is not None:
+                        on_improvement(best.planning, best_cost * 1000)
+                else:
+                    zonder_verbetering += 1
+                d_weights[d_idx] = (self.operator_decay * d_weights[d_idx]
+                                    + (1 - self.operator_decay) * weights[weight_idx])
+                r_weights[r_idx] = (self.operator_decay * r_weights[r_idx]
+                                    + (1 - self.operator_decay) * weights[weight_idx])
+                if self.collect_stats:
+                    statistics.collect_iteratie(current_cost, d_name, r_name, weight_idx)
+                self.aantal_iteraties += 1
+                if self.checkpoint is not None and time() - laatste_checkpoint >= self.checkpoint_interval:
+                    self.__schrijf_checkpoint(dict(current=current, best=best, d_weights=d_weights, r_weights=r_weights,
+                                                   iteraties=self.aantal_iteraties,
+                                                   zonder_verbetering=zonder_verbetering))
+                    laatste_checkpoint = time()
+                if time_limit is not None and time() - start >= time_limit:
+                    break
+                if max_no_improvement is not None and zonder_verbetering >= max_no_improvement:
+                    break
+                if self.target_gap is not None and self.gap is not None and self.gap <= self.target_gap:
+                    break
+            if self.checkpoint is not None:
+                self.__schrijf_checkpoint(dict(current=current, best=best, d_weights=d_weights, r_weights=r_weights,
+                                               iteraties=self.aantal_iteraties, zonder_verbetering=zonder_verbetering))
+        finally:
+            if self.collect_stats:
+                statistics.close()
+        return Result(best, statistics)
 
     def plot_objectives(self):
-        self.result.plot_objectives()
+        self.result.statistics.plot_objectives()
 
     def plot_operators(self):
+        import matplotlib.pyplot as plt  # enkel nodig om te plotten
         figure = plt.figure("operator_counts", figsize=(14, 6))
         figure.subplots_adjust(bottom=0.15, hspace=.5)
-        self.result.plot_operator_counts(figure=figure, title="Operator diagnostics",
-                                         legend=["Best", "Better", "Accepted"])
+        self.result.statistics.plot_operator_counts(figure=figure, title="Operator diagnostics",
+                                                    legend=["Best", "Better", "Accepted"])
+
+
+def _los_deelplanning_op(maak_methode, deelplanning: Planning, compact: bool = False):
+    # lost 1 deelplanning op (in een apart proces) en retourneert de toewijzing van de beste planning
+    # compact: retourneert een Oplossing (enkele kB om terug te sturen naar het hoofdproces)
+    methode = maak_methode(deelplanning)
+    methode.solve()
+    if compact:
+        return Oplossing.van_planning(methode.planning)
+    return methode.planning.geef_toewijzing()
+
 
+class Decompositie(Methode):
 
+    def __init__(self, planning: Planning, maak_methode, processen: int = None, min_containers: int = 100):
+        # lost de onafhankelijke componenten van de planning (zie Planning.geef_componenten) elk apart op
+        # in een process pool en voegt de trajecten nadien samen in planning
+        # maak_methode(deelplanning) retourneert een ingestelde Methode (vb. ALNS met operatoren en criterium)
+        # en moet picklebaar zijn (een functie op module niveau)
+        # processen: aantal processen (standaard het aantal cpu's), 1 lost alles op in het huidige proces
+        # min_containers: kleine componenten worden gebundeld tot deelplanningen met minstens zoveel containers
+        Methode.__init__(self, planning)
+        self.maak_methode = maak_methode
+        self.processen = processen
+        self.min_containers = min_containers
+        self.componenten = None
+
+    def __bundel(self, componenten: list):
+        # bundelt componenten (grootste eerst) tot delen met minstens min_containers containers
+        def aantal_containers(order_ids):
+            return sum(len(self.planning.orders[order_id].containers) for order_id in order_ids)
+
+        delen = []
+        deel = []
+        for component in sorted(componenten, key=aantal_containers, reverse=True):
+            deel += component
+            if aantal_containers(deel) >= self.min_containers:
+                delen.append(deel)
+                deel = []
+        if deel:
+            delen.append(deel)
+        return delen
+
+    def solve(self):
+        from concurrent.futures import ProcessPoolExecutor
+        start = time()
+        with self._instrumentation():
+            with instrumentatie.meet("Decompositie.componenten"):
+                self.componenten = self.planning.geef_componenten()
+                delen = [self.planning.maak_deelplanning(order_ids) for order_ids in self.__bundel(self.componenten)]
+            with instrumentatie.meet("Decompositie.solve"):
+                deelplanningen = [deelplanning for deelplanning, _, _ in delen]
+                if self.processen == 1 or len(delen) == 1:
+                    oplossingen = [_los_deelplanning_op(self.maak_methode, deelplanning, True)
+                                   for deelplanning in deelplanningen]
+                else:
+                    with ProcessPoolExecutor(self.processen) as pool:
+                        oplossingen = list(pool.map(_los_deelplanning_op, [self.maak_methode] * len(delen),
+                                                    deelplanningen, [True] * len(delen)))
+            with instrumentatie.meet("Decompositie.samenvoegen"):
+                for (_, container_ids, legcapaciteit_indexen), oplossing in zip(delen, oplossingen):
+                    oplossing.herstel(self.planning, container_ids, legcapaciteit_indexen)
+                self.planning.maak_unieke_adhoc_capaciteiten()
+        print("Elapsed time:", round(time() - start, 2), 'sec')
+        print("Components:", len(self.componenten), "in", len(delen), "sub-plannings")
+        print("Minimized cost:", self.planning.geef_totale_kost())
+
+
+class RollingHorizon(Methode):
+
+    def __init__(self, planning: Planning, maak_methode, venster: timedelta = timedelta(days=3),
+                 overlap: timedelta = timedelta(days=1), vooruitblik: timedelta = timedelta(days=2)):
+        # lost een lange planningsperiode op in overlappende tijdsvensters op de min ophaaltijd van de orders
+        # elk venster lost zijn orders op met enkel de legs die voor het einde van het venster + vooruitblik
+        # inchecken; daarna worden de trajecten van de orders voor de overlap vastgelegd en schuift het venster
+        # op met venster - overlap (de orders in de overlap worden in het volgende venster opnieuw opgelost)
+        # maak_methode(deelplanning) retourneert een ingestelde Methode (vb. ALNS met operatoren en criterium)
+        # tijd en geheugen per venster hangen af van het aantal orders en legs in het venster, niet van de periode
+        # (de legs van een venster worden met bisect gevonden in een index op checkin, 1 keer opgebouwd per solve)
+        if overlap >= venster:
+            raise ValueError("The overlap must be shorter than the window.")
+        Methode.__init__(self, planning)
+        self.maak_methode = maak_methode
+        self.venster = venster
+        self.overlap = overlap
+        self.vooruitblik = vooruitblik
+        self.aantal_vensters = 0
+
+    def solve(self):
+        start = time()
+        with self._instrumentation():
+            orders = self.planning.orders_op_ophaaltijd  # gesorteerd op (min_ophaaltijd_minuut, order id)
+            venster, overlap, vooruitblik = (duur // MINUUT for duur in (self.venster, self.overlap, self.vooruitblik))
+            self.aantal_vensters = 0
+            if orders:
+                op_checkin = self.planning.geef_legcapaciteiten_op_checkin()
+                begin = orders[0][0]
+                laatste = orders[-1][0]
+                while True:
+                    einde = begin + venster
+                    vast_tot = einde if einde > laatste else einde - overlap  # laatste venster: alles vastleggen
+                    i = bisect.bisect_left(orders, (begin, -1))
+                    j = bisect.bisect_left(orders, (einde, -1))
+                    order_ids = [order_id for _, order_id in orders[i:j]]
+                    if order_ids:
+                        with instrumentatie.meet("RollingHorizon.venster"):
+                            k = bisect.bisect_left(op_checkin, (begin, -1))
+                            l = bisect.bisect_left(op_checkin, (einde + vooruitblik, -1))
+                            deelplanning, container_ids, legcapaciteit_indexen = self.planning.maak_deelplanning(
+                                order_ids, legs_tot=geef_tijdstip(einde + vooruitblik), legs_vanaf=geef_tijdstip(begin),
+                                indexen=[index for _, index in op_checkin[k:l]])
+                            toewijzing = _los_deelplanning_op(self.maak_methode, deelplanning)
+                        vast = [(container_id, traject) for container_id, traject in zip(container_ids, toewijzing)
+                                if self.planning.containers[container_id].order.min_ophaaltijd_minuut < vast_tot]
+                        self.planning.voeg_toewijzing_samen([traject for _, traject in vast],
+                                                            [container_id for container_id, _ in vast],
+                                                            legcapaciteit_indexen)
+                        self.aantal_vensters += 1
+                    if einde > laatste:
+                        break
+                    begin = vast_tot
+            self.planning.maak_unieke_adhoc_capaciteiten()
+        print("Elapsed time:", round(time() - start, 2), 'sec')
+        print("Windows:", self.aantal_vensters)
+        print("Minimized cost:", self.planning.geef_totale_kost())
@@ -0,0 +1,292 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+from contextlib import redirect_stdout
+from itertools import count
+from time import time
+from .data_io import JsonObject, OptimizerResult
+from .optimalisatie import ALNS
+
+STATUS_TEKST = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                409: "Conflict", 413: "Payload Too Large", 429: "Too Many Requests"}
+
+
+def _los_job_op(data: dict, parameters: dict, verbinding):
+    # lost 1 job op in een apart proces: JsonObject -> ALNS.solve -> OptimizerResult
+    # stuurt ("voortgang", dict) bij elke nieuwe beste planning en tot slot ("resultaat", json) of ("fout", tekst)
+    try:
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            planning = JsonObject(data).geef_planning_object()
+            if parameters.get("reduce"):
+                planning.reduce()
+            alns = ALNS(planning, iterations=parameters.get("iterations", 1000), seed=parameters.get("seed"),
+                        collect_stats=False)
+            alns.add_destroy_operators(*parameters.get("destroy", ["random", "worst"]))
+            alns.add_repair_operators(*parameters.get("repair", ["greedy", "reversed_greedy"]))
+            if parameters.get("criterion", "hill_climbing") == "simulated_annealing":
+                alns.add_simulated_annealing(**parameters.get("annealing", {}))
+            else:
+                alns.add_hill_climbing()
+
+            def bij_verbetering(_, kost):
+                verbinding.send(("voortgang", dict(iterations=alns.aantal_iteraties, bestCost=kost)))
+
+            alns.solve(time_limit=parameters.get("time_limit"), max_no_improvement=parameters.get("max_no_improvement"),
+                       on_improvement=bij_verbetering)
+            buffer = io.StringIO()
+            OptimizerResult(alns.planning).schrijf_json(buffer)
+        verbinding.send(("voortgang", dict(iterations=alns.aantal_iteraties, bestCost=alns.planning.geef_totale_kost())))
+        verbinding.send(("resultaat", buffer.getvalue()))
+    except Exception as fout:
+        verbinding.send(("fout", "%s: %s" % (type(fout).__name__, fout)))
+    finally:
+        verbinding.close()
+
+
+class Job:
+
+    def __init__(self, id: str, data: dict, parameters: dict):
+        self.id = id
+        self.data = data
+        self.parameters = parameters
+        self.status = "queued"  # queued, running, done, failed of cancelled
+        self.ingediend = time()
+        self.gestart = None
+        self.beeindigd = None
+        self.voortgang = dict(iterations=0, bestCost=None)
+        self.resultaat = None  # OptimizerResult als json tekst
+        self.fout = None
+        self.proces = None
+
+    def geef_status(self):
+        einde = self.beeindigd if self.beeindigd is not None else time()
+        return dict(id=self.id, status=self.status, submitted=self.ingediend,
+                    waiting=(self.gestart if self.gestart is not None else einde) - self.ingediend,
+                    running=einde - self.gestart if self.gestart is not None else 0.0, error=self.fout)
+
+    def geef_voortgang(self):
+        voortgang = dict(id=self.id, status=self.status)
+        voortgang.update(self.voortgang)
+        return voortgang
+
+
+class PlanningDienst:
+
+    def __init__(self, processen: int = 2, wachtrij: int = 10, max_grootte: int = 64 * 2 ** 20,
+                 bewaartijd: float = 3600.0, max_afgelopen: int = 100):
+        # asyncio job service: jobs (planning json in het formaat van JsonObject) worden in een wachtrij gezet
+        # en door maximaal processen aparte processen opgelost, de event loop blijft vrij voor andere aanvragen
+        # wachtrij: maximaal aantal wachtende jobs, daarna wordt submit geweigerd (backpressure, HTTP 429)
+        # max_grootte: maximale grootte van een HTTP body in bytes
+        # bewaartijd: sec dat een afgelopen job (done, failed of cancelled) met zijn resultaat bewaard blijft
+        # max_afgelopen: maximaal aantal bewaarde afgelopen jobs, de oudste worden eerst verwijderd
+        self.processen = processen
+        self.max_wachtrij = wachtrij
+        self.max_grootte = max_grootte
+        self.bewaartijd = bewaartijd
+        self.max_afgelopen = max_afgelopen
+        self.jobs = dict()
+        self._wachtrij = None
+        self._werkers = []
+        self._ids = count(1)
+        self._context = multiprocessing.get_context("spawn")  # geen fork van een proces met threads
+
+    async def start(self):
+        self._wachtrij = asyncio.Queue(self.max_wachtrij)
+        self._werkers = [asyncio.create_task(self.__werker()) for _ in range(self.processen)]
+
+    async def stop(self):
+        for werker in self._werkers:
+            werker.cancel()
+        for job in self.jobs.values():
+            if job.proces is not None and job.proces.is_alive():
+                job.proces.terminate()
+        await asyncio.gather(*self._werkers, return_exceptions=True)
+        self._werkers = []
+
+    def submit(self, data: dict, parameters: dict = None):
+        # zet een job in de wachtrij en retourneert zijn id; asyncio.QueueFull als de wachtrij vol is
+        # parameters: iterations, seed, destroy, repair, criterion ('hill_climbing' of 'simulated_annealing'),
+        # annealing (argumenten van add_simulated_annealing), time_limit, max_no_improvement en reduce
+        # (Planning.reduce voor het oplossen)
+        self.__ruim_op()
+        job = Job(str(next(self._ids)), data, parameters or dict())
+        self._wachtrij.put_nowait(job)
+        self.jobs[job.id] = job
+        return job.id
+
+    def __ruim_op(self):
+        # verwijdert afgelopen jobs na bewaartijd sec en de oudste boven max_afgelopen, zodat jobs (met hun
+        # resultaat) niet onbeperkt groeit; een verwijderde job is daarna onbekend (HTTP 404)
+        afgelopen = sorted((job for job in self.jobs.values() if job.beeindigd is not None),
+                           key=lambda job: job.beeindigd)
+        grens = time() - self.bewaartijd
+        for i, job in enumerate(afgelopen):
+            if job.beeindigd < grens or i < len(afgelopen) - self.max_afgelopen:
+                del self.jobs[job.id]
+
+    def status(self, job_id: str):
+        return self.jobs[job_id].geef_status()
+
+    def progress(self, job_id: str):
+        return self.jobs[job_id].geef_voortgang()
+
+    def result(self, job_id: str):
+        # OptimizerResult json van een afgewerkte job, None als de job (nog) geen resultaat heeft
+        return self.jobs[job_id].resultaat
+
+    def cancel(self, job_id: str):
+        # annuleert een wachtende job of stopt een lopende job; retourneert False als de job al afgelopen was
+        job = self.jobs[job_id]
+        if job.status not in ("queued", "running"):
+            return False
+        if job.proces is not None:
+            job.proces.terminate()
+        job.status = "cancelled"
+        job.beeindigd = time()
+        job.data = None
+        return True
+
+    async def __werker(self):
+        while True:
+            job = await self._wachtrij.get()
+            try:
+                if job.status == "queued":
+                    await self.__voer_uit(job)
+            finally:
+                self._wachtrij.task_done()
+
+    async def __voer_uit(self, job: Job):
+        ouder, kind = self._context.Pipe(duplex=False)
+        job.proces = self._context.Process(target=_los_job_op, args=(job.data, job.parameters, kind), daemon=True)
+        job.status = "running"
+        job.gestart = time()
+        job.proces.start()
+        kind.close()  # enkel het kindproces schrijft: recv geeft EOFError als het proces stopt
+        job.data = None
+        try:
+            while True:
+                try:
+                    soort, inhoud = await asyncio.to_thread(ouder.recv)
+                except EOFError:
+                    break
+                if soort == "voortgang":
+                    job.voortgang = inhoud
+                elif soort == "resultaat":
+                    job.resultaat = inhoud
+                else:
+                    job.fout = inhoud
+        finally:
+            ouder.close()
+            await asyncio.to_thread(job.proces.join)
+        if job.status == "running":
+            if job.resultaat is not None:
+                job.status = "done"
+            else:
+                job.status = "failed"
+                job.fout = job.fout or "Solver process exited with code %s." % job.proces.exitcode
+            job.beeindigd = time()
+        job.proces = None
+
+    def __route(self, methode: str, pad: str, body: bytes):
+        # retourneert (HTTP status, json tekst)
+        self.__ruim_op()
+        delen = [deel for deel in pad.split("?")[0].split("/") if deel]
+        if delen[:1] != ["jobs"]:
+            return 404, json.dumps(dict(error="Unknown path."))
+        if len(delen) == 1:
+            if methode == "GET":
+                return 200, json.dumps([job.geef_status() for job in self.jobs.values()])
+            if methode != "POST":
+                return 405, json.dumps(dict(error="Use GET or POST."))
+            try:
+                data = json.loads(body)
+            except ValueError:
+                return 400, json.dumps(dict(error="Body is not valid json."))
+            if not isinstance(data, dict):
+                return 400, json.dumps(dict(error="Expected a planning json object."))
+            try:
+                job_id = self.submit(data, data.pop("parameters", None))
+            except asyncio.QueueFull:
+                return 429, json.dumps(dict(error="Queue is full, retry later."))
+            return 202, json.dumps(self.status(job_id))
+        if delen[1] not in self.jobs:
+            return 404, json.dumps(dict(error="Unknown job."))
+        job_id = delen[1]
+        actie = delen[2] if len(delen) > 2 else "status"
+        if actie == "cancel" and methode in ("POST", "DELETE") or actie == "status" and methode == "DELETE":
+            return (200 if self.cancel(job_id) else 409), json.dumps(self.status(job_id))
+        if methode != "GET":
+            return 405, json.dumps(dict(error="Use GET."))
+        if actie == "status":
+            return 200, json.dumps(self.status(job_id))
+        if actie == "progress":
+            return 200, json.dumps(self.progress(job_id))
+        if actie == "result":
+            resultaat = self.result(job_id)
+            if resultaat is None:
+                return 409, json.dumps(self.status(job_id))
+            return 200, resultaat
+        return 404, json.dumps(dict(error="Unknown path."))
+
+    async def __behandel(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # minimale HTTP/1.1 afhandeling: 1 aanvraag per verbinding, json in en uit
+        try:
+            try:
+                methode, pad, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+                headers = dict()
+                while True:
+                    lijn = (await reader.readline()).decode("latin-1").strip()
+                    if not lijn:
+                        break
+                    sleutel, _, waarde = lijn.partition(":")
+                    headers[sleutel.strip().lower()] = waarde.strip()
+                lengte = int(headers.get("content-length", 0))
+                if lengte > self.max_grootte:
+                    status, antwoord = 413, json.dumps(dict(error="Body too large."))
+                else:
+                    status, antwoord = self.__route(methode.upper(), pad, await reader.readexactly(lengte))
+            except (ValueError, asyncio.IncompleteReadError):
+                status, antwoord = 400, json.dumps(dict(error="Malformed request."))
+            data = antwoord.encode()
+            writer.write(("HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n"
+                          "Connection: close\r\n\r\n" % (status, STATUS_TEKST[status], len(data))).encode() + data)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080):
+        # start de dienst en een lokale HTTP server (tot de taak geannuleerd wordt)
+        # POST /jobs (planning json, optioneel met "parameters"), GET /jobs, GET /jobs/<id>,
+        # GET /jobs/<id>/progress, GET /jobs/<id>/result, POST /jobs/<id>/cancel (of DELETE /jobs/<id>)
+        await self.start()
+        server = await asyncio.start_server(self.__behandel, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+
+def main(argumenten: list = None):
+    parser = argparse.ArgumentParser(description="Lokale planningsdienst: ALNS jobs via HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--processen", type=int, default=2)
+    parser.add_argument("--wachtrij", type=int, default=10)
+    parser.add_argument("--bewaartijd", type=float, default=3600.0, help="sec dat een afgelopen job bewaard blijft")
+    parser.add_argument("--max-afgelopen", type=int, default=100, help="maximaal aantal bewaarde afgelopen jobs")
+    args = parser.parse_args(argumenten)
+    try:
+        asyncio.run(PlanningDienst(args.processen, args.wachtrij, bewaartijd=args.bewaartijd,
+                                   max_afgelopen=args.max_afgelopen).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+from time import perf_counter
+from .benchmark import NIVEAUS
+from .generator import InstantieGenerator
+from .instrumentatie import stil
+from .optimalisatie import ALNS, LinearProgramming
+
+# scenario's met vaste seed: generator parameters, methode en (voor ALNS) iteraties en operatoren
+SCENARIOS = {
+    "alns_klein": dict(generator=NIVEAUS["klein"]["generator"], methode="alns", iteraties=300,
+                       destroy=('random', 'worst', 'related', 'leg'), repair=('greedy', 'random', 'regret')),
+    "alns_middel": dict(generator=NIVEAUS["middel"]["generator"], methode="alns", iteraties=60,
+                        destroy=('random', 'worst', 'related', 'leg'), repair=('greedy', 'random', 'regret')),
+    "lp_klein": dict(generator=NIVEAUS["klein"]["generator"], methode="lp"),
+}
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regressie_baseline.json")
+
+
+class Regressie:
+
+    def __init__(self, baseline: str = BASELINE, scenarios: list = None, seed: int = 0,
+                 tolerantie_tijd: float = 0.5, tolerantie_kost: float = 1e-6, marge_tijd: float = 0.25,
+                 aantal_fasen: int = 5):
+        # voert de scenario's uit en vergelijkt ze met de baseline (json bestand, zie maak_baseline)
+        # tolerantie_tijd: relatieve marge op tijd en iteraties/sec (0.5 = 50% trager is nog geen regressie)
+        # marge_tijd: absolute marge in sec bovenop tolerantie_tijd (korte scenario's zijn relatief onnauwkeurig)
+        # tolerantie_kost: relatieve marge op de (golden) eindkost, die bij een vaste seed exact reproduceerbaar is
+        # aantal_fasen: aantal traagste fasen uit de instrumentatie dat in het rapport van een regressie komt
+        self.baseline = baseline
+        self.scenarios = list(SCENARIOS) if scenarios is None else scenarios
+        self.seed = seed
+        self.tolerantie_tijd = tolerantie_tijd
+        self.tolerantie_kost = tolerantie_kost
+        self.marge_tijd = marge_tijd
+        self.aantal_fasen = aantal_fasen
+        self.resultaten = None
+
+    def run_scenario(self, naam: str):
+        scenario = SCENARIOS[naam]
+        planning = InstantieGenerator(seed=self.seed, **scenario["generator"]).geef_planning(naam)
+        if scenario["methode"] == "alns":
+            methode = ALNS(planning, iterations=scenario["iteraties"], seed=self.seed, collect_stats=False)
+            methode.add_destroy_operators(*scenario["destroy"])
+            methode.add_repair_operators(*scenario["repair"])
+            methode.add_simulated_annealing()
+        else:
+            methode = LinearProgramming(planning)
+        methode.add_instrumentation()
+        with stil():
+            start = perf_counter()
+            methode.solve()
+            tijd = perf_counter() - start
+        resultaat = dict(kost=methode.planning.geef_totale_kost(), tijd=tijd,
+                         fasen=methode.instrumentation_report(as_json=False))
+        if scenario["methode"] == "alns":
+            resultaat["iteraties"] = methode.aantal_iteraties
+            resultaat["iteraties_per_sec"] = methode.aantal_iteraties / tijd
+        return resultaat
+
+    def run(self):
+        self.resultaten = {naam: self.run_scenario(naam) for naam in self.scenarios}
+        return self.resultaten
+
+    def maak_baseline(self):
+        # schrijft de resultaten van de laatste run als nieuwe baseline (golden kosten en referentietijden)
+        # de tijden zijn machine afhankelijk: maak de baseline op de machine waar de regressietest draait
+        # scenario's die niet uitgevoerd werden, blijven behouden uit de bestaande baseline (met dezelfde seed)
+        scenarios = dict()
+        if os.path.exists(self.baseline):
+            with open(self.baseline) as f:
+                bestaande = json.load(f)
+            if bestaande["seed"] == self.seed:
+                scenarios = bestaande["scenarios"]
+        scenarios.update({naam: {sleutel: waarde for sleutel, waarde in resultaat.items() if sleutel != "fasen"}
+                          for naam, resultaat in self.resultaten.items()})
+        baseline = dict(python=sys.version.split()[0], seed=self.seed, scenarios=scenarios)
+        with open(self.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+
+    def vergelijk(self):
+        # vergelijkt de resultaten van de laatste run met de baseline
+        # retourneert het rapport: {ok, regressies, scenarios}; elke regressie bevat scenario, metriek,
+        # baseline, waarde en de traagste fasen van dat scenario
+        with open(self.baseline) as f:
+            baseline = json.load(f)
+        if baseline["seed"] != self.seed:
+            raise ValueError("The baseline was made with seed %s, not %s." % (baseline["seed"], self.seed))
+        regressies = []
+        for naam, resultaat in self.resultaten.items():
+            referentie = baseline["scenarios"].get(naam)
+            if referentie is None:
+                continue
+            afwijkingen = []
+            if abs(resultaat["kost"] - referentie["kost"]) > self.tolerantie_kost * max(1.0, abs(referentie["kost"])):
+                afwijkingen.append("kost")
+            if resultaat["tijd"] > referentie["tijd"] * (1 + self.tolerantie_tijd) + self.marge_tijd:
+                afwijkingen.append("tijd")
+            if "iteraties_per_sec" in referentie and \
+                    resultaat["iteraties_per_sec"] < referentie["iteraties_per_sec"] / (1 + self.tolerantie_tijd):
+                afwijkingen.append("iteraties_per_sec")
+            traagste = [dict(naam=fase, **meting) for fase, meting in
+                        list(resultaat["fasen"].items())[:self.aantal_fasen]]  # het rapport is al gesorteerd
+            for metriek in afwijkingen:
+                regressies.append(dict(scenario=naam, metriek=metriek, baseline=referentie[metriek],
+                                       waarde=resultaat[metriek], traagste_fasen=traagste))
+        scenarios = {naam: {sleutel: waarde for sleutel, waarde in resultaat.items() if sleutel != "fasen"}
+                     for naam, resultaat in self.resultaten.items()}
+        return dict(ok=not regressies, regressies=regressies, scenarios=scenarios)
+
+
+def main(argumenten: list = None):
+    parser = argparse.ArgumentParser(description="Regressietest van ALNS en LP tegen een opgeslagen baseline.")
+    parser.add_argument("scenarios", nargs="*", help="een of meer van %s (standaard alle)" % ", ".join(SCENARIOS))
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update", action="store_true", help="schrijf de resultaten als nieuwe baseline")
+    parser.add_argument("--rapport", help="schrijf het json rapport naar dit bestand (standaard enkel bij regressie)")
+    parser.add_argument("--tolerantie-tijd", type=float, default=0.5)
+    args = parser.parse_args(argumenten)
+    onbekend = [naam for naam in args.scenarios if naam not in SCENARIOS]
+    if onbekend:
+        parser.error("unknown scenario: %s" % ", ".join(onbekend))
+    regressie = Regressie(args.baseline, args.scenarios or None, tolerantie_tijd=args.tolerantie_tijd)
+    regressie.run()
+    if args.update:
+        regressie.maak_baseline()
+        print("Baseline written to", args.baseline)
+        return 0
+    rapport = regressie.vergelijk()
+    for item in rapport["regressies"]:
+        print("REGRESSION %s %s: baseline %s, now %s (slowest: %s)" %
+              (item["scenario"], item["metriek"], item["baseline"], item["waarde"],
+               ", ".join(fase["naam"] for fase in item["traagste_fasen"])))
+    if args.rapport or not rapport["ok"]:
+        pad = args.rapport or "regressie_rapport.json"
+        with open(pad, 'w') as f:
+            json.dump(rapport, f, indent=2)
+        print("Report written to", pad)
+    if rapport["ok"]:
+        print("OK:", ", ".join(rapport["scenarios"]))
+    return 0 if rapport["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
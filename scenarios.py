@@ -0,0 +1,106 @@
+from __future__ import annotations
+import itertools
+from time import perf_counter
+from .optimalisatie import Methode, ALNS, LinearProgramming
+
+PARAMETERS = ("emissiefactor", "boete_te_vroeg", "boete_te_laat")
+
+
+def geef_raster(emissiefactoren: list = (None,), boetes_te_laat: list = (None,)):
+    # alle combinaties van emissiefactoren en boetes te laat als scenario's (None = waarde van de order)
+    return [dict(emissiefactor=emissiefactor, boete_te_laat=boete_te_laat)
+            for emissiefactor, boete_te_laat in itertools.product(emissiefactoren, boetes_te_laat)]
+
+
+class Scenarios:
+
+    def __init__(self, methode: Methode, iterations: int = 200, time_limit: float = None,
+                 max_no_improvement: int = None):
+        # lost een reeks scenario's met andere emissiefactor en/of boetes op met dezelfde methode
+        # LinearProgramming: het model wordt 1 keer opgebouwd, per scenario wordt enkel de objective vervangen
+        # en start CBC vanaf de oplossing van het vorige scenario
+        # ALNS (al geconfigureerd met operatoren en criterium): het eerste scenario wordt volledig opgelost, elk
+        # volgend scenario vertrekt van de beste planning van het vorige (ALNS.reoptimize met iterations,
+        # time_limit en max_no_improvement)
+        if not isinstance(methode, (ALNS, LinearProgramming)):
+            raise ValueError("Scenarios requires an ALNS or LinearProgramming method.")
+        self.methode = methode
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.max_no_improvement = max_no_improvement
+        self.tabel = None
+
+    def __solve(self, eerste: bool):
+        methode = self.methode
+        if isinstance(methode, LinearProgramming):
+            methode.solve(warm_start=not eerste)
+            return methode.pulp.status == 1
+        if eerste:
+            methode.solve(max_no_improvement=self.max_no_improvement)
+        else:
+            methode.reoptimize(self.iterations, self.time_limit, self.max_no_improvement)
+        return True
+
+    def __geef_rij(self, scenario: dict, opgelost: bool, tijd: float):
+        planning = self.methode.planning
+        rij = {parameter: scenario.get(parameter) for parameter in PARAMETERS}
+        rij.update(status="ok" if opgelost else "infeasible", kost=None, prijs=None, emissie=None, emissiekost=None,
+                   boete=None, niet_gepland=None, tijd=tijd)
+        if opgelost:
+            kostenopbouw = [kostenopbouw for kostenopbouw in planning.kostenopbouw if kostenopbouw is not None]
+            rij.update(kost=planning.geef_totale_kost(), niet_gepland=len(planning.te_plannen),
+                       **{kolom: sum(kosten[kolom] for kosten in kostenopbouw)
+                          for kolom in ("prijs", "emissie", "emissiekost", "boete")})
+        return rij
+
+    def run(self, scenarios: list):
+        # scenarios: lijst van dicts met emissiefactor, boete_te_vroeg en/of boete_te_laat (voor alle orders,
+        # ontbrekend of None = de oorspronkelijke waarde van elke order), vb. geef_raster
+        # retourneert de tabel: per scenario een dict met de parameters, status, kost, prijs, emissie,
+        # emissiekost, boete, niet_gepland, tijd (sec) en pareto (niet gedomineerd in prijs en emissie)
+        # na run hebben de orders opnieuw hun oorspronkelijke waarden, de planning is die van het laatste scenario
+        for scenario in scenarios:
+            onbekend = set(scenario) - set(PARAMETERS)
+            if onbekend:
+                raise ValueError("Unknown scenario parameters: %s." % ", ".join(sorted(onbekend)))
+        origineel = [tuple(getattr(order, parameter) for parameter in PARAMETERS) for order in self.methode.planning.orders]
+        self.tabel = []
+        try:
+            for i, scenario in enumerate(scenarios):
+                start = perf_counter()
+                self.__zet_kostparameters(origineel, scenario)
+                if isinstance(self.methode, LinearProgramming) and i > 0:
+                    self.methode.update_objective()
+                opgelost = self.__solve(i == 0)
+                self.tabel.append(self.__geef_rij(scenario, opgelost, perf_counter() - start))
+        finally:
+            self.__zet_kostparameters(origineel, dict())
+        self.__markeer_pareto()
+        return self.tabel
+
+    def __zet_kostparameters(self, origineel: list, scenario: dict):
+        # de waarden van het scenario, anders de oorspronkelijke waarden van de order
+        # 1 Planning.wijzig_kostparameters per combinatie van waarden (na een ALNS solve is de planning een andere)
+        planning = self.methode.planning
+        groepen = dict()
+        for order, waarden in zip(planning.orders, origineel):
+            waarden = tuple(waarde if scenario.get(parameter) is None else scenario[parameter]
+                            for parameter, waarde in zip(PARAMETERS, waarden))
+            groepen.setdefault(waarden, []).append(order)
+        for waarden, orders in groepen.items():
+            planning.wijzig_kostparameters(orders, *waarden)
+
+    def __markeer_pareto(self):
+        opgelost = [rij for rij in self.tabel if rij["status"] == "ok"]
+        for rij in self.tabel:
+            rij["pareto"] = rij["status"] == "ok" and not any(
+                ander["prijs"] <= rij["prijs"] and ander["emissie"] <= rij["emissie"] and
+                (ander["prijs"] < rij["prijs"] or ander["emissie"] < rij["emissie"]) for ander in opgelost)
+
+    def geef_pareto(self):
+        # de niet gedomineerde scenario's, gesorteerd op prijs
+        return sorted((rij for rij in self.tabel if rij["pareto"]), key=lambda rij: rij["prijs"])
+
+    def dataframe(self):
+        import pandas as pd  # enkel nodig voor de DataFrame
+        return pd.DataFrame(self.tabel)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+import csv
+import os
+import numpy as np
+
+UITKOMSTEN = ["best", "better", "accepted", "rejected"]  # uitkomst van een iteratie (index in de operator counts)
+
+
+class Statistieken:
+
+    def __init__(self, max_punten: int = 10000, sink: str = None, hervat: bool = False):
+        # verzamelt ALNS statistieken met begrensd geheugen, bruikbaar als alns Statistics object
+        # max_punten: maximaal aantal bewaarde objectives; is de trace vol, dan wordt elk tweede punt verwijderd
+        # en wordt daarna nog maar de helft van de iteraties bewaard (de trace dekt dus altijd de volledige run)
+        # sink: optioneel pad naar een .csv (elke iteratie wordt weggeschreven) of .npz (trace en counters bij close)
+        # hervat: bij een hervatte solve wordt een bestaande .csv sink aangevuld in plaats van overschreven
+        self.max_punten = max_punten
+        self.sink = sink
+        self.stap = 1  # elke stap-de iteratie wordt in de trace bewaard
+        self.aantal = 0  # aantal verzamelde objectives
+        self.beste = float('inf')
+        self._iteraties = []
+        self._objectives = []
+        self._beste_objectives = []
+        self._destroy_operator_counts = dict()
+        self._repair_operator_counts = dict()
+        self._csv_bestand = None
+        self._csv = None
+        if sink is not None and sink.endswith(".csv"):
+            aanvullen = hervat and os.path.exists(sink)
+            self._csv_bestand = open(sink, 'a' if aanvullen else 'w', newline='')
+            self._csv = csv.writer(self._csv_bestand)
+            if not aanvullen:
+                self._csv.writerow(["iteratie", "objective", "beste", "destroy", "repair", "uitkomst"])
+
+    @property
+    def iteraties(self):
+        return np.array(self._iteraties)
+
+    @property
+    def objectives(self):
+        # objectives van de huidige oplossing in de (uitgedunde) trace
+        return np.array(self._objectives)
+
+    @property
+    def beste_objectives(self):
+        # beste objective tot en met elke iteratie in de trace (ook verbeteringen tussen 2 bewaarde punten)
+        return np.array(self._beste_objectives)
+
+    @property
+    def destroy_operator_counts(self):
+        # operator naam -> [best, better, accepted, rejected]
+        return self._destroy_operator_counts
+
+    @property
+    def repair_operator_counts(self):
+        # operator naam -> [best, better, accepted, rejected]
+        return self._repair_operator_counts
+
+    def collect_objective(self, objective: float):
+        if objective < self.beste:
+            self.beste = objective
+        if self.aantal % self.stap == 0:
+            self._iteraties.append(self.aantal)
+            self._objectives.append(objective)
+            self._beste_objectives.append(self.beste)
+            if len(self._iteraties) > self.max_punten:  # trace uitdunnen
+                self._iteraties = self._iteraties[::2]
+                self._objectives = self._objectives[::2]
+                self._beste_objectives = self._beste_objectives[::2]
+                self.stap *= 2
+        self.aantal += 1
+
+    def collect_destroy_operator(self, operator_name: str, weight_idx: int):
+        self._destroy_operator_counts.setdefault(operator_name, [0, 0, 0, 0])[weight_idx] += 1
+
+    def collect_repair_operator(self, operator_name: str, weight_idx: int):
+        self._repair_operator_counts.setdefault(operator_name, [0, 0, 0, 0])[weight_idx] += 1
+
+    def collect_iteratie(self, objective: float, destroy: str, repair: str, weight_idx: int):
+        # verzamelt het resultaat van 1 ALNS iteratie
+        iteratie = self.aantal
+        self.collect_objective(objective)
+        self.collect_destroy_operator(destroy, weight_idx)
+        self.collect_repair_operator(repair, weight_idx)
+        if self._csv is not None:
+            self._csv.writerow([iteratie, objective, self.beste, destroy, repair, UITKOMSTEN[weight_idx]])
+
+    def close(self):
+        # sluit de sink af: .csv wordt gesloten, .npz wordt weggeschreven
+        if self._csv_bestand is not None:
+            self._csv_bestand.close()
+            self._csv_bestand = None
+            self._csv = None
+        elif self.sink is not None and self.sink.endswith(".npz"):
+            np.savez(self.sink, iteraties=self.iteraties, objectives=self.objectives,
+                     beste_objectives=self.beste_objectives, stap=self.stap, aantal=self.aantal,
+                     destroy_operators=np.array(list(self._destroy_operator_counts), dtype=str),
+                     destroy_counts=np.array(list(self._destroy_operator_counts.values()), dtype=int).reshape(-1, 4),
+                     repair_operators=np.array(list(self._repair_operator_counts), dtype=str),
+                     repair_counts=np.array(list(self._repair_operator_counts.values()), dtype=int).reshape(-1, 4))
+
+    @classmethod
+    def laad(cls, pad: str, max_punten: int = 10000):
+        # laadt statistieken die met een .csv of .npz sink werden weggeschreven (bv. om nadien te plotten)
+        # max_punten: enkel voor een .csv sink, de trace wordt opnieuw opgebouwd en uitgedund zoals tijdens de solve
+        if pad.endswith(".csv"):
+            return cls.__laad_csv(pad, max_punten)
+        data = np.load(pad)
+        statistieken = cls(max_punten=max(len(data["iteraties"]), 1))
+        statistieken.stap = int(data["stap"])
+        statistieken.aantal = int(data["aantal"])
+        statistieken._iteraties = data["iteraties"].tolist()
+        statistieken._objectives = data["objectives"].tolist()
+        statistieken._beste_objectives = data["beste_objectives"].tolist()
+        if statistieken._beste_objectives:
+            statistieken.beste = statistieken._beste_objectives[-1]
+        statistieken._destroy_operator_counts = dict(zip(data["destroy_operators"].tolist(),
+                                                         data["destroy_counts"].tolist()))
+        statistieken._repair_operator_counts = dict(zip(data["repair_operators"].tolist(),
+                                                        data["repair_counts"].tolist()))
+        return statistieken
+
+    @classmethod
+    def __laad_csv(cls, pad: str, max_punten: int):
+        # na een hervatte solve kan de csv iteraties bevatten die na het laatste checkpoint liggen en daarna
+        # opnieuw werden uitgevoerd: enkel de rijen van de hervatte solve worden behouden
+        rijen = []
+        with open(pad, newline='') as f:
+            lezer = csv.reader(f)
+            next(lezer, None)  # header
+            for iteratie, objective, beste, destroy, repair, uitkomst in lezer:
+                iteratie = int(iteratie)
+                while rijen and rijen[-1][0] >= iteratie:
+                    rijen.pop()
+                rijen.append((iteratie, float(objective), float(beste), destroy, repair, UITKOMSTEN.index(uitkomst)))
+        statistieken = cls(max_punten=max_punten)
+        for iteratie, objective, beste, destroy, repair, weight_idx in rijen:
+            statistieken.aantal = iteratie
+            statistieken.beste = min(statistieken.beste, beste)
+            statistieken.collect_iteratie(objective, destroy, repair, weight_idx)
+        return statistieken
+
+    def __getstate__(self):
+        # het open csv bestand wordt niet mee gekopieerd of gepickled
+        state = self.__dict__.copy()
+        state["_csv_bestand"] = None
+        state["_csv"] = None
+        return state
+
+    def plot_objectives(self, ax=None, title: str = "Objective value at each iteration"):
+        import matplotlib.pyplot as plt
+        if ax is None:
+            _, ax = plt.subplots()
+        ax.plot(self.iteraties, self.objectives)
+        ax.plot(self.iteraties, self.beste_objectives)
+        ax.set_title(title)
+        ax.set_ylabel("Objective value")
+        ax.set_xlabel("Iteration (#)")
+        ax.legend(["Current", "Best"], loc="upper right")
+        plt.draw_if_interactive()
+
+    def plot_operator_counts(self, figure=None, title: str = None, legend: list = None):
+        # legend: maximaal 4 namen voor de uitkomsten best, better, accepted en rejected
+        import matplotlib.pyplot as plt
+        if figure is None:
+            figure = plt.figure()
+            figure.subplots_adjust(hspace=0.7, bottom=0.2)
+        if title is not None:
+            figure.suptitle(title)
+        if legend is None:
+            legend = ["Best", "Better", "Accepted", "Rejected"]
+        d_ax, r_ax = figure.subplots(nrows=2)
+        for ax, counts, naam in ((d_ax, self._destroy_operator_counts, "Destroy operators"),
+                                 (r_ax, self._repair_operator_counts, "Repair operators")):
+            namen = list(counts)
+            waarden = np.array(list(counts.values()), dtype=int).reshape(-1, 4)[:, :len(legend)]
+            links = np.zeros(len(namen), dtype=int)
+            for idx in range(len(legend)):
+                ax.barh(namen, waarden[:, idx], left=links, height=0.5)
+                links += waarden[:, idx]
+            ax.set_title(naam)
+            ax.set_xlabel("Iterations where operator resulted in this outcome (#)")
+            ax.set_ylabel("Operator")
+        figure.legend(legend, ncol=len(legend), loc="lower center")
+        plt.draw_if_interactive()
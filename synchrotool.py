@@ -1,6 +1,75 @@
 from __future__ import annotations
-import pandas as pd
+import bisect
+import copy
+import heapq
 from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+from .instrumentatie import gemeten
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# attributen van Planning die een fork met zijn ouder deelt tot een van beide ze wijzigt (copy-on-write)
+GEDEELD = ("locaties", "terminals", "verladers", "empty_depots", "containertypes", "orders", "ordercapaciteiten",
+           "containers", "orders_op_ophaaltijd", "orders_per_van", "orders_per_naar")
+EPOCH = datetime(2000, 1, 1)  # tijden worden ook bijgehouden als aantal minuten sinds EPOCH
+MINUUT = timedelta(minutes=1)
+MICROSECONDE = timedelta(microseconds=1)
+MICROSECONDEN = MINUUT // MICROSECONDE  # per minuut
+
+
+def __geef_minuten_van_microseconden(microseconden: int):
+    minuten, rest = divmod(microseconden, MICROSECONDEN)
+    return minuten if not rest else microseconden / MICROSECONDEN
+
+
+def geef_minuten(tijd: datetime | timedelta):
+    # minuten sinds EPOCH (datetime) of duur in minuten (timedelta), exact zoals datetime (op de microseconde):
+    # een int als de tijd op een hele minuut valt (het gewone geval), anders een float met de fractie
+    if isinstance(tijd, datetime):
+        tijd = tijd - EPOCH
+    return __geef_minuten_van_microseconden(tijd // MICROSECONDE)
+
+
+def rond_minuten(minuten: int | float):
+    # rondt een berekend aantal minuten (vb. vertrek + duur van een adhoc leg) af op de microseconde,
+    # zodat het gelijk is aan geef_minuten van hetzelfde tijdstip
+    if isinstance(minuten, int):
+        return minuten
+    return __geef_minuten_van_microseconden(int(round(minuten * MICROSECONDEN)))
+
+
+def geef_tijdstip(minuten: int | float):
+    if isinstance(minuten, int):
+        return EPOCH + timedelta(minutes=minuten)
+    return EPOCH + int(round(minuten * MICROSECONDEN)) * MICROSECONDE
+
+
+class Tijdstip:
+    # datetime attribuut dat ook als aantal minuten sinds EPOCH bijgehouden wordt in <naam>_minuut (zie
+    # geef_minuten: een int, of een float als het tijdstip niet op een hele minuut valt), zodat de hot paths
+    # tijden als getallen vergelijken en verrekenen zonder af te ronden
+    # een getal wordt als minuten geïnterpreteerd: de datetime wordt dan pas bij gebruik (I/O) gemaakt
+
+    def __set_name__(self, eigenaar, naam: str):
+        self.naam = "_" + naam
+        self.minuut = naam + "_minuut"
+
+    def __get__(self, obj, eigenaar=None):
+        if obj is None:
+            return self
+        tijdstip = obj.__dict__[self.naam]
+        if tijdstip is None:
+            tijdstip = obj.__dict__[self.naam] = geef_tijdstip(obj.__dict__[self.minuut])
+        return tijdstip
+
+    def __set__(self, obj, tijdstip: datetime | int | float):
+        if isinstance(tijdstip, datetime):
+            obj.__dict__[self.naam] = tijdstip
+            obj.__dict__[self.minuut] = geef_minuten(tijdstip)
+        else:
+            obj.__dict__[self.naam] = None
+            obj.__dict__[self.minuut] = rond_minuten(tijdstip)
 
 
 class Object:
@@ -99,8 +168,13 @@ class VanNaar(Object):
         # self.naar == van_naar.naar?
         return self.naar == van_naar.naar
 
+    def _rij(self):
+        # kolommen van 1 rij in de dataframe
+        return dict(id=self.id, van=self.van, naar=self.naar)
+
     def dataframe(self):
-        return pd.DataFrame(dict(id=[self.id], van=[self.van], naar=[self.naar]))
+        import pandas as pd
+        return pd.DataFrame({kolom: [waarde] for kolom, waarde in self._rij().items()})
 
     def __lt__(self, other):
         return self.komt_voor(other)
@@ -113,8 +187,13 @@ class VanNaar(Object):
 
 
 class Leg(VanNaar):
+    checkin = Tijdstip()
+    vertrek = Tijdstip()
+    aankomst = Tijdstip()
 
-    def __init__(self, id: int, van: Locatie, naar: Locatie, checkin: datetime, vertrek: datetime, aankomst: datetime):
+    def __init__(self, id: int, van: Locatie, naar: Locatie, checkin: datetime | int, vertrek: datetime | int,
+                 aankomst: datetime | int):
+        # tijden als datetime of als minuten sinds EPOCH (zie Tijdstip)
         VanNaar.__init__(self, id, van, naar)
         self.checkin = checkin
         self.vertrek = vertrek
@@ -144,24 +223,23 @@ class Leg(VanNaar):
         return self.capaciteiten[containertype].emissie if containertype in self.capaciteiten else 0
 
     def komt_voor(self, leg: Leg):
-        return VanNaar.komt_voor(self, leg) and self.aankomst <= leg.checkin
+        return self.naar == leg.van and self.aankomst_minuut <= leg.checkin_minuut
 
     def komt_na(self, leg: Leg):
-        return VanNaar.komt_na(self, leg) and self.checkin >= leg.aankomst
+        return self.van == leg.naar and self.checkin_minuut >= leg.aankomst_minuut
 
     def is_mogelijk_begin(self, order: Order):
-        return self.zelfde_van(order) and \
-               order.min_ophaaltijd <= self.checkin <= order.max_ophaaltijd
+        return self.van == order.van and \
+               order.min_ophaaltijd_minuut <= self.checkin_minuut <= order.max_ophaaltijd_minuut
 
     def is_mogelijk_einde(self, order: Order):
-        return self.zelfde_naar(order) and \
-               self.aankomst <= order.uiterste_levertijd
+        return self.naar == order.naar and \
+               self.aankomst_minuut <= order.uiterste_levertijd_minuut
 
-    def dataframe(self):
-        df1 = VanNaar.dataframe(self)
-        df1.columns = ["leg_" + column for column in df1.columns]
-        df2 = pd.DataFrame(dict(dag=[self.dag], checkin=[self.checkin], vertrek=[self.vertrek], aankomst=[self.aankomst]))
-        return pd.concat((df1, df2), axis=1)
+    def _rij(self):
+        rij = {"leg_" + kolom: waarde for kolom, waarde in VanNaar._rij(self).items()}
+        rij.update(dag=self.dag, checkin=self.checkin, vertrek=self.vertrek, aankomst=self.aankomst)
+        return rij
 
     def __repr__(self):
         if self.modus == "":
@@ -171,6 +249,11 @@ class Leg(VanNaar):
 
 
 class Order(VanNaar):
+    min_ophaaltijd = Tijdstip()
+    max_ophaaltijd = Tijdstip()
+    min_levertijd = Tijdstip()
+    max_levertijd = Tijdstip()
+    uiterste_levertijd = Tijdstip()
 
     def __init__(self, id: int, van: Locatie, naar: Locatie,
                  min_ophaaltijd: datetime, max_ophaaltijd: datetime,
@@ -191,14 +274,13 @@ class Order(VanNaar):
         self._voeg_capaciteit_toe(containertype, ordercapaciteit)
         return ordercapaciteit
 
-    def dataframe(self):
-        df1 = VanNaar.dataframe(self)
-        df1.columns = ["order_" + column for column in df1.columns]
-        df2 = pd.DataFrame(dict(min_ophaaltijd=[self.min_ophaaltijd], max_ophaaltijd=[self.max_ophaaltijd],
-                                min_levertijd=[self.min_levertijd], max_levertijd=[self.max_levertijd],
-                                uiterste_levertijd=[self.uiterste_levertijd], emissiefactor=[self.emissiefactor],
-                                boete_te_vroeg=[self.boete_te_vroeg], boete_te_laat=[self.boete_te_laat]))
-        return pd.concat((df1, df2), axis=1)
+    def _rij(self):
+        rij = {"order_" + kolom: waarde for kolom, waarde in VanNaar._rij(self).items()}
+        rij.update(min_ophaaltijd=self.min_ophaaltijd, max_ophaaltijd=self.max_ophaaltijd,
+                   min_levertijd=self.min_levertijd, max_levertijd=self.max_levertijd,
+                   uiterste_levertijd=self.uiterste_levertijd, emissiefactor=self.emissiefactor,
+                   boete_te_vroeg=self.boete_te_vroeg, boete_te_laat=self.boete_te_laat)
+        return rij
 
 
 class Capaciteit:
@@ -212,9 +294,16 @@ class Capaciteit:
     def __repr__(self):
         return f"{self._van_naar} ({self.aantal} {self.containertype})"
 
+    def _rij(self, prefix: str = ""):
+        # prefix wordt voor de kolommen aantal en containertype geplaatst
+        rij = self._van_naar._rij()
+        rij[prefix + "aantal"] = self.aantal
+        rij[prefix + "containertype"] = self.containertype
+        return rij
+
     def dataframe(self):
-        df = pd.DataFrame(dict(aantal=[self.aantal], containertype=[self.containertype]))
-        return pd.concat((self._van_naar.dataframe(), df), axis=1)
+        import pandas as pd
+        return pd.DataFrame({kolom: [waarde] for kolom, waarde in self._rij().items()})
 
 
 class LegCapaciteit(Capaciteit):
@@ -233,6 +322,11 @@ class LegCapaciteit(Capaciteit):
     def beschikbaar(self):
         return self.aantal - len(self.containers)
 
+    @property
+    def is_adhoc(self):
+        # adhoc legs hebben een negatief id, legs uit de dienstregeling een id >= 0
+        return self.leg.id < 0
+
     def komt_voor(self, legcapaciteit: LegCapaciteit):
         return self.leg.komt_voor(legcapaciteit.leg) and \
                self.containertype == legcapaciteit.containertype and \
@@ -253,10 +347,10 @@ class LegCapaciteit(Capaciteit):
                self.containertype == container.containertype and \
                self.beschikbaar > 0
 
-    def dataframe(self):
-        df1 = Capaciteit.dataframe(self).rename(columns=dict(aantal="leg_aantal", containertype="leg_containertype"))
-        df2 = pd.DataFrame(dict(prijs=[self.prijs], emissie=[self.emissie]))
-        return pd.concat((df1, df2), axis=1)
+    def _rij(self, prefix: str = "leg_"):
+        rij = Capaciteit._rij(self, prefix)
+        rij.update(prijs=self.prijs, emissie=self.emissie)
+        return rij
 
     def __lt__(self, other):
         return self.leg < other.leg
@@ -274,8 +368,8 @@ class OrderCapaciteit(Capaciteit):
     def order(self):
         return self._van_naar
 
-    def dataframe(self):
-        return Capaciteit.dataframe(self).rename(columns=dict(aantal="order_aantal", containertype="order_containertype"))
+    def _rij(self, prefix: str = "order_"):
+        return Capaciteit._rij(self, prefix)
 
 
 class Container(Object):
@@ -332,8 +426,14 @@ class Container(Object):
     def boete_te_laat(self):
         return self.order.boete_te_laat
 
+    def _rij(self):
+        rij = dict(containerid=self.id)
+        rij.update(self.ordercapaciteit._rij())
+        return rij
+
     def dataframe(self):
-        return pd.concat((pd.DataFrame(dict(containerid=[self.id])), self.ordercapaciteit.dataframe()), axis=1)
+        import pandas as pd
+        return pd.DataFrame({kolom: [waarde] for kolom, waarde in self._rij().items()})
 
     def __repr__(self):
         return f"{self.containertype}: {self.order}"
@@ -357,39 +457,82 @@ class Planning:
         self.containers = []  # list: containers[i] -> OrderCapaciteit object van container i
         self.trajecten = []  # list: trajecten[i] -> traject van container i = list van opeenvolgende legcapaciteiten
         self.kosten = []  # list: kosten[i] -> kost van traject i
+        self.kostenopbouw = []  # list: kostenopbouw[i] -> dict met prijs, emissie en boete van traject i
         self.te_plannen = set()  # set met ids van containers die nog in te plannen zijn
         self.gepland = set()  # set met ids van containers die al ingepland zijn
+        self.geannuleerd = set()  # set met ids van containers van geannuleerde orders (niet meer in te plannen)
+        self.kosten_heap = []  # heap met (-kost, container_id), verouderde elementen worden pas bij gebruik verwijderd
+        self.orders_op_ophaaltijd = []  # gesorteerde list met (min_ophaaltijd_minuut, order id)
+        self.orders_per_van = {}  # dict: locatie -> gesorteerde list met (min_ophaaltijd_minuut, order id)
+        self.orders_per_naar = {}  # dict: locatie -> gesorteerde list met (min_ophaaltijd_minuut, order id)
+        self.__gedeeld = set()  # namen uit GEDEELD die (nog) gedeeld worden met een fork of de ouder
+        self.__gedeelde_orders = set()  # ids van Order objecten die (nog) gedeeld worden met een fork of de ouder
+
+    def __maak_eigen(self, *namen):
+        # copy-on-write: kopieert gedeelde lists en dicts (van lists) voor de eerste wijziging
+        for naam in namen:
+            if naam in self.__gedeeld:
+                waarde = getattr(self, naam)
+                setattr(self, naam, {sleutel: list(lijst) for sleutel, lijst in waarde.items()}
+                        if isinstance(waarde, dict) else list(waarde))
+                self.__gedeeld.discard(naam)
+
+    def __maak_orders_eigen(self, orders: list):
+        # copy-on-write: vervangt gedeelde orders (en hun ordercapaciteiten) door een eigen kopie
+        # retourneert de eigen orders in dezelfde volgorde
+        gedeeld = [order for order in orders if order.id in self.__gedeelde_orders]
+        if gedeeld:
+            self.__maak_eigen("orders", "containers")
+            vervangen = dict()  # gedeelde ordercapaciteit -> eigen kopie
+            for order in gedeeld:
+                kopie = copy.copy(order)
+                kopie.capaciteiten = dict()
+                for containertype, ordercapaciteit in order.capaciteiten.items():
+                    vervangen[ordercapaciteit] = kopie.capaciteiten[containertype] = copy.copy(ordercapaciteit)
+                    vervangen[ordercapaciteit]._van_naar = kopie
+                    for container_id in ordercapaciteit.containers:
+                        self.containers[container_id] = vervangen[ordercapaciteit]
+                self.orders[order.id] = kopie
+                self.__gedeelde_orders.discard(order.id)
+            self.ordercapaciteiten = [vervangen.get(oc, oc) for oc in self.ordercapaciteiten]
+            self.__gedeeld.discard("ordercapaciteiten")
+        return [self.orders[order.id] for order in orders]
 
     def __voeg_locatie_toe(self, naam: str, functie):
         # functie is klasse: Terminal, Verlader of EmptyDepot
+        self.__maak_eigen("locaties")
         id = len(self.locaties)
         locatie = functie(id, naam)
         self.locaties.append(locatie)
         return locatie
 
     def voeg_terminal_toe(self, naam: str):
+        self.__maak_eigen("terminals")
         terminal = self.__voeg_locatie_toe(naam, Terminal)
         self.terminals.append(terminal)
         return terminal
 
     def voeg_verlader_toe(self, naam: str):
+        self.__maak_eigen("verladers")
         verlader = self.__voeg_locatie_toe(naam, Verlader)
         self.verladers.append(verlader)
         return verlader
 
     def voeg_empty_depot_toe(self, naam: str):
+        self.__maak_eigen("empty_depots")
         empty_depot = self.__voeg_locatie_toe(naam, EmptyDepot)
         self.empty_depots.append(empty_depot)
         return empty_depot
 
     def voeg_containertype_toe(self, naam: str, gewicht: float):
+        self.__maak_eigen("containertypes")
         id = len(self.containertypes)
         containertype = ContainerType(id, naam, gewicht)
         self.containertypes.append(containertype)
         return containertype
 
     def voeg_leg_toe(self, van: Locatie, naar: Locatie, checkin: datetime, vertrek: datetime, aankomst: datetime):
-        id = len(self.legs)
+        id = self.legs[-1].id + 1 if self.legs else 0  # ids stijgen, ook na reduce (die legs verwijdert)
         leg = Leg(id, van, naar, checkin, vertrek, aankomst)
         self.legs.append(leg)
         return leg
@@ -403,14 +546,21 @@ class Planning:
                        min_ophaaltijd: datetime, max_ophaaltijd: datetime,
                        min_levertijd: datetime, max_levertijd: datetime, uiterste_levertijd: datetime,
                        emissiefactor: float, boete_te_vroeg: float, boete_te_laat: float):
+        self.__maak_eigen("orders", "orders_op_ophaaltijd", "orders_per_van", "orders_per_naar")
         id = len(self.orders)
         order = Order(id, van, naar, min_ophaaltijd, max_ophaaltijd,
                       min_levertijd, max_levertijd, uiterste_levertijd,
                       emissiefactor, boete_te_vroeg, boete_te_laat)
         self.orders.append(order)
+        sleutel = (order.min_ophaaltijd_minuut, id)
+        bisect.insort(self.orders_op_ophaaltijd, sleutel)
+        bisect.insort(self.orders_per_van.setdefault(van, []), sleutel)
+        bisect.insort(self.orders_per_naar.setdefault(naar, []), sleutel)
         return order
 
     def voeg_ordercapaciteit_toe(self, order: Order, aantal: int, containertype: ContainerType):
+        order, = self.__maak_orders_eigen([order])
+        self.__maak_eigen("ordercapaciteiten", "containers")
         ids = [len(self.containers) + id for id in range(aantal)]  # nieuwe container ids
         ordercapaciteit = order.voeg_capaciteit_toe(aantal, containertype)
         ordercapaciteit.containers = ids
@@ -419,14 +569,71 @@ class Planning:
         self.te_plannen = self.te_plannen.union(ids)
         self.trajecten += [[] for _ in range(aantal)]
         self.kosten += [None for _ in range(aantal)]
+        self.kostenopbouw += [None for _ in range(aantal)]
         return ordercapaciteit
 
     def geef_container_object(self, container_id: int):
         return Container(container_id, self.containers[container_id])
 
     def geef_containers(self):
+        # geannuleerde containers worden overgeslagen
         for container_id in range(len(self.containers)):
-            yield self.geef_container_object(container_id)
+            if container_id not in self.geannuleerd:
+                yield self.geef_container_object(container_id)
+
+    def geef_te_plannen_per_ordercapaciteit(self):
+        # groepeert de in te plannen containers per ordercapaciteit
+        # containers van dezelfde ordercapaciteit zijn onderling uitwisselbaar (= equivalentieklasse)
+        # retourneert [[container_ids]] in volgorde van de ordercapaciteiten
+        klassen = dict()
+        for container_id in sorted(self.te_plannen):
+            klassen.setdefault(self.containers[container_id], []).append(container_id)
+        return list(klassen.values())
+
+    @staticmethod
+    def geef_aantal_beschikbaar(traject):
+        # aantal containers dat een traject nog kan volgen: minimum beschikbaarheid van de legcapaciteiten
+        # adhoc capaciteiten zijn onbeperkt en tellen niet mee; None als het traject geen vaste legs bevat
+        beschikbaar = [legcapaciteit.beschikbaar for legcapaciteit in traject if not legcapaciteit.is_adhoc]
+        return min(beschikbaar) if beschikbaar else None
+
+    def geef_duurste_containers(self, aantal: int):
+        # retourneert de ids van maximaal aantal ingeplande containers met de hoogste kost, duurste eerst
+        # gebruikt de kosten_heap: O(aantal * log(n)) in plaats van alle containers te sorteren
+        duurste = []
+        geldig = []
+        while self.kosten_heap and len(duurste) < aantal:
+            element = heapq.heappop(self.kosten_heap)
+            kost, container_id = element
+            if self.kosten[container_id] is None or -kost != self.kosten[container_id]:
+                continue  # verouderd element
+            if not geldig or element != geldig[-1]:  # dubbele elementen liggen naast elkaar in de heap
+                geldig.append(element)
+                duurste.append(container_id)
+        for element in geldig:
+            heapq.heappush(self.kosten_heap, element)
+        return duurste
+
+    def geef_verwante_containers(self, container_id: int, buren: int = 5):
+        # retourneert een set met container ids die verwant zijn aan de gegeven container:
+        # containers die een legcapaciteit van het traject delen en containers van orders met een
+        # nabije ophaaltijd (de buren orders ervoor en erna), globaal en met dezelfde van of naar
+        # het aantal kandidaten hangt af van buren en de legcapaciteiten, niet van het totaal aantal containers
+        order = self.containers[container_id].order
+        sleutel = (order.min_ophaaltijd_minuut, order.id)
+        order_ids = set()
+        for orders in (self.orders_op_ophaaltijd, self.orders_per_van.get(order.van, []),
+                       self.orders_per_naar.get(order.naar, [])):
+            i = bisect.bisect_left(orders, sleutel)
+            order_ids.update(order_id for _, order_id in orders[max(0, i - buren):i + buren + 1])
+        verwant = set()
+        for order_id in order_ids:
+            for ordercapaciteit in self.orders[order_id].capaciteiten.values():
+                verwant.update(ordercapaciteit.containers)
+        for legcapaciteit in self.trajecten[container_id]:
+            verwant.update(legcapaciteit.containers)
+        verwant.discard(container_id)
+        return verwant
 
     def geef_container_traject(self, container_id: int):
         return self.trajecten[container_id]
@@ -434,13 +641,26 @@ class Planning:
     def voeg_container_traject_toe(self, container_id: int, *traject):
         for legcapaciteit in traject:
             legcapaciteit.containers.append(container_id)
-            if legcapaciteit not in self.legcapaciteiten:
+            if legcapaciteit.is_adhoc:  # niet zoeken in legcapaciteiten: O(1) in plaats van O(aantal legs)
                 self.adhoc_capaciteiten.append(legcapaciteit)
         self.trajecten[container_id] = self.__sorteer_container_traject(container_id, *traject)
-        self.kosten[container_id] = self.geef_totale_kost_van_container_traject(container_id)
+        self.kostenopbouw[container_id] = self.geef_kostenopbouw_van_container_traject(container_id)
+        self.kosten[container_id] = self.__totale_kost(self.kostenopbouw[container_id])
+        self.__push_kost(container_id)
         self.te_plannen.remove(container_id)
         self.gepland.add(container_id)
 
+    def __push_kost(self, container_id: int):
+        # voegt de (nieuwe) kost van de container toe aan de kosten_heap, die herbouwd wordt zodra ze te veel
+        # verouderde elementen bevat (anders groeit ze bij elke toewijzing, ook zonder geef_duurste_containers)
+        if self.kosten[container_id] is None:
+            return
+        if len(self.kosten_heap) > 2 * len(self.containers) + 16:
+            self.kosten_heap = [(-kost, i) for i, kost in enumerate(self.kosten) if kost is not None]
+            heapq.heapify(self.kosten_heap)
+        else:
+            heapq.heappush(self.kosten_heap, (-self.kosten[container_id], container_id))
+
     def __sorteer_container_traject(self, container_id: int, *traject):
         if all([traject[i] < traject[i + 1] for i in range(len(traject) - 1)]):
             return traject
@@ -464,12 +684,385 @@ class Planning:
                 self.adhoc_capaciteiten.remove(legcapaciteit)
         self.trajecten[container_id] = []
         self.kosten[container_id] = None
+        self.kostenopbouw[container_id] = None
         self.gepland.remove(container_id)
         self.te_plannen.add(container_id)
 
+    def geef_toewijzing(self):
+        # compacte, json-serialiseerbare toewijzing van trajecten aan containers (zonder objecten)
+        # per container None (nog in te plannen) of een list met per legcapaciteit van het traject:
+        # de index in self.legcapaciteiten, of [van id, naar id, checkin, vertrek, aankomst, prijs, emissie] (adhoc)
+        indexen = {legcapaciteit: i for i, legcapaciteit in enumerate(self.legcapaciteiten)}
+        toewijzing = []
+        for container_id, traject in enumerate(self.trajecten):
+            if container_id in self.te_plannen:
+                toewijzing.append(None)
+            else:
+                toewijzing.append([[lc.leg.van.id, lc.leg.naar.id, lc.leg.checkin.isoformat(),
+                                    lc.leg.vertrek.isoformat(), lc.leg.aankomst.isoformat(),
+                                    float(lc.prijs), float(lc.emissie)] if lc.is_adhoc else indexen[lc]
+                                   for lc in traject])
+        return toewijzing
+
+    def herstel_toewijzing(self, toewijzing: list):
+        # kent de trajecten uit een toewijzing van geef_toewijzing opnieuw toe (huidige trajecten worden verwijderd)
+        # adhoc capaciteiten worden opnieuw aangemaakt
+        for container_id, traject in enumerate(toewijzing):
+            self.__herstel_traject(container_id, traject)
+
+    def __herstel_traject(self, container_id: int, traject: list):
+        # kent 1 traject in het formaat van geef_toewijzing toe aan de container
+        if container_id in self.gepland:
+            self.verwijder_container_traject(container_id)
+        if traject is None:
+            return
+        containertype = self.containers[container_id].containertype
+        capaciteiten = []
+        for element in traject:
+            if isinstance(element, int):
+                capaciteiten.append(self.legcapaciteiten[element])
+            else:
+                van, naar, checkin, vertrek, aankomst, prijs, emissie = element
+                leg = Leg(-999, self.locaties[van], self.locaties[naar], datetime.fromisoformat(checkin),
+                          datetime.fromisoformat(vertrek), datetime.fromisoformat(aankomst))
+                capaciteiten.append(leg.voeg_capaciteit_toe(1, containertype, prijs, emissie))
+        self.voeg_container_traject_toe(container_id, *capaciteiten)
+
+    def __geef_legcapaciteit_index(self, legcapaciteiten: list = None):
+        # legcapaciteiten per (locatie, containertype): dict van en dict naar
+        # legcapaciteiten: enkel deze legcapaciteiten opnemen (standaard alle)
+        per_van = dict()
+        per_naar = dict()
+        for legcapaciteit in self.legcapaciteiten if legcapaciteiten is None else legcapaciteiten:
+            per_van.setdefault((legcapaciteit.leg.van, legcapaciteit.containertype), []).append(legcapaciteit)
+            per_naar.setdefault((legcapaciteit.leg.naar, legcapaciteit.containertype), []).append(legcapaciteit)
+        return per_van, per_naar
+
+    def geef_bereikbare_legcapaciteiten(self, ordercapaciteit: OrderCapaciteit, index: tuple = None):
+        # retourneert de set met legcapaciteiten die in een traject van de ordercapaciteit kunnen voorkomen
+        # (een overschatting: beschikbaarheid en verboden tussenstops worden genegeerd)
+        # vooruit: vanaf legs die binnen het ophaalvenster in order.van vertrekken, gevolgd door aansluitende legs
+        # (de laatste leg kan met een adhoc leg naar order.naar aansluiten)
+        # achteruit: vanaf legs die voor de uiterste levertijd in order.naar aankomen, voorafgegaan door legs
+        # die na de min ophaaltijd vertrekken (de eerste leg kan met een adhoc leg vanaf order.van bereikt worden)
+        # index: (per_van, per_naar) van __geef_legcapaciteit_index, om die niet per ordercapaciteit te herberekenen
+        per_van, per_naar = index if index is not None else self.__geef_legcapaciteit_index()
+        order = ordercapaciteit.order
+        containertype = ordercapaciteit.containertype
+        bereikbaar = set()
+        stapel = [lc for lc in per_van.get((order.van, containertype), [])
+                  if order.min_ophaaltijd_minuut <= lc.leg.checkin_minuut <= order.max_ophaaltijd_minuut
+                  and lc.leg.aankomst_minuut <= order.uiterste_levertijd_minuut]
+        bereikbaar.update(stapel)
+        while stapel:
+            legcapaciteit = stapel.pop()
+            for lc in per_van.get((legcapaciteit.leg.naar, containertype), []):
+                if lc not in bereikbaar and lc.leg.checkin_minuut >= legcapaciteit.leg.aankomst_minuut \
+                        and lc.leg.aankomst_minuut <= order.uiterste_levertijd_minuut:
+                    bereikbaar.add(lc)
+                    stapel.append(lc)
+        achteruit = set()
+        stapel = [lc for lc in per_naar.get((order.naar, containertype), [])
+                  if lc.leg.aankomst_minuut <= order.uiterste_levertijd_minuut
+                  and lc.leg.checkin_minuut >= order.min_ophaaltijd_minuut]
+        achteruit.update(stapel)
+        while stapel:
+            legcapaciteit = stapel.pop()
+            for lc in per_naar.get((legcapaciteit.leg.van, containertype), []):
+                if lc not in achteruit and lc.leg.aankomst_minuut <= legcapaciteit.leg.checkin_minuut \
+                        and lc.leg.checkin_minuut >= order.min_ophaaltijd_minuut:
+                    achteruit.add(lc)
+                    stapel.append(lc)
+        return bereikbaar | achteruit
+
+    def geef_componenten(self):
+        # splitst de orders in onafhankelijke componenten: orders uit verschillende componenten kunnen nooit
+        # dezelfde legcapaciteit gebruiken (zie geef_bereikbare_legcapaciteiten), adhoc legs zijn onbeperkt
+        # retourneert [[order ids]], gesorteerd op het kleinste order id
+        index = self.__geef_legcapaciteit_index()
+        ouder = list(range(len(self.orders)))  # union-find over de orders
+
+        def wortel(order_id):
+            while ouder[order_id] != order_id:
+                ouder[order_id] = ouder[ouder[order_id]]
+                order_id = ouder[order_id]
+            return order_id
+
+        eigenaar = dict()  # legcapaciteit -> order id dat ze als eerste kan bereiken
+        for ordercapaciteit in self.ordercapaciteiten:
+            order_id = ordercapaciteit.order.id
+            for legcapaciteit in self.geef_bereikbare_legcapaciteiten(ordercapaciteit, index):
+                andere = eigenaar.setdefault(legcapaciteit, order_id)
+                ouder[wortel(andere)] = wortel(order_id)
+        componenten = dict()
+        for order in self.orders:
+            componenten.setdefault(wortel(order.id), []).append(order.id)
+        return sorted(componenten.values())
+
+    def reduce(self):
+        # verwijdert legcapaciteiten (en legs zonder capaciteiten) die in geen enkele optimale planning nodig zijn:
+        # - containertype: geen enkele order heeft dat containertype
+        # - onbereikbaar: vanuit geen enkele order bereikbaar binnen de tijdsvensters (zie geef_bereikbare_legcapaciteiten)
+        # - gedomineerd: een andere legcapaciteit met dezelfde route en hetzelfde containertype vertrekt niet vroeger,
+        #   komt niet later aan, is niet duurder en heeft genoeg capaciteit voor alle containers die beide kunnen
+        #   gebruiken; voor elke order die ze kan gebruiken respecteert ze de ophaaltijd en geeft ze niet meer boete
+        # de ids van de overblijvende legs blijven behouden, elke solver werkt daarna op het kleinere netwerk
+        # enkel mogelijk zolang er geen containers ingepland zijn (de legcapaciteit indexen wijzigen)
+        # retourneert het rapport: aantal legs en legcapaciteiten voor en na, en per reden de verwijderde
+        # legcapaciteiten als dict(leg, containertype) (met gedomineerd ook door: de leg die ze vervangt)
+        if self.gepland:
+            raise ValueError("Reduce the planning before containers are planned.")
+        index = self.__geef_legcapaciteit_index()
+        klanten = dict()  # legcapaciteit -> set van ordercapaciteiten die ze kunnen gebruiken
+        for ordercapaciteit in self.ordercapaciteiten:
+            if all(container_id in self.geannuleerd for container_id in ordercapaciteit.containers):
+                continue
+            for legcapaciteit in self.geef_bereikbare_legcapaciteiten(ordercapaciteit, index):
+                klanten.setdefault(legcapaciteit, set()).add(ordercapaciteit)
+        containertypes = {ordercapaciteit.containertype for ordercapaciteit in self.ordercapaciteiten}
+        rapport = dict(legs=[len(self.legs), None], legcapaciteiten=[len(self.legcapaciteiten), None],
+                       containertype=[], onbereikbaar=[], gedomineerd=[])
+        verwijderd = set()
+        routes = dict()
+        for legcapaciteit in self.legcapaciteiten:
+            if legcapaciteit not in klanten:
+                reden = "onbereikbaar" if legcapaciteit.containertype in containertypes else "containertype"
+                rapport[reden].append(dict(leg=legcapaciteit.leg.id, containertype=str(legcapaciteit.containertype)))
+                verwijderd.add(legcapaciteit)
+            else:
+                routes.setdefault((legcapaciteit.leg.van, legcapaciteit.leg.naar, legcapaciteit.containertype),
+                                  []).append(legcapaciteit)
+        for capaciteiten in routes.values():
+            # de duurste eerst: die worden zo mogelijk opgenomen door een goedkopere legcapaciteit
+            capaciteiten.sort(key=lambda lc: (lc.prijs, lc.emissie, lc.leg.aankomst_minuut, -lc.leg.checkin_minuut),
+                              reverse=True)
+            for i, legcapaciteit in enumerate(capaciteiten):
+                for dominant in reversed(capaciteiten[i + 1:]):
+                    if dominant not in verwijderd and self.__domineert(dominant, legcapaciteit, klanten):
+                        klanten[dominant] |= klanten[legcapaciteit]
+                        rapport["gedomineerd"].append(dict(leg=legcapaciteit.leg.id,
+                                                           containertype=str(legcapaciteit.containertype),
+                                                           door=dominant.leg.id))
+                        verwijderd.add(legcapaciteit)
+                        break
+        for legcapaciteit in verwijderd:
+            del legcapaciteit.leg.capaciteiten[legcapaciteit.containertype]
+        self.legcapaciteiten = [lc for lc in self.legcapaciteiten if lc not in verwijderd]
+        self.legs = [leg for leg in self.legs if leg.capaciteiten]
+        rapport["legs"][1] = len(self.legs)
+        rapport["legcapaciteiten"][1] = len(self.legcapaciteiten)
+        return rapport
+
+    def __domineert(self, dominant: LegCapaciteit, legcapaciteit: LegCapaciteit, klanten: dict):
+        # kan dominant elk gebruik van legcapaciteit overnemen (zelfde route en containertype)?
+        leg, andere = dominant.leg, legcapaciteit.leg
+        if dominant.prijs > legcapaciteit.prijs or dominant.emissie > legcapaciteit.emissie or \
+                leg.checkin_minuut < andere.checkin_minuut or leg.aankomst_minuut > andere.aankomst_minuut:
+            return False
+        samen = klanten[dominant] | klanten[legcapaciteit]
+        if sum(ordercapaciteit.aantal for ordercapaciteit in samen) > dominant.aantal:
+            return False
+        for ordercapaciteit in klanten[legcapaciteit]:
+            order = ordercapaciteit.order
+            if andere.van == order.van and leg.checkin_minuut > order.max_ophaaltijd_minuut:
+                return False
+            if andere.naar == order.naar and self.__bereken_boete(order, leg.aankomst_minuut)["boete"] > \
+                    self.__bereken_boete(order, andere.aankomst_minuut)["boete"]:
+                return False
+        return True
+
+    def geef_legcapaciteiten_op_checkin(self):
+        # [(checkin in minuten, index in legcapaciteiten)] gesorteerd op checkin, om met bisect de
+        # legcapaciteiten van een tijdsvenster te vinden zonder alle legcapaciteiten te overlopen
+        return sorted((legcapaciteit.leg.checkin_minuut, i) for i, legcapaciteit in enumerate(self.legcapaciteiten))
+
+    def maak_deelplanning(self, order_ids: list, naam: str = None, legs_tot: datetime = None,
+                          legs_vanaf: datetime = None, indexen: list = None):
+        # maakt een nieuwe planning met de gegeven orders en de legcapaciteiten die ze kunnen bereiken
+        # (vb. 1 component van geef_componenten), met dezelfde locaties, containertypes en adhoc legs
+        # legs_vanaf, legs_tot: enkel legs met een checkin vanaf legs_vanaf en voor legs_tot worden opgenomen
+        # (vb. een tijdsvenster), ook bij het zoeken naar de bereikbare legcapaciteiten
+        # indexen: enkel deze legcapaciteiten (indexen in legcapaciteiten) komen in aanmerking, vb. het venster
+        # uit geef_legcapaciteiten_op_checkin; het werk hangt dan af van het venster en niet van alle legs
+        # de capaciteit van een legcapaciteit wordt verminderd met de containers van andere orders die ze gebruiken
+        # retourneert (deelplanning, container_ids, legcapaciteit_indexen): de ids van de containers en de
+        # indexen van de legcapaciteiten van de deelplanning in deze planning (zie voeg_toewijzing_samen)
+        deel = Planning(self.adhoc_legs, self.naam if naam is None else naam)
+        for locatie in self.locaties:
+            deel.__voeg_locatie_toe(locatie.naam, type(locatie))
+        deel.terminals = [deel.locaties[locatie.id] for locatie in self.terminals]
+        deel.verladers = [deel.locaties[locatie.id] for locatie in self.verladers]
+        deel.empty_depots = [deel.locaties[locatie.id] for locatie in self.empty_depots]
+        for containertype in self.containertypes:
+            deel.voeg_containertype_toe(containertype.naam, containertype.gewicht)
+        indexen = range(len(self.legcapaciteiten)) if indexen is None else sorted(indexen)
+        vanaf = None if legs_vanaf is None else geef_minuten(legs_vanaf)
+        tot = None if legs_tot is None else geef_minuten(legs_tot)
+        indexen = [i for i in indexen if (vanaf is None or self.legcapaciteiten[i].leg.checkin_minuut >= vanaf)
+                   and (tot is None or self.legcapaciteiten[i].leg.checkin_minuut < tot)]
+        index = self.__geef_legcapaciteit_index([self.legcapaciteiten[i] for i in indexen])
+        orders = [self.orders[order_id] for order_id in sorted(order_ids)]
+        bereikbaar = set()
+        container_ids = []
+        for order in orders:
+            nieuwe_order = deel.voeg_order_toe(deel.locaties[order.van.id], deel.locaties[order.naar.id],
+                                               order.min_ophaaltijd, order.max_ophaaltijd, order.min_levertijd,
+                                               order.max_levertijd, order.uiterste_levertijd, order.emissiefactor,
+                                               order.boete_te_vroeg, order.boete_te_laat)
+            nieuwe_order.db_id = order.db_id
+            for ordercapaciteit in order.capaciteiten.values():
+                deel.voeg_ordercapaciteit_toe(nieuwe_order, ordercapaciteit.aantal,
+                                              deel.containertypes[ordercapaciteit.containertype.id])
+                container_ids += ordercapaciteit.containers
+                bereikbaar |= self.geef_bereikbare_legcapaciteiten(ordercapaciteit, index)
+        eigen = set(container_ids)
+        legcapaciteit_indexen = []
+        legs = dict()  # leg in deze planning -> leg in de deelplanning
+        for i in indexen:
+            legcapaciteit = self.legcapaciteiten[i]
+            if legcapaciteit not in bereikbaar:
+                continue
+            leg = legcapaciteit.leg
+            if leg not in legs:
+                legs[leg] = deel.voeg_leg_toe(deel.locaties[leg.van.id], deel.locaties[leg.naar.id], leg.checkin,
+                                              leg.vertrek, leg.aankomst)
+                legs[leg].dag, legs[leg].modus, legs[leg].db_id = leg.dag, leg.modus, leg.db_id
+            aantal = legcapaciteit.aantal - sum(1 for c in legcapaciteit.containers if c not in eigen)
+            deel.voeg_legcapaciteit_toe(legs[leg], aantal, deel.containertypes[legcapaciteit.containertype.id],
+                                        legcapaciteit.prijs, legcapaciteit.emissie)
+            legcapaciteit_indexen.append(i)
+        return deel, container_ids, legcapaciteit_indexen
+
+    def fork(self, naam: str = None):
+        # lichte kopie voor what-if varianten van dezelfde planning (vb. een extra leg of een gesloten terminal)
+        # gedeeld met de ouder: locaties, containertypes, orders, ordercapaciteiten en de adhoc legs (afstanden),
+        # tot de fork of de ouder ze wijzigt (copy-on-write via de methodes van Planning, niet rechtstreeks)
+        # gekopieerd: de legs en legcapaciteiten (ze dragen de toewijzing) en de toewijzing van de trajecten
+        # de fork en de ouder kunnen daarna onafhankelijk gewijzigd en (tegelijk) opgelost worden
+        fork = copy.copy(self)
+        fork.naam = self.naam if naam is None else naam
+        self.__gedeeld = set(GEDEELD)
+        fork.__gedeeld = set(GEDEELD)
+        self.__gedeelde_orders = set(range(len(self.orders)))
+        fork.__gedeelde_orders = set(self.__gedeelde_orders)
+        capaciteiten = dict()  # legcapaciteit van de ouder -> legcapaciteit van de fork
+
+        def kopieer(leg):
+            kopie = copy.copy(leg)
+            kopie.capaciteiten = dict()
+            for containertype, legcapaciteit in leg.capaciteiten.items():
+                capaciteiten[legcapaciteit] = kopie.capaciteiten[containertype] = copy.copy(legcapaciteit)
+                capaciteiten[legcapaciteit]._van_naar = kopie
+                capaciteiten[legcapaciteit].containers = list(legcapaciteit.containers)
+            return kopie
+
+        fork.legs = [kopieer(leg) for leg in self.legs]
+        for legcapaciteit in self.adhoc_capaciteiten:
+            kopieer(legcapaciteit.leg)
+        fork.legcapaciteiten = [capaciteiten[legcapaciteit] for legcapaciteit in self.legcapaciteiten]
+        fork.adhoc_capaciteiten = [capaciteiten[legcapaciteit] for legcapaciteit in self.adhoc_capaciteiten]
+        fork.trajecten = [tuple(capaciteiten[legcapaciteit] for legcapaciteit in traject) if traject else []
+                          for traject in self.trajecten]
+        fork.kosten = list(self.kosten)
+        fork.kostenopbouw = list(self.kostenopbouw)
+        fork.te_plannen = set(self.te_plannen)
+        fork.gepland = set(self.gepland)
+        fork.geannuleerd = set(self.geannuleerd)
+        fork.kosten_heap = list(self.kosten_heap)
+        return fork
+
+    def voeg_toewijzing_samen(self, toewijzing: list, container_ids: list, legcapaciteit_indexen: list):
+        # kent de trajecten uit de toewijzing van een deelplanning (geef_toewijzing van de deelplanning)
+        # toe aan de overeenkomstige containers van deze planning, zie maak_deelplanning
+        for container_id, traject in zip(container_ids, toewijzing):
+            if traject is not None:
+                traject = [legcapaciteit_indexen[element] if isinstance(element, int) else element
+                           for element in traject]
+            self.__herstel_traject(container_id, traject)
+
     def verwijder_alle_trajecten(self):
         for i in range(len(self.containers)):
-            self.verwijder_container_traject(i)
+            if i in self.gepland:
+                self.verwijder_container_traject(i)
+
+    def annuleer_order(self, order: Order):
+        # annuleert een order: de trajecten van zijn containers worden verwijderd en de containers worden
+        # niet meer ingepland (de container ids blijven bestaan, zie geannuleerd)
+        # retourneert de set met ids van de geannuleerde containers
+        container_ids = set(order.containers)
+        for container_id in container_ids:
+            if container_id in self.gepland:
+                self.verwijder_container_traject(container_id)
+            self.te_plannen.discard(container_id)
+        self.geannuleerd |= container_ids
+        self.__maak_eigen("orders_op_ophaaltijd", "orders_per_van", "orders_per_naar")
+        sleutel = (order.min_ophaaltijd_minuut, order.id)
+        for orders in (self.orders_op_ophaaltijd, self.orders_per_van.get(order.van, []),
+                       self.orders_per_naar.get(order.naar, [])):
+            i = bisect.bisect_left(orders, sleutel)
+            if i < len(orders) and orders[i] == sleutel:
+                del orders[i]
+        return container_ids
+
+    def wijzig_leg(self, leg: Leg, checkin: datetime = None, vertrek: datetime = None, aankomst: datetime = None):
+        # wijzigt de tijden van een leg (vb. vertraging); None laat een tijd ongewijzigd
+        # de trajecten van de containers op de leg worden verwijderd (en moeten opnieuw ingepland worden)
+        # retourneert de set met ids van de getroffen containers
+        leg.checkin = leg.checkin if checkin is None else checkin
+        leg.vertrek = leg.vertrek if vertrek is None else vertrek
+        leg.aankomst = leg.aankomst if aankomst is None else aankomst
+        getroffen = set(leg.containers)
+        for container_id in getroffen:
+            self.verwijder_container_traject(container_id)
+        return getroffen
+
+    def wijzig_legcapaciteit(self, legcapaciteit: LegCapaciteit, aantal: int):
+        # wijzigt de capaciteit van een legcapaciteit
+        # is ze overboekt, dan worden de duurste trajecten op de legcapaciteit verwijderd
+        # retourneert de set met ids van de getroffen containers
+        legcapaciteit.aantal = aantal
+        overboekt = len(legcapaciteit.containers) - aantal
+        getroffen = set()
+        if overboekt > 0:
+            duurste = sorted(legcapaciteit.containers, key=lambda i: (-self.kosten[i], i))
+            getroffen.update(duurste[:overboekt])
+        for container_id in getroffen:
+            self.verwijder_container_traject(container_id)
+        return getroffen
+
+    def wijzig_kostparameters(self, orders: list = None, emissiefactor: float = None, boete_te_vroeg: float = None,
+                              boete_te_laat: float = None):
+        # wijzigt de emissiefactor en/of boetes van de orders (standaard alle orders); None laat een waarde ongewijzigd
+        # de trajecten blijven behouden, enkel de kost van de ingeplande containers van de orders wordt herberekend
+        for order in self.__maak_orders_eigen(self.orders if orders is None else orders):
+            order.emissiefactor = order.emissiefactor if emissiefactor is None else emissiefactor
+            order.boete_te_vroeg = order.boete_te_vroeg if boete_te_vroeg is None else boete_te_vroeg
+            order.boete_te_laat = order.boete_te_laat if boete_te_laat is None else boete_te_laat
+            for container_id in order.containers:
+                if container_id in self.gepland:
+                    self.kostenopbouw[container_id] = self.geef_kostenopbouw_van_container_traject(container_id)
+                    self.kosten[container_id] = self.__totale_kost(self.kostenopbouw[container_id])
+                    self.__push_kost(container_id)
+
+    def wijzig_uiterste_levertijd(self, order: Order, uiterste_levertijd: datetime | int):
+        # wijzigt de uiterste levertijd van een order (vb. versoepeling), de trajecten blijven behouden
+        # retourneert de (eigen) order, zie fork
+        order, = self.__maak_orders_eigen([order])
+        order.uiterste_levertijd = uiterste_levertijd
+        return order
+
+    def splits_adhoc_capaciteiten(self):
+        # omgekeerde van maak_unieke_adhoc_capaciteiten: elke container krijgt opnieuw zijn eigen adhoc capaciteiten
+        # nodig om een samengevoegde planning verder te optimaliseren (verwijderen werkt per container)
+        for legcapaciteit in list(self.adhoc_capaciteiten):
+            for container_id in legcapaciteit.containers[1:]:
+                kopie = AdhocLegs.kopieer_leg(legcapaciteit)
+                kopie.containers.append(container_id)
+                self.trajecten[container_id] = tuple(kopie if lc is legcapaciteit else lc
+                                                     for lc in self.trajecten[container_id])
+                self.adhoc_capaciteiten.append(kopie)
+            del legcapaciteit.containers[1:]
+            legcapaciteit.aantal = 1
 
     def geef_prijs_van_container_traject(self, container_id: int):
         # prijs van 1 gegeven containertraject
@@ -480,38 +1073,94 @@ class Planning:
 
     def geef_emissie_van_container_traject(self, container_id: int):
         # emissie van 1 gegeven containertraject
-        container = self.geef_container_object(container_id)
+        order = self.containers[container_id].order
         traject = self.trajecten[container_id]
         if traject:
             emissie = sum([legcapaciteit.emissie for legcapaciteit in traject])
-            return dict(emissie=emissie, kost=emissie * container.emissiefactor)
+            return dict(emissie=emissie, kost=emissie * order.emissiefactor)
         return None
 
     def geef_boete_van_container_traject(self, container_id: int):
         # boete van 1 gegeven containertraject
-        container = self.geef_container_object(container_id)
         traject = self.trajecten[container_id]
         if traject:
-            aankomst = traject[-1].leg.aankomst
-            if aankomst > container.max_levertijd:
-                uren_te_laat = (aankomst - container.max_levertijd).total_seconds() / 3600.0
-                return dict(uren_te_vroeg=0, uren_te_laat=uren_te_laat, boete=uren_te_laat * container.boete_te_laat)
-            elif aankomst < container.min_levertijd:
-                uren_te_vroeg = (container.min_levertijd - aankomst).total_seconds() / 3600.0
-                return dict(uren_te_vroeg=uren_te_vroeg, uren_te_laat=0, boete=uren_te_vroeg * container.boete_te_vroeg)
-            else:
-                return dict(uren_te_vroeg=0, uren_te_laat=0, boete=0.0)
+            return self.__bereken_boete(self.containers[container_id].order, traject[-1].leg.aankomst_minuut)
         return None
 
+    @staticmethod
+    def __bereken_boete(order: Order, aankomst: int):
+        # aankomst in minuten sinds EPOCH
+        if aankomst > order.max_levertijd_minuut:
+            uren_te_laat = (aankomst - order.max_levertijd_minuut) / 60.0
+            return dict(uren_te_vroeg=0, uren_te_laat=uren_te_laat, boete=uren_te_laat * order.boete_te_laat)
+        elif aankomst < order.min_levertijd_minuut:
+            uren_te_vroeg = (order.min_levertijd_minuut - aankomst) / 60.0
+            return dict(uren_te_vroeg=uren_te_vroeg, uren_te_laat=0, boete=uren_te_vroeg * order.boete_te_vroeg)
+        else:
+            return dict(uren_te_vroeg=0, uren_te_laat=0, boete=0.0)
+
+    def geef_kostenopbouw_van_container_traject(self, container_id: int):
+        # prijs, emissie (en emissiekost) en boete van 1 gegeven containertraject, berekend in 1 doorloop
+        return self.__bereken_kostenopbouw(self.containers[container_id].order, self.trajecten[container_id])
+
+    @classmethod
+    def __bereken_kostenopbouw(cls, order: Order, traject):
+        # de aankomst van het traject is de laatste aankomst, het traject hoeft dus niet gesorteerd te zijn
+        if not traject:
+            return None
+        prijs = 0
+        emissie = 0
+        aankomst = traject[0].leg.aankomst_minuut
+        for legcapaciteit in traject:
+            prijs += legcapaciteit.prijs
+            emissie += legcapaciteit.emissie
+            if legcapaciteit.leg.aankomst_minuut > aankomst:
+                aankomst = legcapaciteit.leg.aankomst_minuut
+        boete = cls.__bereken_boete(order, aankomst)["boete"]
+        return dict(prijs=prijs, emissie=emissie, emissiekost=emissie * order.emissiefactor, boete=boete)
+
+    @staticmethod
+    def __totale_kost(kostenopbouw: dict):
+        if kostenopbouw is None:
+            return None
+        return kostenopbouw["prijs"] + kostenopbouw["emissiekost"] + kostenopbouw["boete"]
+
     def geef_totale_kost_van_container_traject(self, container_id: int):
         # totale kost van 1 gegeven containertraject
-        prijs = self.geef_prijs_van_container_traject(container_id)
-        emissie = self.geef_emissie_van_container_traject(container_id)["kost"]
-        boete = self.geef_boete_van_container_traject(container_id)["boete"]
-        try:
-            return prijs + emissie + boete
-        except:
-            return None
+        return self.__totale_kost(self.geef_kostenopbouw_van_container_traject(container_id))
+
+    def delta_verwijder(self, container_ids):
+        # evalueert het verwijderen van de trajecten van de gegeven containers zonder de planning te wijzigen
+        # retourneert dict(kost=kostverandering, mogelijk=True): verwijderen maakt enkel capaciteit vrij
+        kost = 0
+        for container_id in set(container_ids):
+            if self.kosten[container_id] is not None:
+                kost -= self.kosten[container_id]
+        return dict(kost=kost, mogelijk=True)
+
+    def delta_voeg_toe(self, container_id: int, *traject):
+        # evalueert het toekennen van een traject aan een container zonder de planning te wijzigen
+        # een bestaand traject van de container wordt daarbij vervangen
+        # gebruikt de kost per container en het aantal containers per legcapaciteit die de planning bijhoudt
+        # retourneert dict(kost=kostverandering, mogelijk=True/False)
+        # mogelijk is False als het containertype niet klopt of een legcapaciteit onvoldoende beschikbaar is
+        ordercapaciteit = self.containers[container_id]
+        huidig_traject = self.trajecten[container_id]
+        gebruik = dict()  # legcapaciteit -> aantal keer gebruikt in het nieuwe traject
+        mogelijk = True
+        for legcapaciteit in traject:
+            if legcapaciteit.containertype != ordercapaciteit.containertype:
+                mogelijk = False
+            if not legcapaciteit.is_adhoc:
+                gebruik[legcapaciteit] = gebruik.get(legcapaciteit, 0) + 1
+        for legcapaciteit, aantal in gebruik.items():
+            vrij = legcapaciteit.beschikbaar + (1 if legcapaciteit in huidig_traject else 0)
+            if vrij < aantal:
+                mogelijk = False
+        nieuwe_kost = self.__totale_kost(self.__bereken_kostenopbouw(ordercapaciteit.order, traject))
+        huidige_kost = self.kosten[container_id]
+        kost = (nieuwe_kost if nieuwe_kost is not None else 0) - (huidige_kost if huidige_kost is not None else 0)
+        return dict(kost=kost, mogelijk=mogelijk)
 
     def geef_totale_kost(self):
         # totale kostprijs van de planning (incl emissie en boetes)
@@ -519,39 +1168,33 @@ class Planning:
 
     def maak_unieke_adhoc_capaciteiten(self):
         # zorgt dat unieke adhoc capaciteiten worden samengevoegd
-        new_adhoc_capaciteiten = []
+        # dict op de kenmerken in plaats van elke capaciteit met alle unieke te vergelijken (lineair in het aantal)
+        new_adhoc_capaciteiten = dict()
         id = 0  # adhoc ids
         for c_old in self.adhoc_capaciteiten:
-            exists = False
-            for c_new in new_adhoc_capaciteiten:
-                exists = self.__zelfde_adhoc_capaciteit(c_old, c_new)
-                if exists:
-                    container = c_old.containers[0]
-                    c_new.containers.append(container)
-                    c_new.aantal += 1
-                    for i, c in enumerate(self.trajecten[container]):
-                        if c == c_old:
-                            lst = list(self.trajecten[container])
-                            lst[i] = c_new
-                            self.trajecten[container] = tuple(lst)
-                    break
-            if not exists:
+            sleutel = self.__geef_adhoc_sleutel(c_old)
+            c_new = new_adhoc_capaciteiten.get(sleutel)
+            if c_new is not None:
+                container = c_old.containers[0]
+                c_new.containers.append(container)
+                c_new.aantal += 1
+                for i, c in enumerate(self.trajecten[container]):
+                    if c == c_old:
+                        lst = list(self.trajecten[container])
+                        lst[i] = c_new
+                        self.trajecten[container] = tuple(lst)
+            else:
                 id -= 1
                 c_old.leg.id = id
-                new_adhoc_capaciteiten.append(c_old)
-        self.adhoc_capaciteiten = new_adhoc_capaciteiten
+                new_adhoc_capaciteiten[sleutel] = c_old
+        self.adhoc_capaciteiten = list(new_adhoc_capaciteiten.values())
 
     @staticmethod
-    def __zelfde_adhoc_capaciteit(cap1: LegCapaciteit, cap2: LegCapaciteit):
-        leg_attributes = ["van", "naar", "checkin", "vertrek", "aankomst"]
-        legcap_attributes = ["containertype", "prijs", "emissie"]
-        for attr in leg_attributes:
-            if getattr(cap1.leg, attr) != getattr(cap2.leg, attr):
-                return False
-        for attr in legcap_attributes:
-            if getattr(cap1, attr) != getattr(cap2, attr):
-                return False
-        return True
+    def __geef_adhoc_sleutel(capaciteit: LegCapaciteit):
+        # adhoc capaciteiten met dezelfde sleutel zijn gelijk en worden samengevoegd
+        leg = capaciteit.leg
+        return (leg.van, leg.naar, leg.checkin_minuut, leg.vertrek_minuut, leg.aankomst_minuut,
+                capaciteit.containertype, capaciteit.prijs, capaciteit.emissie)
 
     def geef_unieke_trajecten(self, groepeer_orders=False):
         # groepeert trajecten
@@ -583,33 +1226,50 @@ class Planning:
                 traject = self.trajecten[container_id]
                 if traject not in order_trajecten[order]:
                     order_trajecten[order][traject] = dict(aantal=0, prijs=0, emissie=0, boete=0)
+                kostenopbouw = self.kostenopbouw[container_id]
+                if kostenopbouw is None:
+                    kostenopbouw = self.geef_kostenopbouw_van_container_traject(container_id)
                 order_trajecten[order][traject]["aantal"] += 1
-                order_trajecten[order][traject]["prijs"] += self.geef_prijs_van_container_traject(container_id)
-                order_trajecten[order][traject]["emissie"] += self.geef_emissie_van_container_traject(container_id)["emissie"]
-                order_trajecten[order][traject]["boete"] += self.geef_boete_van_container_traject(container_id)["boete"]
+                order_trajecten[order][traject]["prijs"] += kostenopbouw["prijs"]
+                order_trajecten[order][traject]["emissie"] += kostenopbouw["emissie"]
+                order_trajecten[order][traject]["boete"] += kostenopbouw["boete"]
         return order_trajecten
 
     def dataframe(self, attribuut: str = 'orders'):
         # attribuut is 'orders' (default), 'legs', 'ordercapaciteiten', 'legcapaciteiten', 'containers', 'trajecten'
+        # de dataframe wordt kolom per kolom opgebouwd uit 1 doorloop over de objecten
+        # rijen van ordercapaciteiten en legcapaciteiten worden maar 1 keer berekend
+        kolommen = dict()  # klasse -> kolomnamen van de rij
+        rijen = dict()  # object -> waarden van de rij
+
+        def rij(member):
+            if member not in rijen:
+                member_rij = member._rij()
+                kolommen.setdefault(type(member), list(member_rij))
+                rijen[member] = tuple(member_rij.values())
+            return rijen[member]
+
         if attribuut == 'containers':
-            return pd.concat([self.geef_container_object(id).dataframe() for id in range(len(self.containers))],
-                             axis=0, ignore_index=True)
+            waarden = [(id,) + rij(ordercapaciteit) for id, ordercapaciteit in enumerate(self.containers)]
+            namen = ["containerid"] + kolommen.get(OrderCapaciteit, [])
         elif attribuut == 'trajecten':
-            return pd.concat([pd.concat((self.geef_container_object(id).dataframe(),
-                                         pd.DataFrame(dict(leg_volgorde=[nr])),
-                                         lc.dataframe()),
-                                        axis=1)
-                              for id, traject in enumerate(self.trajecten) for nr, lc in enumerate(traject)],
-                             axis=0, ignore_index=True)
+            waarden = [(id,) + rij(self.containers[id]) + (nr,) + rij(lc)
+                       for id, traject in enumerate(self.trajecten) for nr, lc in enumerate(traject)]
+            namen = ["containerid"] + kolommen.get(OrderCapaciteit, []) + ["leg_volgorde"] + \
+                    kolommen.get(LegCapaciteit, [])
         else:
-            return pd.concat([member.dataframe() for member in getattr(self, attribuut)], axis=0, ignore_index=True)
+            members = getattr(self, attribuut)
+            waarden = [rij(member) for member in members]
+            namen = kolommen[type(members[0])] if members else []
+        import pandas as pd
+        return pd.DataFrame(dict(zip(namen, map(list, zip(*waarden)))), columns=namen)
 
 
 class AdhocLegs:
 
-    def __init__(self, afstanden: pd.DataFrame, starttarief: float, tarief: float, snelheid: float, emissie: float,
+    def __init__(self, afstanden: pd.DataFrame | dict, starttarief: float, tarief: float, snelheid: float, emissie: float,
                  voor_na_transport: float = 10.0):
-        # afstanden is afstandsmatrix met afstanden in km
+        # afstanden is afstandsmatrix met afstanden in km (DataFrame of dict van dicts, afstanden[van][naar])
         # starttarief in euro
         # tarief in euro/km
         # snelheid in km/u
@@ -621,6 +1281,7 @@ class AdhocLegs:
         self.snelheid = snelheid
         self.emissie = emissie
         self.voor_na_transport = voor_na_transport
+        self.__duren = dict()  # afstand -> rijtijd in minuten (geef_duur)
 
     def geef_afstand(self, van: Locatie, naar: Locatie):
         afstand = self.afstanden[van.naam][naar.naam]
@@ -628,60 +1289,72 @@ class AdhocLegs:
             afstand = self.voor_na_transport
         return afstand
 
+    def geef_duur(self, afstand: float):
+        # rijtijd in minuten voor een afstand in km, exact zoals de timedelta van de rijtijd (zie geef_minuten)
+        duur = self.__duren.get(afstand)
+        if duur is None:
+            duur = self.__duren[afstand] = geef_minuten(timedelta(seconds=afstand / self.snelheid * 3600.0))
+        return duur
+
+    @gemeten("AdhocLegs.maak_leg")
     def maak_leg(self, container: Container):
         # maakt adhoc leg tussen start- en eindlocatie van een container
         # retourneert LegCapaciteit object!
+        order = container.order
         afstand = self.geef_afstand(container.van, container.naar)
-        duur = timedelta(seconds=afstand / self.snelheid * 3600.0)
-        max_duur = container.uiterste_levertijd - container.min_ophaaltijd
-        min_duur = container.min_levertijd - container.max_ophaaltijd
-        max_duur_geen_boete = container.max_levertijd - container.min_ophaaltijd
+        duur = self.geef_duur(afstand)
+        max_duur = order.uiterste_levertijd_minuut - order.min_ophaaltijd_minuut
+        min_duur = order.min_levertijd_minuut - order.max_ophaaltijd_minuut
+        max_duur_geen_boete = order.max_levertijd_minuut - order.min_ophaaltijd_minuut
         if duur > max_duur:  # niet mogelijk
             return None
         elif duur <= min_duur:  # te vroeg
-            vertrek = container.max_ophaaltijd
+            vertrek = order.max_ophaaltijd_minuut
         elif duur >= max_duur_geen_boete:  # te laat
-            vertrek = container.min_ophaaltijd
+            vertrek = order.min_ophaaltijd_minuut
         else:
-            ophaalvenster = container.max_ophaaltijd - container.min_ophaaltijd
+            ophaalvenster = order.max_ophaaltijd_minuut - order.min_ophaaltijd_minuut
             delta = duur - min_duur
             if delta >= ophaalvenster:
-                vertrek = container.min_ophaaltijd
+                vertrek = order.min_ophaaltijd_minuut
             else:
-                vertrek = container.min_levertijd - duur
+                vertrek = rond_minuten(order.min_levertijd_minuut - duur)
         leg = Leg(-999, container.van, container.naar, vertrek, vertrek, vertrek + duur)
         prijs = self.starttarief + afstand * self.tarief
         emissie = self.emissie * afstand * container.containertype.gewicht
         legcapaciteit = leg.voeg_capaciteit_toe(1, container.containertype, prijs, emissie)
         return legcapaciteit
 
+    @gemeten("AdhocLegs.maak_leg_voor_leg")
     def maak_leg_voor_leg(self, leg_erna: Leg, container: Container):
         # maakt adhoc leg voor een gegeven leg
         # de adhoc leg start in container.van
         # retourneert LegCapaciteit object!
         afstand = self.geef_afstand(leg_erna.van, container.van)
-        duur = timedelta(seconds=afstand / self.snelheid * 3600.0)
-        if duur > (leg_erna.checkin - container.min_ophaaltijd):
+        duur = self.geef_duur(afstand)
+        vertrek = container.order.min_ophaaltijd_minuut
+        if duur > leg_erna.checkin_minuut - vertrek:
             return None
         else:
-            vertrek = container.min_ophaaltijd
             leg = Leg(-999, container.van, leg_erna.van, vertrek, vertrek, vertrek + duur)
             prijs = self.starttarief + afstand * self.tarief
             emissie = self.emissie * afstand * container.containertype.gewicht
             legcapaciteit = leg.voeg_capaciteit_toe(1, container.containertype, prijs, emissie)
             return legcapaciteit
 
+    @gemeten("AdhocLegs.maak_leg_na_leg")
     def maak_leg_na_leg(self, leg_ervoor: Leg, container: Container):
         # maakt adhoc leg na een gegeven leg
         # de adhoc leg eindigt in container.naar
         # retourneert LegCapaciteit object!
-        aankomst = leg_ervoor.aankomst
+        order = container.order
+        aankomst = leg_ervoor.aankomst_minuut
         afstand = self.geef_afstand(leg_ervoor.naar, container.naar)
-        duur = timedelta(seconds=afstand / self.snelheid * 3600.0)
-        if duur > (container.uiterste_levertijd - aankomst):
+        duur = self.geef_duur(afstand)
+        if duur > order.uiterste_levertijd_minuut - aankomst:
             return None
-        elif duur < (container.min_levertijd - aankomst):
-            vertrek = container.min_levertijd - duur
+        elif duur < order.min_levertijd_minuut - aankomst:
+            vertrek = rond_minuten(order.min_levertijd_minuut - duur)
         else:
             vertrek = aankomst
         leg = Leg(-999, leg_ervoor.naar, container.naar, vertrek, vertrek, vertrek + duur)
@@ -690,6 +1363,27 @@ class AdhocLegs:
         legcapaciteit = leg.voeg_capaciteit_toe(1, container.containertype, prijs, emissie)
         return legcapaciteit
 
+    @staticmethod
+    def kopieer_leg(legcapaciteit: LegCapaciteit):
+        # maakt een nieuwe adhoc leg met dezelfde tijden, prijs en emissie als de gegeven adhoc legcapaciteit
+        # retourneert LegCapaciteit object!
+        leg = legcapaciteit.leg
+        kopie = Leg(leg.id, leg.van, leg.naar, leg.checkin_minuut, leg.vertrek_minuut, leg.aankomst_minuut)
+        return kopie.voeg_capaciteit_toe(1, legcapaciteit.containertype, legcapaciteit.prijs, legcapaciteit.emissie)
+
+    def geef_prijs_emissie(self, van: Locatie, naar: Locatie, containertype: ContainerType):
+        # prijs en emissie van een adhoc leg van van naar naar, zoals in maak_leg
+        afstand = self.geef_afstand(van, naar)
+        return self.starttarief + afstand * self.tarief, self.emissie * afstand * containertype.gewicht
+
+    def maak_leg_tussen(self, van: Locatie, naar: Locatie, containertype: ContainerType, checkin: datetime | int,
+                        vertrek: datetime | int, aankomst: datetime | int):
+        # maakt een adhoc leg met de gegeven tijden (datetime of minuten sinds EPOCH), vb. bij het herstellen van
+        # een oplossing
+        # retourneert LegCapaciteit object!
+        leg = Leg(-999, van, naar, checkin, vertrek, aankomst)
+        return leg.voeg_capaciteit_toe(1, containertype, *self.geef_prijs_emissie(van, naar, containertype))
+
     def schat_prijs(self, legcapaciteit: LegCapaciteit, container: Container, van_naar: bool = True):
         # schat prijs vanaf of naar gegeven legcapaciteit
         # van_naar = True: traject wordt geconstrueerd van container.van naar container.naar
@@ -718,43 +1412,52 @@ class AdhocLegs:
 
     def schat_aankomst(self, legcapaciteit: LegCapaciteit, container: Container):
         # schat aankomst in container.naar vanaf gegeven legcapaciteit
+        return geef_tijdstip(self.schat_aankomst_minuut(legcapaciteit, container))
+
+    def schat_aankomst_minuut(self, legcapaciteit: LegCapaciteit, container: Container):
+        # schat_aankomst in minuten sinds EPOCH
         leg = legcapaciteit.leg
         afstand = self.geef_afstand(leg.naar, container.naar)
         if afstand > 0:
-            return leg.aankomst + timedelta(seconds=afstand / self.snelheid * 3600.0)
+            return rond_minuten(leg.aankomst_minuut + self.geef_duur(afstand))
         else:
-            return leg.aankomst
+            return leg.aankomst_minuut
 
     def schat_vertrek(self, legcapaciteit: LegCapaciteit, container: Container):
         # schat vertrek in container.van naar gegeven legcapaciteit
+        return geef_tijdstip(self.schat_vertrek_minuut(legcapaciteit, container))
+
+    def schat_vertrek_minuut(self, legcapaciteit: LegCapaciteit, container: Container):
+        # schat_vertrek in minuten sinds EPOCH
         leg = legcapaciteit.leg
         afstand = self.geef_afstand(container.van, leg.van)
         if afstand > 0:
-            return leg.checkin - timedelta(seconds=afstand / self.snelheid * 3600.0)
+            return rond_minuten(leg.checkin_minuut - self.geef_duur(afstand))
         else:
-            return leg.checkin
+            return leg.checkin_minuut
 
     def schat_totale_kost(self, legcapaciteit: LegCapaciteit, container: Container, van_naar: bool = True):
         # schat totale kost vanaf of naar gegeven legcapaciteit
         # van_naar = True: traject wordt geconstrueerd van container.van naar container.naar
         # van_naar = False: traject wordt omgekeerd geconstrueerd van container.naar naar container.van
+        order = container.order
         prijs = self.schat_prijs(legcapaciteit, container, van_naar)
         emissie = self.schat_emissie(legcapaciteit, container, van_naar)
         if van_naar:
-            aankomst = self.schat_aankomst(legcapaciteit, container)
-            if aankomst > container.uiterste_levertijd:
+            aankomst = self.schat_aankomst_minuut(legcapaciteit, container)
+            if aankomst > order.uiterste_levertijd_minuut:
                 return None
-            elif aankomst > container.max_levertijd:
-                uren_te_laat = (aankomst - container.max_levertijd).total_seconds() / 3600.0
-                return prijs + container.emissiefactor * emissie + container.boete_te_laat * uren_te_laat
-            elif aankomst < container.min_levertijd:
-                uren_te_vroeg = (container.min_levertijd - aankomst).total_seconds() / 3600.0
-                return prijs + container.emissiefactor * emissie + container.boete_te_vroeg * uren_te_vroeg
+            elif aankomst > order.max_levertijd_minuut:
+                uren_te_laat = (aankomst - order.max_levertijd_minuut) / 60.0
+                return prijs + order.emissiefactor * emissie + order.boete_te_laat * uren_te_laat
+            elif aankomst < order.min_levertijd_minuut:
+                uren_te_vroeg = (order.min_levertijd_minuut - aankomst) / 60.0
+                return prijs + order.emissiefactor * emissie + order.boete_te_vroeg * uren_te_vroeg
             else:
-                return prijs + container.emissiefactor * emissie
+                return prijs + order.emissiefactor * emissie
         else:
-            vertrek = self.schat_vertrek(legcapaciteit, container)
-            if vertrek < container.min_ophaaltijd:
+            vertrek = self.schat_vertrek_minuut(legcapaciteit, container)
+            if vertrek < order.min_ophaaltijd_minuut:
                 return None
             else:
-                return prijs + container.emissiefactor * emissie
+                return prijs + order.emissiefactor * emissie
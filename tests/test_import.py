@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+MAP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # map van het pakket
+MAX_IMPORTTIJD = 1.0  # sec, de import duurt normaal ongeveer 0.15 sec
+
+
+def geef_import():
+    # importeert optimalisatie en data_io in een nieuw proces (zoals Benchmark.meet_importtijd)
+    # retourneert de importtijd en de zware modules (benchmark.ZWARE_MODULES) die daarbij geladen werden
+    code = ("import sys, time; start = time.perf_counter(); import {0}.optimalisatie, {0}.data_io; "
+            "tijd = time.perf_counter() - start; geladen = set(sys.modules); "
+            "from {0}.benchmark import ZWARE_MODULES; print(tijd); "
+            "print(' '.join(m for m in ZWARE_MODULES if m in geladen))").format(os.path.basename(MAP))
+    uitvoer = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(MAP), capture_output=True, text=True,
+                             check=True)
+    tijd, *zwaar = uitvoer.stdout.splitlines()
+    return float(tijd), zwaar[0].split() if zwaar else []
+
+
+def test_geen_zware_modules():
+    # pulp, alns, matplotlib en pandas mogen pas geladen worden als ze gebruikt worden
+    _, zware_modules = geef_import()
+    assert zware_modules == []
+
+
+def test_importtijd():
+    tijd, _ = geef_import()
+    assert tijd < MAX_IMPORTTIJD